@@ -1,5 +1,29 @@
+from .cell_cache import CellCache
 from .codeact_agent import CodeActAgent, CodeActState, create_codeact_agent
 from .execution_context import ExecutionContext
+from .load_cache import LoadCache, get_load_cache
+from .object_store import ObjectStore
+from .resource_limits import ResourceLimits
+from .schemas import VariableHandle
+from .session_registry import SessionRegistry, session_registry
+from .kernel_pool import KernelPool, KernelSession, get_kernel_pool
 from .codeact_graph import compile_codeact_graph
 
-__all__ = ["CodeActAgent", "CodeActState", "create_codeact_agent", "ExecutionContext", "compile_codeact_graph"]
\ No newline at end of file
+__all__ = [
+    "CodeActAgent",
+    "CodeActState",
+    "create_codeact_agent",
+    "CellCache",
+    "ExecutionContext",
+    "LoadCache",
+    "get_load_cache",
+    "ObjectStore",
+    "ResourceLimits",
+    "VariableHandle",
+    "SessionRegistry",
+    "session_registry",
+    "KernelPool",
+    "KernelSession",
+    "get_kernel_pool",
+    "compile_codeact_graph",
+]
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Usage Accounting for CodeAct Agent
+
+Each graph step streams its tokens, latency and cost as a ``usage`` event
+on the custom channel and adds them to the run's totals in ``state.usage``.
+The graph's entry node resets the totals, so budgets apply to each run and
+not to everything a checkpointed thread has done. Token counts come from the provider's usage metadata; when a
+provider reports none (e.g. streaming without usage), they are estimated from
+the text. Cost uses the configured per-million-token prices.
+
+A run that exhausts its token, wall-clock or cost budget is not cut off: the
+agent asks the model once more, within a small output budget, for a final
+answer from what it has found, and ends the loop there.
+"""
+
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import AnyMessage
+
+from app.core.config import settings
+
+from .compaction import prompt_tokens
+from .observation import estimate_tokens
+from .schemas import RunUsage, StepUsage
+
+
+def model_step(node: str, prompt: Sequence[AnyMessage], response: Any, seconds: float) -> StepUsage:
+    """Usage of one model call"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        input_tokens, output_tokens = prompt_tokens(prompt), estimate_tokens(str(response.content))
+    cost = (
+        input_tokens * settings.CODEACT_INPUT_TOKEN_PRICE + output_tokens * settings.CODEACT_OUTPUT_TOKEN_PRICE
+    ) / 1_000_000
+    return StepUsage(node=node, input_tokens=input_tokens, output_tokens=output_tokens, seconds=seconds, cost=cost)
+
+
+def exceeded_budget(
+    usage: RunUsage,
+    now: float,
+    token_budget: Optional[int] = None,
+    wall_clock_budget: Optional[float] = None,
+    cost_budget: Optional[float] = None,
+) -> Optional[str]:
+    """Description of the first budget the run has used up, or None"""
+    if token_budget and usage.total_tokens >= token_budget:
+        return f"token budget ({usage.total_tokens:,} of {token_budget:,} tokens used)"
+    if wall_clock_budget and usage.started_at is not None and now - usage.started_at >= wall_clock_budget:
+        return f"time budget ({now - usage.started_at:,.0f} of {wall_clock_budget:,.0f} seconds used)"
+    if cost_budget and usage.cost >= cost_budget:
+        return f"cost budget ({usage.cost:,.4f} of {cost_budget:,.4f} used)"
+    return None
+
+
+def format_budget_notice(budget: str) -> str:
+    """Message asking the model for its final answer once a budget is used up"""
+    return (
+        f"Observation: This run has used up its {budget}. Do not write more code. "
+        f"Give your final answer now: summarize what you found, with the key results, and what remains undone."
+    )
@@ -0,0 +1,207 @@
+"""
+Cell Result Cache for CodeAct Agent
+
+Agents re-run the same loading and profiling cells after retries and across
+sessions on the same data. With the cache enabled, a cell whose result is
+already known is replayed instead of executed: its stdout is printed again and
+the variables it produced are restored from a content-addressed store.
+
+A result is keyed by the cell source, fingerprints of the variables it reads
+and the workspace constants it uses. Each entry also records the files the
+cell read, with their size and modification time, and is only replayed while
+those are unchanged. Relative and workspace paths are recorded relative to the
+workspace, so sessions with different workspaces never share file results.
+
+Only cells that look deterministic are cached: no random numbers or clocks, no
+plotting, no file writes and no I/O the sandbox cannot track (sockets,
+databases, ``pathlib``, subprocesses). Cells that mutate the variables they
+read in place are not cached either.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import threading
+import types
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+from .object_store import ObjectStore, private_directory, user_cache_dir
+from .schemas import VariableHandle
+
+
+# Cells referring to these names may give a different result on every run
+_NONDETERMINISTIC_NAMES = frozenset({
+    "random", "rand", "randn", "randint", "choice", "shuffle", "permutation", "sample", "default_rng",
+    "time", "perf_counter", "monotonic", "datetime", "now", "today", "utcnow", "Timestamp",
+    "uuid", "uuid1", "uuid4", "urandom", "input",
+})
+
+# Cells referring to these names have effects or inputs the cache cannot see
+_UNTRACKED_NAMES = frozenset({
+    "plt", "sns", "matplotlib", "seaborn", "pyplot", "plot", "figure", "savefig", "show",
+    "Path", "pathlib", "glob", "shutil", "subprocess", "system", "popen", "socket", "requests",
+    "urlopen", "httpx", "sqlite3", "connect", "read_sql", "read_sql_query", "read_sql_table", "to_sql", "sql_query",
+    "read_clipboard", "environ", "getenv", "exec", "eval", "globals", "setattr",
+})
+
+# Results holding more than this are cheaper to recompute than to store
+MAX_RESULT_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class CachedCell:
+    """Replayable result of one cell"""
+
+    output: str
+    variables: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    modules: Dict[str, str] = field(default_factory=dict)
+    deleted: List[str] = field(default_factory=list)
+    # [path, anchored at the workspace, fingerprint] of every file the cell read
+    files: List[list] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _file_fingerprint(path: str) -> Optional[List[int]]:
+    """Size and modification time of a file or directory; None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _anchor(path: str, workspace: Path) -> List[Any]:
+    """A path relative to the workspace when it lies inside it, otherwise absolute"""
+    absolute = Path(os.path.abspath(path))
+    if absolute.is_relative_to(workspace):
+        return [str(absolute.relative_to(workspace)), True]
+    return [str(absolute), False]
+
+
+class CellCache:
+    """Content-addressed cache of cell results, shared by every session using the same directory"""
+
+    def __init__(self, root: Path, min_seconds: float = 0.5, max_result_bytes: int = MAX_RESULT_BYTES):
+        # Cached variables are unpickled, so only the current user may write to the cache
+        self.root = private_directory(root)
+        self.entries_dir = self.root / "entries"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.store = ObjectStore(self.root / "objects")
+        self.min_seconds = min_seconds
+        self.max_result_bytes = max_result_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.saved_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> Optional["CellCache"]:
+        """The configured cache, or None when caching is disabled"""
+        if not settings.CODEACT_CELL_CACHE_ENABLED:
+            return None
+        root = settings.CODEACT_CELL_CACHE_DIR or user_cache_dir("cell-cache")
+        return cls(Path(root), min_seconds=settings.CODEACT_CELL_CACHE_MIN_SECONDS)
+
+    @staticmethod
+    def cacheable(referenced: Set[str]) -> bool:
+        """Whether a cell referring to these names (attributes included) may be cached"""
+        return not (referenced & _NONDETERMINISTIC_NAMES or referenced & _UNTRACKED_NAMES)
+
+    @staticmethod
+    def key(code: str, fingerprints: Dict[str, str]) -> str:
+        """Cache key of a cell from its source and the fingerprints of everything it reads"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(code.encode())
+        digest.update(json.dumps(sorted(fingerprints.items())).encode())
+        return digest.hexdigest()
+
+    def lookup(self, key: str, workspace: Path) -> Optional[CachedCell]:
+        """The cached result for a key, if every file it read is unchanged"""
+        entry = self._read(key)
+        if entry is not None:
+            for path, anchored, fingerprint in entry.files:
+                if _file_fingerprint(str(workspace / path) if anchored else path) != fingerprint:
+                    entry = None
+                    break
+            else:
+                if not all(self.store.contains(VariableHandle(**data)) for data in entry.variables.values()):
+                    entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def load(self, entry: CachedCell) -> Dict[str, Any]:
+        """Values of the variables a cached cell produced"""
+        values = {name: self.store.get(VariableHandle(**data)) for name, data in entry.variables.items()}
+        values.update((name, importlib.import_module(module)) for name, module in entry.modules.items())
+        return values
+
+    def record_replay(self, entry: CachedCell, replay_seconds: float):
+        with self._lock:
+            self.saved_seconds += max(entry.seconds - replay_seconds, 0.0)
+
+    def put(
+        self,
+        key: str,
+        output: str,
+        variables: Dict[str, Any],
+        deleted: Iterable[str],
+        files: Iterable[str],
+        workspace: Path,
+        seconds: float,
+    ) -> bool:
+        """Store a cell's result; False when it is not worth or not possible to cache"""
+        if seconds < self.min_seconds:
+            return False
+
+        entry = CachedCell(output=output, deleted=sorted(deleted), seconds=seconds)
+        size = 0
+        for name, value in variables.items():
+            if isinstance(value, types.ModuleType):
+                entry.modules[name] = value.__name__
+                continue
+            handle = self.store.put(name, value)
+            if not handle.stored:
+                return False  # Functions, connections, ...: the result cannot be restored
+            size += handle.size_bytes
+            if size > self.max_result_bytes:
+                return False
+            entry.variables[name] = handle.model_dump()
+
+        for path in sorted(files):
+            entry.files.append([*_anchor(path, workspace), _file_fingerprint(path)])
+
+        path = self.entries_dir / f"{key}.json"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(asdict(entry)), encoding="utf-8")
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stores += 1
+        return True
+
+    def _read(self, key: str) -> Optional[CachedCell]:
+        try:
+            return CachedCell(**json.loads((self.entries_dir / f"{key}.json").read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
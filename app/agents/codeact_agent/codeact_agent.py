@@ -4,27 +4,99 @@ CodeAct Agent Implementation using LangGraph
 Implements Thought-Code-Observation cycle with persistent execution context.
 """
 
+import asyncio
+import contextvars
+import functools
 import re
-from typing import Any, Dict, Optional
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command, RetryPolicy
 from langfuse.langchain import CallbackHandler
 
-from .execution_context import ExecutionContext
-from .schemas import CodeActState, CodeActConfig
+from app.core.config import settings
+
+from .execution_context import ExecutionContext, format_timeout_observation
+from .observation import CHARS_PER_TOKEN, truncate_middle
+from .kernel_pool import KernelPool, KernelSession
+from .session_registry import SessionRegistry, session_registry
+from .schemas import CodeActState, CodeActConfig, RunUsage, StepUsage, merge_usage
+from .accounting import exceeded_budget, format_budget_notice, model_step
+from .compaction import compacted_messages, format_summary, plan_compaction, prompt_tokens, summary_request
+from .speculation import CodeFenceScanner, SpeculativeCell, open_python_block
 from .prompts import CODEACT_SYSTEM
 
 
+# Extra time the async execution node waits for a cell to honour its own timeout
+EXECUTION_TIMEOUT_GRACE_SECONDS = 10.0
+
+# Finish reasons providers report when a response hit its output token budget
+_OUTPUT_LIMIT_REASONS = {"length", "max_tokens"}
+
+
+def format_truncation_observation(max_output_tokens: Optional[int]) -> str:
+    """Observation for a response cut off inside a code block, which is not run"""
+    limit = f" of {max_output_tokens:,} tokens" if max_output_tokens else ""
+    return (
+        f"Your response reached the output limit{limit} before its code block was closed, "
+        f"so the code was not run. Send the code again as a shorter cell, splitting long work across several steps."
+    )
+
+
 class CodeActAgent:
     """CodeAct Agent using LangGraph for autonomous code execution"""
     
-    def __init__(self, model, base_workspace_dir: str = "agent_workspace"):
+    def __init__(
+        self,
+        model,
+        base_workspace_dir: str = "agent_workspace",
+        registry: SessionRegistry = None,
+        kernel_pool: KernelPool = None,
+        execution_timeout: Optional[float] = settings.CODEACT_EXECUTION_TIMEOUT_SECONDS,
+        model_timeout: Optional[float] = settings.CODEACT_MODEL_TIMEOUT_SECONDS,
+        observation_max_tokens: Optional[int] = settings.CODEACT_OBSERVATION_MAX_TOKENS,
+        speculative_execution: bool = settings.CODEACT_SPECULATIVE_EXECUTION,
+        stop_sequences: Optional[List[str]] = settings.CODEACT_STOP_SEQUENCES,
+        max_output_tokens: Optional[int] = settings.CODEACT_MAX_OUTPUT_TOKENS,
+        compaction_threshold_tokens: Optional[int] = settings.CODEACT_COMPACTION_THRESHOLD_TOKENS,
+        compaction_keep_turns: int = settings.CODEACT_COMPACTION_KEEP_TURNS,
+        token_budget: Optional[int] = settings.CODEACT_TOKEN_BUDGET,
+        wall_clock_budget_seconds: Optional[float] = settings.CODEACT_WALL_CLOCK_BUDGET_SECONDS,
+        cost_budget: Optional[float] = settings.CODEACT_COST_BUDGET,
+    ):
         self.model = model
         self.base_workspace_dir = base_workspace_dir
+        # Live execution contexts are shared across cycles through the session registry
+        self.registry = registry if registry is not None else session_registry
+        # When set, cells run in pooled worker processes instead of this process
+        self.kernel_pool = kernel_pool
+        # Wall-clock limits per cell and per model call (overridable per run via configurable)
+        self.execution_timeout = execution_timeout
+        self.model_timeout = model_timeout
+        # Token budget for each observation fed back to the model
+        self.observation_max_tokens = observation_max_tokens
+        # Stream responses and run their first python block before the model has finished
+        self.speculative_execution = speculative_execution
+        # Speculative cells waiting for the execution node, by session
+        self._speculations: Dict[Hashable, SpeculativeCell] = {}
+        self._speculation_lock = threading.Lock()
+        # Responses end at the closing fence (or an invented observation) and within a token budget
+        self.stop_sequences = stop_sequences
+        self.max_output_tokens = max_output_tokens
+        # Past this prompt size, older turns are folded into a running summary
+        self.compaction_threshold_tokens = compaction_threshold_tokens
+        self.compaction_keep_turns = compaction_keep_turns
+        # A run past any of these budgets is asked for its final answer
+        self.token_budget = token_budget
+        self.wall_clock_budget_seconds = wall_clock_budget_seconds
+        self.cost_budget = cost_budget
         # Use the proper system prompt that includes framework document instructions
         system_prompt = CODEACT_SYSTEM
 
@@ -37,59 +109,128 @@ class CodeActAgent:
     def _create_graph(self) -> CompiledStateGraph:
         """Create the LangGraph StateGraph for CodeAct cycle"""
         
+        def start_node(state: CodeActState) -> Dict[str, Any]:
+            """Entry node: usage and budgets count from here, not from earlier runs on the thread"""
+            return {"usage": RunUsage(started_at=time.time()), "budget_exceeded": None}
+        
         def agent_node(state: CodeActState, config: RunnableConfig) -> Command:
             """Agent reasoning and code generation node"""
             
-            # Prepare messages with framework context if provided
-            messages = state.messages.copy()
+            budget = self._exceeded_budget(state, config, time.time())
+            if budget is not None:
+                # Out of budget: one last, short call for the final answer
+                prompt = self._format_prompt(state) + [HumanMessage(content=format_budget_notice(budget))]
+                started = time.perf_counter()
+                response = self._final_answer_model().invoke(prompt)
+                return self._final_answer(state, budget, prompt, response, time.perf_counter() - started)
             
-            # Add framework document context if provided
-            if state.framework_document_path:
-                # Convert to absolute path for the agent since execution context changes working directory
-                from pathlib import Path
-                abs_framework_path = Path(state.framework_document_path).resolve()
-                
-                framework_context = f"\n\n**Framework Document Available**: {abs_framework_path}\n" \
-                                  f"Read this document to understand the methodology you should follow."
+            # Long histories are folded into a running summary before the prompt is built
+            compaction, steps = self._compact_history(state, config)
+            if compaction:
+                state = state.model_copy(update=compaction)
+            
+            formatted_prompt = self._format_prompt(state)
+            model = self._model_for(config)
+            started = time.perf_counter()
+            
+            if not self._get_configurable(config, "speculative_execution", self.speculative_execution):
+                # Get model response
+                response = model.invoke(formatted_prompt)
                 
-                # Add framework context to the conversation
-                if messages and hasattr(messages[-1], 'content'):
-                    # Append to the last human message if it exists
-                    last_msg = messages[-1]
-                    if hasattr(last_msg, 'content'):
-                        from langchain_core.messages import HumanMessage
-                        enhanced_content = last_msg.content + framework_context
-                        messages[-1] = HumanMessage(content=enhanced_content)
-            
-            # Use prompt template to format messages
-            formatted_prompt = self.prompt_template.format_messages(
-                messages=messages
+                steps.append(model_step("model", formatted_prompt, response, time.perf_counter() - started))
+                return self._route_response(
+                    response, config, {**compaction, "usage": self._usage_delta(state, steps)}
+                )
+            
+            # A cell left over from an interrupted step never produced an observation
+            self._claim_speculation(config, None)
+            
+            # Stream the response, starting its first python block as soon as the fence closes
+            scanner, speculation, response = CodeFenceScanner(), None, None
+            try:
+                for chunk in model.stream(formatted_prompt):
+                    response = chunk if response is None else response + chunk
+                    if scanner.feed(chunk.text()) is not None:
+                        speculation = self._speculate(scanner.block, state, config)
+            except BaseException:
+                if speculation is not None:
+                    speculation.discard()
+                raise
+            
+            response = response or AIMessage(content="")
+            # A stop sequence on the closing fence ends the stream before the scanner sees the fence
+            if speculation is None and not self._hit_output_limit(response) and scanner.close() is not None:
+                speculation = self._speculate(scanner.block, state, config)
+            steps.append(model_step("model", formatted_prompt, response, time.perf_counter() - started))
+            command = self._route_response(
+                response, config, {**compaction, "usage": self._usage_delta(state, steps)}
             )
+            if speculation is not None and not self._keep_speculation(speculation, command, config):
+                speculation.discard()
+            return command
+        
+        async def aagent_node(state: CodeActState, config: RunnableConfig) -> Command:
+            """Async agent node; the model call gets a deadline instead of blocking a worker"""
             
-            # Get model response
-            response = self.model.invoke(formatted_prompt)
+            timeout = self._get_configurable(config, "model_timeout", self.model_timeout)
+            budget = self._exceeded_budget(state, config, time.time())
+            if budget is not None:
+                # Out of budget: one last, short call for the final answer
+                prompt = self._format_prompt(state) + [HumanMessage(content=format_budget_notice(budget))]
+                started = time.perf_counter()
+                response = await asyncio.wait_for(self._final_answer_model().ainvoke(prompt), timeout=timeout)
+                return self._final_answer(state, budget, prompt, response, time.perf_counter() - started)
             
-            # Extract code blocks from response
-            code = self._extract_code_blocks(response.content)
+            # Long histories are folded into a running summary before the prompt is built
+            compaction, steps = await self._acompact_history(state, config)
+            if compaction:
+                state = state.model_copy(update=compaction)
             
-            if code:
-                # If code found, go to execution
-                return Command(
-                    goto="execution",
-                    update={
-                        "messages": [AIMessage(content=response.content)],
-                        "script": code
-                    }
-                )
-            else:
-                # No code, end the cycle
-                return Command(
-                    goto=END,
-                    update={
-                        "messages": [AIMessage(content=response.content)],
-                        "script": None
-                    }
+            formatted_prompt = self._format_prompt(state)
+            model = self._model_for(config)
+            started = time.perf_counter()
+            
+            if not self._get_configurable(config, "speculative_execution", self.speculative_execution):
+                # Get model response without holding an event-loop worker thread
+                response = await asyncio.wait_for(model.ainvoke(formatted_prompt), timeout=timeout)
+                
+                steps.append(model_step("model", formatted_prompt, response, time.perf_counter() - started))
+                return self._route_response(
+                    response, config, {**compaction, "usage": self._usage_delta(state, steps)}
                 )
+            
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._claim_speculation, config, None)
+            
+            scanner, speculations = CodeFenceScanner(), []
+            
+            async def generate():
+                response = None
+                async for chunk in model.astream(formatted_prompt):
+                    response = chunk if response is None else response + chunk
+                    if scanner.feed(chunk.text()) is not None:
+                        speculations.append(self._speculate(scanner.block, state, config))
+                return response
+            
+            # The deadline covers the whole stream; a cell started before it passed is discarded
+            try:
+                response = await asyncio.wait_for(generate(), timeout=timeout)
+            except BaseException:
+                for speculation in speculations:
+                    await loop.run_in_executor(None, speculation.discard)
+                raise
+            
+            response = response or AIMessage(content="")
+            if not speculations and not self._hit_output_limit(response) and scanner.close() is not None:
+                speculations.append(self._speculate(scanner.block, state, config))
+            steps.append(model_step("model", formatted_prompt, response, time.perf_counter() - started))
+            command = self._route_response(
+                response, config, {**compaction, "usage": self._usage_delta(state, steps)}
+            )
+            for speculation in speculations:
+                if not self._keep_speculation(speculation, command, config):
+                    await loop.run_in_executor(None, speculation.discard)
+            return command
         
         def execution_node(state: CodeActState, config: RunnableConfig) -> Dict[str, Any]:
             """Code execution node with persistent context"""
@@ -99,33 +240,101 @@ class CodeActAgent:
             
             # Get session-based workspace
             execution_context = self._get_session_context(config, state.framework_document_path)
+            started = time.perf_counter()
+            speculation = self._claim_speculation(config, state.script)
             
-            # Execute code in persistent context
-            output, new_context = execution_context.execute_code(
-                state.script,
-                state.context
-            )
+            # Execute code in persistent context; state only carries variable handles
+            try:
+                if speculation is not None:
+                    # The agent node started this cell while the model was still streaming
+                    output, new_context = speculation.result()
+                else:
+                    output, new_context = execution_context.run_cell(
+                        state.script,
+                        state.context,
+                        self._get_configurable(config, "execution_timeout", self.execution_timeout),
+                        self._get_configurable(config, "observation_max_tokens", self.observation_max_tokens),
+                        self._output_writer()
+                    )
+            except Exception:
+                # A retry must start from the pre-cell state, not a half-mutated namespace
+                execution_context.undo_last_cell()
+                raise
+            
+            step = StepUsage(node="execution", seconds=time.perf_counter() - started)
+            return self._execution_update(output, new_context, self._usage_delta(state, [step]))
+        
+        async def aexecution_node(state: CodeActState, config: RunnableConfig) -> Dict[str, Any]:
+            """Async execution node that runs the cell off the event loop under a deadline"""
             
-            # Update state with execution results
-            observation_msg = HumanMessage(
-                content=f"Observation: {output}"
+            if not state.script:
+                return {"messages": []}
+            
+            loop = asyncio.get_running_loop()
+            timeout = self._get_configurable(config, "execution_timeout", self.execution_timeout)
+            max_output_tokens = self._get_configurable(config, "observation_max_tokens", self.observation_max_tokens)
+            
+            # Session setup touches the filesystem, so it runs on the executor too
+            execution_context = await loop.run_in_executor(
+                None, self._get_session_context, config, state.framework_document_path
             )
+            started = time.perf_counter()
+            speculation = await loop.run_in_executor(None, self._claim_speculation, config, state.script)
             
-            return {
-                "messages": [observation_msg],
-                "context": new_context
-            }
+            # The context interrupts the cell itself at the timeout; the outer deadline only
+            # covers cells stuck in native code that cannot be interrupted
+            printed = []
+            if speculation is not None:
+                # The agent node started this cell while the model was still streaming
+                future = asyncio.wrap_future(speculation.future)
+            else:
+                future = loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        execution_context.run_cell,
+                        state.script,
+                        state.context,
+                        timeout,
+                        max_output_tokens,
+                        self._output_writer(printed)
+                    )
+                )
+            try:
+                output, new_context = await asyncio.wait_for(
+                    future, timeout=timeout + EXECUTION_TIMEOUT_GRACE_SECONDS if timeout else None
+                )
+            except asyncio.TimeoutError:
+                # Stop the cell so it does not keep the session busy, and keep what it printed so far
+                execution_context.cancel()
+                max_chars = max_output_tokens * CHARS_PER_TOKEN if max_output_tokens is not None else None
+                output = f"{truncate_middle(''.join(printed), max_chars)}\n{format_timeout_observation(timeout)}"
+                new_context = {}
+            except asyncio.CancelledError:
+                # The run was cancelled (e.g. by a client watching the output); stop the cell too
+                execution_context.cancel()
+                raise
+            except Exception:
+                # A retry must start from the pre-cell state, not a half-mutated namespace
+                await loop.run_in_executor(None, execution_context.undo_last_cell)
+                raise
+            
+            step = StepUsage(node="execution", seconds=time.perf_counter() - started)
+            return self._execution_update(output, new_context, self._usage_delta(state, [step]))
         
         # Build the graph with config schema
         graph = StateGraph(state_schema=CodeActState, config_schema=CodeActConfig)
         retry_policy = RetryPolicy(max_attempts=3)
         
-        graph.add_node("agent", agent_node, retry=retry_policy)
-        graph.add_node("execution", execution_node, retry=retry_policy)
+        graph.add_node("start", start_node)
+        
+        # Each node has a sync and an async implementation so the graph serves invoke and ainvoke
+        graph.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node, name="agent"), retry=retry_policy)
+        graph.add_node("execution", RunnableLambda(execution_node, afunc=aexecution_node, name="execution"), retry=retry_policy)
         
         # Add edges - the agent node uses Command routing
         # so we don't need to define outgoing edges for it
-        graph.set_entry_point("agent")
+        graph.set_entry_point("start")
+        graph.add_edge("start", "agent")
         graph.add_edge("execution", "agent")
         
         # Compile the graph (callbacks disabled for testing)
@@ -135,8 +344,264 @@ class CodeActAgent:
 
         return compiled_graph
     
-    def _get_session_context(self, config: RunnableConfig, framework_document_path: str = None) -> ExecutionContext:
-        """Get or create session-based execution context"""
+    def _format_prompt(self, state: CodeActState) -> list:
+        """Build the model prompt from state, adding framework document context"""
+        
+        # Prepare messages with framework context if provided; older turns may be summarized
+        messages = compacted_messages(state.messages, state.history_summary, state.summary_through)
+        
+        # Add framework document context if provided
+        if state.framework_document_path:
+            # Give the agent an absolute path; it does not depend on any working directory
+            abs_framework_path = Path(state.framework_document_path).resolve()
+            
+            framework_context = f"\n\n**Framework Document Available**: {abs_framework_path}\n" \
+                              f"Read this document to understand the methodology you should follow."
+            
+            # Add framework context to the conversation
+            if messages and hasattr(messages[-1], 'content'):
+                # Append to the last human message if it exists
+                last_msg = messages[-1]
+                if hasattr(last_msg, 'content'):
+                    enhanced_content = last_msg.content + framework_context
+                    messages[-1] = HumanMessage(content=enhanced_content)
+        
+        # Use prompt template to format messages
+        return self.prompt_template.format_messages(
+            messages=messages
+        )
+    
+    def _compaction_cut(self, state: CodeActState, config: RunnableConfig) -> Optional[int]:
+        """Where verbatim history should resume, if the prompt has outgrown the compaction threshold"""
+        threshold = self._get_configurable(config, "compaction_threshold_tokens", self.compaction_threshold_tokens)
+        if not threshold or prompt_tokens(self._format_prompt(state)) <= threshold:
+            return None
+        return plan_compaction(state.messages, state.summary_through, self.compaction_keep_turns)
+    
+    def _compact_history(self, state: CodeActState, config: RunnableConfig) -> Tuple[Dict[str, Any], List[StepUsage]]:
+        """State updates folding older turns into the running summary (none below the threshold), and the summary call's usage"""
+        cut = self._compaction_cut(state, config)
+        if cut is None:
+            return {}, []
+        
+        folded = state.messages[max(state.summary_through, 1):cut]
+        request = summary_request(state.history_summary, folded)
+        started = time.perf_counter()
+        summary = self._summary_model().invoke(request)
+        step = model_step("summary", request, summary, time.perf_counter() - started)
+        variables = self._get_session_context(config, state.framework_document_path).get_available_variables()
+        return {"history_summary": format_summary(summary.content, variables), "summary_through": cut}, [step]
+    
+    async def _acompact_history(self, state: CodeActState, config: RunnableConfig) -> Tuple[Dict[str, Any], List[StepUsage]]:
+        """Async counterpart of ``_compact_history``"""
+        cut = self._compaction_cut(state, config)
+        if cut is None:
+            return {}, []
+        
+        folded = state.messages[max(state.summary_through, 1):cut]
+        request = summary_request(state.history_summary, folded)
+        started = time.perf_counter()
+        summary = await asyncio.wait_for(
+            self._summary_model().ainvoke(request),
+            timeout=self._get_configurable(config, "model_timeout", self.model_timeout)
+        )
+        step = model_step("summary", request, summary, time.perf_counter() - started)
+        loop = asyncio.get_running_loop()
+        execution_context = await loop.run_in_executor(
+            None, self._get_session_context, config, state.framework_document_path
+        )
+        variables = await loop.run_in_executor(None, execution_context.get_available_variables)
+        return {"history_summary": format_summary(summary.content, variables), "summary_through": cut}, [step]
+    
+    def _summary_model(self):
+        """The chat model bound to the output budget for history summaries"""
+        return self.model.bind(max_tokens=settings.CODEACT_COMPACTION_SUMMARY_MAX_TOKENS)
+    
+    def _final_answer_model(self):
+        """The chat model bound to the output budget for the final answer of a run out of budget"""
+        return self.model.bind(max_tokens=settings.CODEACT_BUDGET_ANSWER_MAX_TOKENS)
+    
+    def _model_for(self, config: RunnableConfig):
+        """The chat model with the run's stop sequences and output token budget bound"""
+        bound = {}
+        stop_sequences = self._get_configurable(config, "stop_sequences", self.stop_sequences)
+        if stop_sequences:
+            bound["stop"] = list(stop_sequences)
+        max_output_tokens = self._get_configurable(config, "max_output_tokens", self.max_output_tokens)
+        if max_output_tokens:
+            bound["max_tokens"] = max_output_tokens
+        return self.model.bind(**bound) if bound else self.model
+    
+    def _route_response(self, response, config: RunnableConfig, updates: Optional[Dict[str, Any]] = None) -> Command:
+        """Send the model response to execution if it contains code, otherwise finish"""
+        
+        # Extra state updates of the step, such as a new history summary
+        updates = updates or {}
+        content = response.content
+        if self._open_code_block(content) is not None:
+            if self._hit_output_limit(response):
+                # The code was cut off mid-cell; ask for it again instead of running a fragment
+                max_output_tokens = self._get_configurable(config, "max_output_tokens", self.max_output_tokens)
+                return Command(
+                    goto="agent",
+                    update={
+                        "messages": [
+                            AIMessage(content=content),
+                            HumanMessage(content=f"Observation: {format_truncation_observation(max_output_tokens)}")
+                        ],
+                        "script": None,
+                        **updates
+                    }
+                )
+            # The stop sequence consumed the closing fence; restore it so history stays well-formed
+            content = content.rstrip() + "\n```"
+        
+        # Extract code blocks from response
+        code = self._extract_code_blocks(content)
+        
+        if code:
+            # If code found, go to execution
+            return Command(
+                goto="execution",
+                update={
+                    "messages": [AIMessage(content=content)],
+                    "script": code,
+                    **updates
+                }
+            )
+        else:
+            # No code, end the cycle
+            return Command(
+                goto=END,
+                update={
+                    "messages": [AIMessage(content=content)],
+                    "script": None,
+                    **updates
+                }
+            )
+    
+    def _hit_output_limit(self, response) -> bool:
+        """Whether the provider reports the response as cut off by its output token budget"""
+        metadata = getattr(response, "response_metadata", None) or {}
+        reason = metadata.get("finish_reason") or metadata.get("stop_reason")
+        return str(reason).lower() in _OUTPUT_LIMIT_REASONS
+    
+    def _execution_update(self, output: str, new_context: Dict[str, Any], usage: RunUsage) -> Dict[str, Any]:
+        """State update carrying the observation of an executed cell"""
+        
+        # Update state with execution results
+        observation_msg = HumanMessage(
+            content=f"Observation: {output}"
+        )
+        
+        return {
+            "messages": [observation_msg],
+            "context": new_context,
+            "usage": usage
+        }
+    
+    def _usage_delta(self, state: CodeActState, steps: List[StepUsage]) -> RunUsage:
+        """Totals of a node's steps; each step is streamed with the run's new totals, state keeps only the totals"""
+        emit_event = self._event_writer()
+        total = state.usage
+        for step in steps:
+            total = merge_usage(total, RunUsage.of(step))
+            emit_event({"type": "usage", "step": step.model_dump(), "total": total.model_dump()})
+        return RunUsage.of(*steps)
+    
+    def _exceeded_budget(self, state: CodeActState, config: RunnableConfig, now: float) -> Optional[str]:
+        """The budget the run has used up, if any"""
+        return exceeded_budget(
+            state.usage,
+            now,
+            token_budget=self._get_configurable(config, "token_budget", self.token_budget),
+            wall_clock_budget=self._get_configurable(config, "wall_clock_budget_seconds", self.wall_clock_budget_seconds),
+            cost_budget=self._get_configurable(config, "cost_budget", self.cost_budget),
+        )
+    
+    def _final_answer(
+        self, state: CodeActState, budget: str, prompt: list, response, seconds: float
+    ) -> Command:
+        """End the run with the answer the model gave once its budget was used up"""
+        step = model_step("final_answer", prompt, response, seconds)
+        return Command(
+            goto=END,
+            update={
+                "messages": [prompt[-1], AIMessage(content=response.content)],
+                "script": None,
+                "budget_exceeded": budget,
+                "usage": self._usage_delta(state, [step])
+            }
+        )
+    
+    def _output_writer(self, printed: Optional[List[str]] = None) -> Callable[[str], None]:
+        """Callback forwarding live cell output to the graph's custom stream channel, and to ``printed`` if given"""
+        emit_event = self._event_writer()
+        
+        def emit(chunk: str):
+            if printed is not None:
+                printed.append(chunk)
+            emit_event({"type": "execution_output", "chunk": chunk})
+        
+        return emit
+    
+    def _event_writer(self) -> Callable[[Dict[str, Any]], None]:
+        """Callback writing events to the graph's custom stream channel from any thread"""
+        writer = get_stream_writer()
+        # Events are emitted from executor and timer threads; the writer needs the node's context
+        node_context = contextvars.copy_context()
+        
+        def emit(event: Dict[str, Any]):
+            node_context.copy().run(writer, event)
+        
+        return emit
+    
+    def _speculate(self, code: str, state: CodeActState, config: RunnableConfig) -> SpeculativeCell:
+        """Start a code block in the run's session before the model has finished its response"""
+        emit_event = self._event_writer()
+        on_output = self._output_writer()
+        
+        def run(execution_context):
+            return execution_context.run_cell(
+                code,
+                state.context,
+                self._get_configurable(config, "execution_timeout", self.execution_timeout),
+                self._get_configurable(config, "observation_max_tokens", self.observation_max_tokens),
+                on_output
+            )
+        
+        return SpeculativeCell(
+            code,
+            functools.partial(self._get_session_context, config, state.framework_document_path),
+            run,
+            # Clients showing the cell's live output learn that it did not count
+            on_discard=lambda: emit_event({"type": "speculative_cell_discarded", "code": code})
+        )
+    
+    def _keep_speculation(self, speculation: SpeculativeCell, command: Command, config: RunnableConfig) -> bool:
+        """Hand a speculative cell to the execution node if the response's script is exactly its block"""
+        if command.update.get("script") != speculation.code:
+            return False
+        with self._speculation_lock:
+            self._speculations[self._session_key(config)] = speculation
+        return True
+    
+    def _claim_speculation(self, config: RunnableConfig, script: Optional[str]) -> Optional[SpeculativeCell]:
+        """Take the session's speculative cell if it ran ``script``; any other one is discarded"""
+        with self._speculation_lock:
+            speculation = self._speculations.pop(self._session_key(config), None)
+        if speculation is not None and speculation.code != script:
+            speculation.discard()
+            return None
+        return speculation
+    
+    def _get_configurable(self, config: RunnableConfig, key: str, default: Any) -> Any:
+        """Per-run override from the configurable section, falling back to the agent default"""
+        value = config.get("configurable", {}).get(key)
+        return value if value is not None else default
+    
+    def _session_key(self, config: RunnableConfig) -> Tuple[str, str]:
+        """Registry key of the run's session: the user and the workspace name or session id"""
         configurable = config.get("configurable", {})
         
         # Get session identifier (thread_id from LangGraph Studio or custom session_id)
@@ -149,17 +614,64 @@ class CodeActAgent:
         # Get user identifier for multi-user support
         user_id = configurable.get("user_id", "anonymous")
         
-        # Get custom workspace name
-        workspace_name = configurable.get("workspace_name")
+        return user_id, configurable.get("workspace_name") or session_id
+    
+    def _get_session_context(self, config: RunnableConfig, framework_document_path: str = None) -> Union[ExecutionContext, KernelSession]:
+        """Get or create session-based execution context"""
+        session_key = self._session_key(config)
+        user_id, session_name = session_key
         
-        # Create session-specific workspace directory
-        if workspace_name:
-            workspace_dir = f"{self.base_workspace_dir}/{workspace_name}"
+        # Create session-specific workspace directory (a custom workspace name is used as is)
+        if config.get("configurable", {}).get("workspace_name"):
+            workspace_dir = f"{self.base_workspace_dir}/{session_name}"
         else:
-            workspace_dir = f"{self.base_workspace_dir}/{user_id}_{session_id}"
+            workspace_dir = f"{self.base_workspace_dir}/{user_id}_{session_name}"
+        
+        # Pin the session to a pooled kernel process when the pool is enabled
+        if self.kernel_pool is not None:
+            return self.kernel_pool.session(session_key, workspace_dir, framework_document_path)
         
-        # Return execution context for this session
-        return ExecutionContext(workspace_dir, framework_document_path)
+        # Reuse the live execution context for this session, creating it on first use
+        context = self.registry.get_or_create(
+            session_key,
+            lambda: ExecutionContext(workspace_dir, framework_document_path)
+        )
+        context.set_framework_document(framework_document_path)
+        return context
+    
+    def undo_last_step(self, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Revert a session's kernel to its state before the last executed cell
+        
+        Returns:
+            Handle updates for the ``context`` state field (None removes a
+            variable), or None if the session has no cell to undo
+        """
+        execution_context = self._get_session_context({"configurable": config.get("configurable", {})})
+        return execution_context.undo_last_cell()
+    
+    def _open_code_block(self, content: str) -> Optional[str]:
+        """Code of a trailing python block, or bare block that looks like Python, whose closing fence never arrived"""
+        code = open_python_block(content)
+        if code is None:
+            code = self._open_bare_block(content)
+        return code
+    
+    def _open_bare_block(self, content: str) -> Optional[str]:
+        """Code of a trailing ``` block without a language whose closing fence never arrived, if any"""
+        
+        # An odd number of fences leaves the last one open
+        start = content.rfind("```")
+        if start == -1 or content.count("```") % 2 == 0 or not content.startswith("```\n", start):
+            return None
+        code = content[start + len("```\n"):]
+        if not code.strip() or not self._looks_like_python(code):
+            return None
+        return code.rstrip()
+    
+    def _looks_like_python(self, code: str) -> bool:
+        """Whether code from a fence without a language is worth running as Python"""
+        return any(keyword in code for keyword in ['import', 'def', 'print', '='])
     
     def _extract_code_blocks(self, content: str) -> Optional[str]:
         """Extract and combine Python code blocks from agent response"""
@@ -168,35 +680,38 @@ class CodeActAgent:
         pattern = r'```python\n(.*?)\n```'
         matches = re.findall(pattern, content, re.DOTALL)
         
+        # A stop sequence on the closing fence leaves the last block unterminated
+        open_block = open_python_block(content)
+        if open_block is not None:
+            matches.append(open_block)
+        
         if matches:
             # Combine all code blocks
             combined_code = '\n\n'.join(matches)
             return combined_code
         
-        # Also try generic ``` blocks
+        # Also try generic ``` blocks, including one the stop sequence left open
         pattern = r'```\n(.*?)\n```'
         matches = re.findall(pattern, content, re.DOTALL)
+        open_block = self._open_bare_block(content)
+        if open_block is not None:
+            matches.append(open_block)
         
         if matches:
             # Check if it looks like Python code
             combined_code = '\n\n'.join(matches)
-            if any(keyword in combined_code for keyword in ['import', 'def', 'print', '=']):
+            if self._looks_like_python(combined_code):
                 return combined_code
         
         return None
     
-    def run(self, task: str, framework_document_path: str = None, config: Dict[str, Any] = None, recursion_limit: int = 5) -> Dict[str, Any]:
-        """Run the CodeAct agent on a task"""
-        
-        # Merge recursion limit with provided config
-        run_config = {"recursion_limit": recursion_limit}
-        if config:
-            run_config.update(config)
+    def _initial_state(self, task: str, framework_document_path: str, run_config: Dict[str, Any]) -> CodeActState:
+        """Build the initial graph state for a task"""
         
         # Get session context for initial state
         session_context = self._get_session_context({"configurable": run_config.get("configurable", {})}, framework_document_path)
         
-        initial_state = CodeActState(
+        return CodeActState(
             messages=[HumanMessage(content=task)],
             script=None,
             context=session_context.get_context(),
@@ -204,6 +719,16 @@ class CodeActAgent:
             current_task=task,
             report_sections=[]
         )
+    
+    def run(self, task: str, framework_document_path: str = None, config: Dict[str, Any] = None, recursion_limit: int = 5) -> Dict[str, Any]:
+        """Run the CodeAct agent on a task"""
+        
+        # Merge recursion limit with provided config; the start node takes one more step
+        run_config = {"recursion_limit": recursion_limit + 1}
+        if config:
+            run_config.update(config)
+        
+        initial_state = self._initial_state(task, framework_document_path, run_config)
         
         # Run the graph with session-aware configuration
         final_state = self.graph.invoke(initial_state, config=run_config)
@@ -211,10 +736,40 @@ class CodeActAgent:
         return {
             "messages": final_state["messages"],
             "context": final_state["context"],
+            "usage": final_state["usage"],
+            "final_state": final_state
+        }
+    
+    async def arun(self, task: str, framework_document_path: str = None, config: Dict[str, Any] = None, recursion_limit: int = 5) -> Dict[str, Any]:
+        """Run the CodeAct agent on a task using the async graph nodes"""
+        
+        # Merge recursion limit with provided config; the start node takes one more step
+        run_config = {"recursion_limit": recursion_limit + 1}
+        if config:
+            run_config.update(config)
+        
+        loop = asyncio.get_running_loop()
+        initial_state = await loop.run_in_executor(
+            None, self._initial_state, task, framework_document_path, run_config
+        )
+        
+        # Run the graph with session-aware configuration
+        final_state = await self.graph.ainvoke(initial_state, config=run_config)
+        
+        return {
+            "messages": final_state["messages"],
+            "context": final_state["context"],
+            "usage": final_state["usage"],
             "final_state": final_state
         }
 
 
-def create_codeact_agent(model, base_workspace_dir: str = "agent_workspace") -> CodeActAgent:
+def create_codeact_agent(
+    model,
+    base_workspace_dir: str = "agent_workspace",
+    registry: SessionRegistry = None,
+    kernel_pool: KernelPool = None,
+    **kwargs
+) -> CodeActAgent:
     """Factory function to create a CodeAct agent"""
-    return CodeActAgent(model, base_workspace_dir)
\ No newline at end of file
+    return CodeActAgent(model, base_workspace_dir, registry, kernel_pool, **kwargs)
\ No newline at end of file
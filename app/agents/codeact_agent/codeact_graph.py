@@ -4,17 +4,23 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import RetryPolicy
 
+from app.core.config import settings
+
 from .codeact_agent import CodeActAgent
+from .kernel_pool import get_kernel_pool
 
 
 def compile_codeact_graph() -> CompiledStateGraph:
     """Compile the CodeAct graph for LangGraph Studio"""
     
-    # Create model (will use environment variables for API key)
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    # Create model (will use environment variables for API key); streamed responses report token usage
+    model = ChatOpenAI(model="gpt-4o-mini", temperature=0, stream_usage=True)
+    
+    # Warm the kernel pool at startup so the first cell does not pay the import cost
+    kernel_pool = get_kernel_pool() if settings.CODEACT_KERNEL_POOL_ENABLED else None
     
     # Create agent with session-based workspaces
-    agent = CodeActAgent(model, "studio_workspace")
+    agent = CodeActAgent(model, "studio_workspace", kernel_pool=kernel_pool)
     
     # Return the compiled graph (session contexts created dynamically)
     return agent.graph
\ No newline at end of file
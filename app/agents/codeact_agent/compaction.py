@@ -0,0 +1,76 @@
+"""
+History Compaction for CodeAct Agent
+
+Every agent step sends the whole conversation, so prompt size grows with each
+cell and the cost of a session grows quadratically. Once the estimated prompt
+passes ``CODEACT_COMPACTION_THRESHOLD_TOKENS``, the older Thought/Code/
+Observation turns are folded into a running summary written by the model,
+followed by the live variables of the session's kernel. The prompt becomes:
+
+    system prompt | task + summary of earlier steps | recent turns, verbatim
+
+Each compaction folds everything but the last ``CODEACT_COMPACTION_KEEP_TURNS``
+turns, so it runs rarely, and between compactions the prompt prefix stays
+byte-identical for provider prefix caching. ``state.messages`` keeps the full
+transcript; only the prompt is compacted.
+"""
+
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+
+from .observation import estimate_tokens
+from .prompts import HISTORY_SUMMARY
+
+
+# Rough per-message cost of roles and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADING = "## Progress so far (earlier steps, summarized)"
+
+
+def prompt_tokens(messages: Sequence[AnyMessage]) -> int:
+    """Estimated token count of a prompt"""
+    return sum(estimate_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def plan_compaction(messages: Sequence[AnyMessage], summary_through: int, keep_turns: int) -> Optional[int]:
+    """
+    Index where verbatim history resumes after folding older turns into the summary
+
+    Turns start at the model's messages; the task (the first message) is never
+    folded. Returns None when no turn beyond the summary is old enough to fold.
+    """
+    turn_starts = [index for index, message in enumerate(messages) if index and isinstance(message, AIMessage)]
+    if len(turn_starts) <= keep_turns:
+        return None
+    cut = turn_starts[-keep_turns] if keep_turns else len(messages)
+    return cut if cut > max(summary_through, 1) else None
+
+
+def summary_request(previous_summary: Optional[str], messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+    """Model input that extends the running summary with the turns being folded"""
+    transcript = "\n\n".join(
+        f"Assistant:\n{message.content}" if isinstance(message, AIMessage) else str(message.content)
+        for message in messages
+    )
+    previous = previous_summary or "(none; these are the first steps)"
+    return [
+        SystemMessage(content=HISTORY_SUMMARY),
+        HumanMessage(content=f"Previous summary:\n{previous}\n\nNew steps:\n{transcript}"),
+    ]
+
+
+def format_summary(summary: str, variables: str) -> str:
+    """Summary block of the prompt: the model's summary and the variables live when it was written"""
+    return f"{SUMMARY_HEADING}\n{summary.strip()}\n\n{variables}"
+
+
+def compacted_messages(
+    messages: Sequence[AnyMessage], summary: Optional[str], summary_through: int
+) -> List[AnyMessage]:
+    """Conversation as the prompt sends it: the task with the summary, then the turns after it"""
+    if not summary or not messages:
+        return list(messages)
+    task = messages[0]
+    return [HumanMessage(content=f"{task.content}\n\n{summary}"), *messages[summary_through:]]
@@ -7,19 +7,178 @@ Manages Python execution environment with persistent variables and state.
 import sys
 import io
 import os
+import contextlib
+import copy
+import ctypes
+import dataclasses
+import errno
+import functools
+import importlib
+import json
+import threading
+import time
 import traceback
+import types
 from pathlib import Path
-from typing import Any, Dict, Tuple
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+from .cell_cache import CachedCell, CellCache
+from .chunked import (
+    chunked_groupby, chunked_null_counts, chunked_nunique, chunked_out_of_range, chunked_quantiles,
+    chunked_top_values, chunked_value_ranges, read_chunks
+)
+from .isolation import SessionIO, imported_module, install, session_scope, tracking_import, workspace_open
+from .lazy_modules import LazyModule, import_report
+from .load_cache import get_load_cache, load_data
+from .namespace import SessionNamespace, input_names, referenced_names
+from .object_store import ObjectStore, content_hash, describe
+from .profiling import profile_data
+from .rules import RuleSet, check_rules
+from .resource_limits import (
+    CellBudget,
+    CpuLimitExceeded,
+    ResourceLimitExceeded,
+    ResourceLimits,
+    SessionUsage,
+    format_limit_observation,
+    process_limits,
+)
+from .observation import (
+    CHARS_PER_TOKEN,
+    BoundedOutput,
+    OutputStreamer,
+    compact_display,
+    observation_print,
+    truncate_middle,
+)
+from .schemas import VariableHandle
+from .sketches import CountMinSketch, HyperLogLog, KLLSketch, merge_sketches
+from .sql import SqlSession
+
+
+# Per-session resident memory budget; unset means variables are never spilled
+DEFAULT_MEMORY_BUDGET_BYTES = (
+    int(settings.CODEACT_SESSION_MEMORY_BUDGET_MB * 1024 * 1024)
+    if settings.CODEACT_SESSION_MEMORY_BUDGET_MB else None
+)
+
+# Data a cell reads is copied up to this size before it runs, so undo can revert in-place mutations
+DEFAULT_UNDO_COPY_MAX_BYTES = (
+    int(settings.CODEACT_UNDO_COPY_MAX_MB * 1024 * 1024)
+    if settings.CODEACT_UNDO_COPY_MAX_MB else None
+)
+
+# Per-observation token budget for captured output; unset keeps everything
+DEFAULT_OBSERVATION_MAX_TOKENS = settings.CODEACT_OBSERVATION_MAX_TOKENS
+
+# Minimum seconds between live output chunks of a running cell
+STREAM_INTERVAL_SECONDS = settings.CODEACT_STREAM_INTERVAL_SECONDS
+
+# How often an in-process cell's CPU clock is checked against its limit
+CPU_POLL_SECONDS = 0.1
+
+
+def _isolate(module: types.ModuleType):
+    """Route a freshly imported library through per-session isolation"""
+    install()
+
+
+# Data science libraries of the sandbox namespace, imported on first use
+_PANDAS = LazyModule("pandas", on_load=_isolate)
+_NUMPY = LazyModule("numpy", on_load=_isolate)
+_PYPLOT = LazyModule("matplotlib.pyplot", on_load=_isolate)
+_SEABORN = LazyModule("seaborn", on_load=_isolate)
+
+
+class CellTimeoutError(BaseException):
+    """Raised inside a running cell once it exceeds its wall-clock timeout
+    
+    Derives from BaseException so a broad ``except Exception`` in agent code
+    cannot swallow the interrupt.
+    """
+
+
+class CellCancelledError(BaseException):
+    """Raised inside a running cell when the run waiting on it is cancelled"""
+
+
+def _set_async_exc(thread_id: int, exc: Optional[type]):
+    """Schedule (or, with None, cancel) an exception in another thread"""
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id),
+        ctypes.py_object(exc) if exc is not None else None
+    )
+
+
+class _CellWatchdog:
+    """Interrupts the executing thread when a cell times out, exceeds its CPU limit or is cancelled"""
+    
+    def __init__(self, timeout: Optional[float], cpu_seconds: Optional[float] = None):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.fired = False
+        self._thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+        self._running = False
+        self._timer = None
+        self._stopped = threading.Event()
+    
+    def __enter__(self):
+        self._running = True
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self.interrupt)
+            self._timer.daemon = True
+            self._timer.start()
+        if self.cpu_seconds is not None and hasattr(time, "pthread_getcpuclockid"):
+            threading.Thread(target=self._watch_cpu, daemon=True).start()
+        return self
+    
+    def _watch_cpu(self):
+        """Poll the cell thread's own CPU clock; other threads of the process do not count"""
+        clock = time.pthread_getcpuclockid(self._thread_id)
+        deadline = time.clock_gettime(clock) + self.cpu_seconds
+        while not self._stopped.wait(CPU_POLL_SECONDS):
+            if time.clock_gettime(clock) >= deadline:
+                self.interrupt(CpuLimitExceeded)
+                return
+    
+    def interrupt(self, exc: type = CellTimeoutError) -> bool:
+        """Raise ``exc`` in the cell unless it already finished or was interrupted"""
+        with self._lock:
+            if not self._running or self.fired:
+                return False
+            self.fired = True
+            _set_async_exc(self._thread_id, exc)
+            return True
+    
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._stopped.set()
+        with self._lock:
+            self._running = False
+            if self.fired:
+                # The cell finished before the interrupt was delivered; drop it
+                _set_async_exc(self._thread_id, None)
+        return False
 
 
 class ExecutionContext:
     """Manages persistent Python execution environment"""
     
-    def __init__(self, workspace_dir: str = None, framework_document_path: str = None):
+    def __init__(
+        self,
+        workspace_dir: str = None,
+        framework_document_path: str = None,
+        memory_budget_bytes: Optional[int] = DEFAULT_MEMORY_BUDGET_BYTES,
+        undo_copy_max_bytes: Optional[int] = DEFAULT_UNDO_COPY_MAX_BYTES,
+        observation_max_tokens: Optional[int] = DEFAULT_OBSERVATION_MAX_TOKENS,
+        limits: Optional[ResourceLimits] = None,
+        isolated: bool = False,
+        cell_cache: Optional[CellCache] = None
+    ):
         """Initialize execution context with data science libraries and workspace"""
         
         # Set up workspace directory
@@ -35,23 +194,29 @@ class ExecutionContext:
         (self.workspace_path / "visualizations").mkdir(parents=True, exist_ok=True)
         (self.workspace_path / "reports").mkdir(parents=True, exist_ok=True)
         
-        # Change working directory to workspace
-        self.original_cwd = os.getcwd()
-        os.chdir(self.workspace_path)
-        
-        self.globals_dict = {
-            # Standard libraries
-            'pd': pd,
-            'pandas': pd,
-            'np': np,
-            'numpy': np,
-            'plt': plt,
-            'matplotlib': plt,
-            'sns': sns,
-            'seaborn': sns,
+        # Workspace, stdout capture and pyplot figures of this session; cells resolve relative
+        # paths against the workspace, so the process working directory is never changed
+        self._io = SessionIO(self.workspace_path)
+        
+        # Pooled database connections and cached query results of this session
+        self._sql = SqlSession.from_settings(self.workspace_path)
+        
+        base = {
+            # Standard libraries, imported when a cell first uses them
+            'pd': _PANDAS,
+            'pandas': _PANDAS,
+            'np': _NUMPY,
+            'numpy': _NUMPY,
+            'plt': _PYPLOT,
+            'matplotlib': _PYPLOT,
+            'sns': _SEABORN,
+            'seaborn': _SEABORN,
+            '__import__': tracking_import,  # Isolates libraries cells import themselves
             
             # Built-in functions
-            'print': print,
+            'print': observation_print,  # Summarizes large frames and arrays
+            'open': workspace_open,  # Relative paths are workspace paths
+            'load_data': load_data,  # Data files through the shared columnar cache
             'len': len,
             'range': range,
             'enumerate': enumerate,
@@ -68,72 +233,205 @@ class ExecutionContext:
             'set': set,
             'tuple': tuple,
             
-            # Common imports
-            '__builtins__': __builtins__,
-            
             # Workspace utilities
             'WORKSPACE_PATH': str(self.workspace_path),
             'DATA_DIR': str(self.workspace_path / "data"),
             'OUTPUT_DIR': str(self.workspace_path / "outputs"), 
             'VIZ_DIR': str(self.workspace_path / "visualizations"),
             'REPORTS_DIR': str(self.workspace_path / "reports"),
+            
+            # Out-of-core aggregation over chunked readers
+            'read_chunks': read_chunks,
+            'chunked_groupby': chunked_groupby,
+            'chunked_null_counts': chunked_null_counts,
+            'chunked_nunique': chunked_nunique,
+            'chunked_value_ranges': chunked_value_ranges,
+            'chunked_out_of_range': chunked_out_of_range,
+            'chunked_quantiles': chunked_quantiles,
+            'chunked_top_values': chunked_top_values,
+            
+            # Mergeable sketches for approximate statistics in one streaming pass
+            'HyperLogLog': HyperLogLog,
+            'KLLSketch': KLLSketch,
+            'CountMinSketch': CountMinSketch,
+            'merge_sketches': merge_sketches,
+            
+            # Data-quality profiling of every column in one pass
+            'profile_data': profile_data,
+            'check_rules': check_rules,
+            'RuleSet': RuleSet,
+            
+            # Pooled, cached SQL queries returning DataFrames
+            'sql_query': self._sql.query,
         }
         
+        # Libraries and constants form the base layer; user variables live in the namespace itself
+        self.globals_dict = SessionNamespace(base)
+        
         # Add framework document path if provided
-        if framework_document_path:
-            # Convert to absolute path since we're changing working directory
-            abs_framework_path = Path(framework_document_path).resolve()
-            self.globals_dict['FRAMEWORK_DOCUMENT_PATH'] = str(abs_framework_path)
+        self.set_framework_document(framework_document_path)
+        
+        # Content-addressed copies of spilled and hibernated variables, referenced by handles in graph state
+        self.object_store = ObjectStore(self.workspace_path / "data" / ".objects")
+        self._handles: Dict[str, VariableHandle] = {}
+        
+        # Large variables beyond the memory budget are spilled to the object store
+        self.memory_budget_bytes = memory_budget_bytes
+        self._cell_counter = 0
+        self._last_access: Dict[str, int] = {}
+        self._last_referenced: frozenset = frozenset()
+        self._spilled: Dict[str, VariableHandle] = {}
+        
+        # Pre-cell handles of the variables the last cell changed; None when there is nothing to undo
+        self._last_cell: Optional[Dict[str, Optional[VariableHandle]]] = None
+        
+        # In-memory copies of the data the last cell read, so undo can revert in-place mutations
+        self.undo_copy_max_bytes = undo_copy_max_bytes
+        self._pre_cell_copies: Dict[str, Any] = {}
+        
+        # Token budget for the output of one cell
+        self.observation_max_tokens = observation_max_tokens
+        
+        # Per-cell and per-session resource limits; process rlimits only apply when the
+        # context owns its process (a kernel worker), never in the shared server process
+        self.limits = limits if limits is not None else ResourceLimits.from_settings()
+        self.isolated = isolated
+        self.usage = SessionUsage()
+        self._exhausted_limit: Optional[ResourceLimitExceeded] = None
+        
+        # Opt-in cache replaying deterministic cells whose inputs are unchanged
+        self.cell_cache = cell_cache if cell_cache is not None else CellCache.from_settings()
         
         # Execution history for debugging
         self.execution_history = []
         
-        # Configure matplotlib for non-interactive use
-        self._configure_matplotlib()
+        # Held while a cell runs so the session is never hibernated mid-execution
+        self._busy = threading.Lock()
+        self._watchdog: Optional[_CellWatchdog] = None
+        
+        # Pick up a session that was hibernated while idle
+        self.resume_report = self._resume_from_snapshot()
     
-    def _configure_matplotlib(self):
-        """Configure matplotlib for headless execution with workspace"""
-        try:
-            plt.switch_backend('Agg')  # Non-interactive backend
-            plt.ioff()  # Turn off interactive mode
-            
-            # Set default save location for plots
-            plt.rcParams['savefig.directory'] = str(self.workspace_path / "visualizations")
-        except Exception as e:
-            print(f"Warning: Could not configure matplotlib: {e}")
+    def set_framework_document(self, framework_document_path: str = None):
+        """Expose the framework document path to executed code"""
+        if framework_document_path:
+            # Absolute, so it does not depend on the process working directory
+            abs_framework_path = Path(framework_document_path).resolve()
+            self.globals_dict.set_base('FRAMEWORK_DOCUMENT_PATH', str(abs_framework_path))
+    
+    def activate(self):
+        """Make this context's workspace the working directory of a kernel worker
+        
+        Only a context that owns its process changes the working directory; in-process
+        contexts share it with other sessions and resolve relative paths themselves.
+        """
+        if self.isolated:
+            os.chdir(self.workspace_path)
     
-    def execute_code(self, code: str, existing_context: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+    def execute_code(
+        self,
+        code: str,
+        existing_context: Dict[str, Any] = None,
+        timeout: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
         """
         Execute Python code with persistent context
         
         Args:
             code: Python code to execute
             existing_context: Previous execution context to merge
+            timeout: Wall-clock seconds after which the cell is interrupted
+            max_output_tokens: Token budget for the output, overriding the context default
+            on_output: Receives stdout in rate-limited chunks while the cell runs
             
         Returns:
             Tuple of (output_string, updated_context)
         """
+        # A cell stuck in native code can outlive its deadline; the next one waits at most a timeout for it
+        if not self._busy.acquire(timeout=timeout if timeout else -1):
+            return format_busy_observation(timeout), {}
+        try:
+            return self._execute_code(code, existing_context, timeout, max_output_tokens, on_output)
+        finally:
+            self._busy.release()
+    
+    def _execute_code(
+        self,
+        code: str,
+        existing_context: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+        max_output_tokens: Optional[int],
+        on_output: Optional[Callable[[str], None]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        namespace = self.globals_dict
+        max_tokens = max_output_tokens if max_output_tokens is not None else self.observation_max_tokens
+        max_chars = max_tokens * CHARS_PER_TOKEN if max_tokens is not None else None
         
-        # Merge existing context
+        # Bring in variables held by graph state that this context does not have yet
         if existing_context:
-            self.globals_dict.update(existing_context)
+            namespace.merge(existing_context)
         
-        # Capture stdout
-        old_stdout = sys.stdout
-        captured_output = io.StringIO()
-        sys.stdout = captured_output
+        # A session that used up its budget runs no more cells
+        exhausted = self.usage.exhausted(self.limits)
+        if exhausted is not None:
+            limit_output = format_limit_observation(exhausted)
+            self.execution_history.append({
+                'code': code,
+                'output': limit_output,
+                'success': False
+            })
+            return limit_output, {}
         
-        # Prepare execution context (like LangGraph CodeAct reference)
-        _locals = self.globals_dict.copy()
-        if existing_context:
-            _locals.update(existing_context)
+        budget = self.usage.remaining(self.limits)
+        session_wall_bound = budget.wall_seconds is not None and (timeout is None or budget.wall_seconds < timeout)
+        if session_wall_bound:
+            timeout = budget.wall_seconds
         
-        # Store original keys before execution (like LangGraph CodeAct reference)
-        original_keys = set(_locals.keys())
+        # Capture stdout, keeping only its head and tail once it outgrows the token budget
+        streamer = OutputStreamer(on_output, STREAM_INTERVAL_SECONDS) if on_output else None
+        captured_output = BoundedOutput(max_chars, streamer, budget.output_bytes, budget.output_scope)
+        started = time.perf_counter()
+        cpu_clock = time.process_time if self.isolated else time.thread_time
+        cpu_started = cpu_clock()
+        
+        # Record the names this cell writes so they can be reported or rolled back
+        namespace.begin_cell()
+        self._last_cell = {}
+        self._pre_cell_copies = {}
+        referenced = set()
         
         try:
-            # Execute the code (following LangGraph CodeAct README pattern)
-            exec(code, __builtins__, _locals)
+            compiled = compile(code, "<string>", "exec")
+            referenced = referenced_names(compiled)
+            
+            # A deterministic cell whose inputs are unchanged is replayed instead of run
+            cache_key, fingerprints, cached = None, None, None
+            if self.cell_cache is not None and self.cell_cache.cacheable(referenced):
+                fingerprints = self._read_fingerprints(input_names(compiled))
+                if fingerprints is not None:
+                    cache_key = CellCache.key(code, fingerprints)
+                    cached = self.cell_cache.lookup(cache_key, self.workspace_path)
+            
+            if cached is not None:
+                self._replay_cell(cached, captured_output)
+            else:
+                # Re-hydrate stored or spilled variables the cell refers to before it runs
+                namespace.load_referenced(referenced)
+                self._pre_cell_copies = self._copy_referenced(referenced)
+                self._io.track_files(cache_key is not None)
+                
+                # Execute the code with the namespace as both globals and locals, so functions
+                # and comprehensions defined in the cell see the session's variables
+                watchdog = _CellWatchdog(timeout, None if self.isolated else budget.cpu_seconds)
+                with (
+                    session_scope(self._io, captured_output),
+                    watchdog as self._watchdog,
+                    self._process_limits(budget),
+                    compact_display(),
+                ):
+                    exec(compiled, namespace)
             
             # Get the output
             output = captured_output.getvalue()
@@ -142,25 +440,79 @@ class ExecutionContext:
             self.execution_history.append({
                 'code': code,
                 'output': output,
-                'success': True
+                'success': True,
+                'cached': cached is not None
             })
             
-            # Only return NEW variables created during execution (like LangGraph CodeAct reference)
+            committed = namespace.commit_cell()
+            if cache_key is not None and cached is None:
+                self._cache_cell(cache_key, fingerprints, committed, captured_output, time.perf_counter() - started)
+            
+            # Only return variables written by this cell
             # Clean up non-serializable objects that shouldn't persist (like file handles)
-            new_keys = set(_locals.keys()) - original_keys
             user_variables = {}
-            for key in new_keys:
-                value = _locals[key]
+            for key, value in committed.items():
                 # Skip file-like objects and other non-persistent types by their type
                 if isinstance(value, (io.IOBase, io.TextIOWrapper, io.BufferedWriter, io.BufferedReader)):
                     continue  # File objects don't need to persist
                 user_variables[key] = value
             
+            # Track access recency and keep resident data within the memory budget
+            touched = (referenced & namespace.keys()) | user_variables.keys()
+            self._last_referenced = frozenset(touched)
+            self._cell_counter += 1
+            for key in touched:
+                self._last_access[key] = self._cell_counter
+            self._enforce_memory_budget(protected=touched)
+            
             return output if output else "Code executed successfully.", user_variables
             
+        except CellCancelledError:
+            namespace.rollback_cell()
+            self._last_referenced = frozenset(referenced & namespace.keys())
+            
+            cancelled_output = f"{captured_output.getvalue()}\nExecution was cancelled before the cell finished."
+            
+            self.execution_history.append({
+                'code': code,
+                'output': cancelled_output,
+                'success': False
+            })
+            
+            return cancelled_output, {}
+            
+        except ResourceLimitExceeded as e:
+            return self._limit_exceeded(code, e, budget, captured_output, referenced)
+            
+        except CellTimeoutError:
+            if session_wall_bound:
+                limit = ResourceLimitExceeded("wall_seconds", "session", self.limits.session_wall_seconds)
+                return self._limit_exceeded(code, limit, budget, captured_output, referenced)
+            
+            namespace.rollback_cell()
+            self._last_referenced = frozenset(referenced & namespace.keys())
+            
+            # Keep whatever the cell printed before it was interrupted
+            timeout_output = f"{captured_output.getvalue()}\n{format_timeout_observation(timeout)}"
+            
+            self.execution_history.append({
+                'code': code,
+                'output': timeout_output,
+                'success': False
+            })
+            
+            return timeout_output, {}
+            
         except Exception as e:
+            limit = self._as_limit_error(e)
+            if limit is not None:
+                return self._limit_exceeded(code, limit, budget, captured_output, referenced)
+            
+            namespace.rollback_cell()
+            self._last_referenced = frozenset(referenced & namespace.keys())
+            
             # Capture error
-            error_output = f"Error: {str(e)}\n{traceback.format_exc()}"
+            error_output = truncate_middle(f"Error: {str(e)}\n{traceback.format_exc()}", max_chars)
             
             # Store failed execution in history
             self.execution_history.append({
@@ -173,8 +525,458 @@ class ExecutionContext:
             return error_output, {}
             
         finally:
-            # Restore stdout
-            sys.stdout = old_stdout
+            self._watchdog = None
+            self._io.track_files(False)
+            if streamer is not None:
+                streamer.close()
+            
+            self.usage.cells += 1
+            self.usage.wall_seconds += time.perf_counter() - started
+            self.usage.cpu_seconds += cpu_clock() - cpu_started
+            self.usage.output_bytes += captured_output.total_chars
+            if self._exhausted_limit is not None:
+                self.usage.exhaust(self._exhausted_limit)
+                self._exhausted_limit = None
+    
+    def _read_fingerprints(self, names: set) -> Optional[Dict[str, str]]:
+        """Content fingerprints of the variables and workspace constants a cell reads
+        
+        Stored variables that are not loaded use their handle's hash, so nothing is
+        loaded just to be fingerprinted. None when a read variable cannot be hashed.
+        """
+        namespace = self.globals_dict
+        lazy = set(namespace.lazy_names())
+        fingerprints = {}
+        for name in names:
+            if dict.__contains__(namespace, name):
+                value = dict.__getitem__(namespace, name)
+                if isinstance(value, types.ModuleType):
+                    fingerprint = f"module:{value.__name__}"
+                else:
+                    fingerprint = content_hash(value)
+            elif name in lazy:
+                handle = self._spilled.get(name) or self._handles.get(name)
+                fingerprint = handle.content_hash if handle is not None else None
+            elif isinstance(namespace.base.get(name), str):
+                # Workspace constants match across sessions; the files they lead to are checked separately
+                fingerprint = "const:" + namespace.base[name].replace(str(self.workspace_path), "<workspace>")
+            else:
+                continue  # Builtins and libraries
+            if fingerprint is None:
+                return None
+            fingerprints[name] = fingerprint
+        return fingerprints
+    
+    def _replay_cell(self, cached: CachedCell, captured_output: BoundedOutput):
+        """Reproduce a cached cell's output and variables; writes go through the undo log"""
+        start = time.perf_counter()
+        namespace = self.globals_dict
+        for name, value in self.cell_cache.load(cached).items():
+            namespace[name] = value
+        for name in cached.deleted:
+            if name in namespace:
+                del namespace[name]
+        captured_output.write(cached.output)
+        self.cell_cache.record_replay(cached, time.perf_counter() - start)
+    
+    def _cache_cell(
+        self,
+        cache_key: str,
+        fingerprints: Dict[str, str],
+        committed: Dict[str, Any],
+        captured_output: BoundedOutput,
+        seconds: float
+    ):
+        """Store a finished cell's result unless it had effects a replay would not reproduce"""
+        if self._io.wrote or captured_output.truncated:
+            return
+        # In-place changes to what the cell read (and did not rebind) would be lost on replay
+        written = committed.keys() | set(self.globals_dict.deleted_in_cell())
+        kept = {name: fingerprint for name, fingerprint in fingerprints.items() if name not in written}
+        if self._read_fingerprints(kept.keys()) != kept:
+            return
+        try:
+            self.cell_cache.put(
+                cache_key,
+                captured_output.getvalue(),
+                committed,
+                self.globals_dict.deleted_in_cell(),
+                self._io.accessed or (),
+                self.workspace_path,
+                seconds
+            )
+        except Exception as e:
+            print(f"Warning: Could not cache cell result: {e}")
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit rate and seconds saved by the cell result cache, or None when it is disabled"""
+        return self.cell_cache.stats() if self.cell_cache is not None else None
+    
+    def sql_stats(self) -> Dict[str, Any]:
+        """Queries run, query cache hits and connection pool status of the session"""
+        return self._sql.stats()
+    
+    def load_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate and seconds saved by ``load_data``'s columnar copies in this process"""
+        return get_load_cache().stats()
+    
+    def _process_limits(self, budget: CellBudget):
+        """Process rlimits for the cell, in kernel workers only"""
+        if not self.isolated:
+            return contextlib.nullcontext()
+        return process_limits(budget.cpu_seconds, self.limits.memory_mb, self.limits.open_files, budget.cpu_scope)
+    
+    def _as_limit_error(self, error: Exception) -> Optional[ResourceLimitExceeded]:
+        """Recognize failures caused by process rlimits rather than by the code itself"""
+        if not self.isolated:
+            return None
+        if isinstance(error, MemoryError) and self.limits.memory_mb is not None:
+            return ResourceLimitExceeded("memory_mb", "cell", self.limits.memory_mb)
+        if isinstance(error, OSError) and error.errno == errno.EMFILE and self.limits.open_files is not None:
+            return ResourceLimitExceeded("open_files", "cell", self.limits.open_files)
+        return None
+    
+    def _limit_exceeded(
+        self,
+        code: str,
+        error: ResourceLimitExceeded,
+        budget: CellBudget,
+        captured_output: BoundedOutput,
+        referenced: set
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Roll back a cell stopped by a resource limit and describe the limit to the agent"""
+        self.globals_dict.rollback_cell()
+        self._last_referenced = frozenset(referenced & self.globals_dict.keys())
+        
+        # Limits raised by class (asynchronously) only know their name
+        if error.limit == "cpu_seconds" and error.limit_value is None:
+            error.scope = budget.cpu_scope
+        # Report the configured limit rather than what was left of it
+        configured = getattr(self.limits, error.limit if error.scope == "cell" else f"session_{error.limit}", None)
+        if configured is not None:
+            error.limit_value = configured
+        
+        limit_output = f"{captured_output.getvalue()}\n{format_limit_observation(error)}"
+        # Recorded once the cell's own usage has been added in ``_execute_code``'s finally
+        self._exhausted_limit = error
+        self.execution_history.append({
+            'code': code,
+            'output': limit_output,
+            'success': False
+        })
+        return limit_output, {}
+    
+    def resource_usage(self) -> Dict[str, Any]:
+        """Resources used by this session's cells, next to the configured limits"""
+        return {"usage": self.usage.as_dict(), "limits": dataclasses.asdict(self.limits)}
+    
+    def run_cell(
+        self,
+        code: str,
+        handles: Dict[str, VariableHandle] = None,
+        timeout: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Dict[str, Optional[VariableHandle]]]:
+        """
+        Execute code against handle-based graph state
+        
+        Args:
+            code: Python code to execute
+            handles: Variable handles from graph state; missing variables are restored lazily
+            timeout: Wall-clock seconds after which the cell is interrupted
+            max_output_tokens: Token budget for the output, overriding the context default
+            on_output: Receives stdout in rate-limited chunks while the cell runs
+            
+        Returns:
+            Tuple of (output_string, handle updates); deleted variables map to None
+        """
+        # Nothing to undo until the cell has actually run
+        previous_cell, self._last_cell = self._last_cell, None
+        if handles:
+            self.restore(handles)
+        
+        output, new_variables = self.execute_code(
+            code, timeout=timeout, max_output_tokens=max_output_tokens, on_output=on_output
+        )
+        
+        # Handles only describe the variables; nothing is hashed or written until they leave memory
+        updates: Dict[str, Optional[VariableHandle]] = {
+            name: describe(name, value)
+            for name, value in new_variables.items()
+            if not isinstance(value, types.ModuleType)  # Imports are re-run, not stored
+        }
+        
+        # Data the cell read may have been mutated in place: its type or shape changed,
+        # or its content no longer matches the copy taken before the cell
+        for name in self._last_referenced - updates.keys():
+            value = dict.get(self.globals_dict, name)
+            previous = self._handles.get(name)
+            if previous is None or not isinstance(value, (*_data_types(), *_MUTABLE_BUILTIN_TYPES)):
+                continue
+            handle = describe(name, value)
+            if (handle.type_name, handle.shape) != (previous.type_name, previous.shape) or (
+                name in self._pre_cell_copies and not _same_content(self._pre_cell_copies[name], value)
+            ):
+                updates[name] = handle
+        
+        for name in self.globals_dict.deleted_in_cell():
+            updates[name] = None
+        self._last_cell = {name: self._handles.get(name) for name in updates}
+        self._pre_cell_copies = {name: value for name, value in self._pre_cell_copies.items() if name in updates}
+        for name in updates:
+            self._spilled.pop(name, None)
+        for name in self.globals_dict.deleted_in_cell():
+            self._handles.pop(name, None)
+        self._handles.update((name, handle) for name, handle in updates.items() if handle is not None)
+        
+        # The previous cell can no longer be undone, so stored copies only it kept alive are garbage
+        if previous_cell and any(handle is not None and handle.stored for handle in previous_cell.values()):
+            self._collect_garbage()
+        return output, updates
+    
+    def cancel(self) -> bool:
+        """Interrupt the running cell, if any; it ends with a cancellation observation"""
+        watchdog = self._watchdog
+        return watchdog is not None and watchdog.interrupt(CellCancelledError)
+    
+    def last_cell_changes(self) -> Dict[str, Optional[VariableHandle]]:
+        """Pre-cell handles of the variables the last cell created, changed or deleted"""
+        return dict(self._last_cell or {})
+    
+    def undo_last_cell(self) -> Optional[Dict[str, Optional[VariableHandle]]]:
+        """
+        Revert the session to its state before the last cell
+        
+        Names the cell wrote are rebound from the namespace undo log, and data it
+        mutated in place is restored from the in-memory copy taken before the cell
+        (for data within ``undo_copy_max_bytes``; larger objects keep their changes).
+        
+        Returns:
+            Handle updates that bring graph state back in line (None marks a
+            variable the cell created), or None if there is nothing to undo
+        """
+        with self._busy:
+            if self._last_cell is None:
+                return None
+            changes, self._last_cell = self._last_cell, None
+            copies, self._pre_cell_copies = self._pre_cell_copies, {}
+            
+            self.globals_dict.rollback_cell()
+            for name, handle in changes.items():
+                self._spilled.pop(name, None)
+                if name in copies:
+                    self.globals_dict.discard(name)
+                    dict.__setitem__(self.globals_dict, name, copies[name])
+                if handle is None:
+                    self._handles.pop(name, None)
+                else:
+                    self._handles[name] = handle
+            
+            if self.execution_history:
+                self.execution_history.pop()
+            return changes
+    
+    def _copy_referenced(self, names: set) -> Dict[str, Any]:
+        """Copies of the mutable data a cell reads, as far as the undo copy budget allows"""
+        if not self.undo_copy_max_bytes:
+            return {}
+        budget = self.undo_copy_max_bytes
+        copies = {}
+        for name in names:
+            value = dict.get(self.globals_dict, name)
+            if name == '__builtins__' or not isinstance(value, (*_data_types(), *_MUTABLE_BUILTIN_TYPES)):
+                continue
+            size = _copy_size(value)
+            if size > budget:
+                continue
+            try:
+                copies[name] = _copy_value(value)
+            except Exception:
+                continue  # Uncopyable contents; undo only rebinds the name
+            budget -= size
+        return copies
+    
+    def _collect_garbage(self):
+        """Delete stored objects that no handle of this session still refers to"""
+        live = [*self._handles.values(), *self._spilled.values(), *(self._last_cell or {}).values()]
+        self.object_store.collect(live)
+    
+    def restore(self, handles: Dict[str, VariableHandle]):
+        """Register stored variables this context does not hold, loading each on first use"""
+        for name, handle in handles.items():
+            if name not in self.globals_dict and self.object_store.contains(handle):
+                self.globals_dict.add_lazy(name, functools.partial(self.object_store.get, handle))
+                self._handles[name] = handle
+    
+    def _enforce_memory_budget(self, protected: frozenset = frozenset()):
+        """Spill least recently used large variables until resident data fits the budget"""
+        if self.memory_budget_bytes is None:
+            return
+        
+        sizes = {key: _estimate_size(value) for key, value in self.globals_dict.user_items()}
+        resident = sum(sizes.values())
+        if resident <= self.memory_budget_bytes:
+            return
+        
+        candidates = sorted(
+            (
+                key for key, size in sizes.items()
+                if key not in protected
+                and size >= SPILL_MIN_BYTES
+                and isinstance(dict.get(self.globals_dict, key), _data_types())
+            ),
+            key=lambda key: self._last_access.get(key, 0)
+        )
+        for key in candidates:
+            if resident <= self.memory_budget_bytes:
+                break
+            handle = self.object_store.put(key, dict.get(self.globals_dict, key))
+            if not handle.stored:
+                continue
+            self.globals_dict.spill(key, functools.partial(self._reload_spilled, key, handle))
+            self._spilled[key] = handle
+            if key in self._handles:
+                self._handles[key] = handle
+            resident -= sizes[key]
+    
+    def _reload_spilled(self, name: str, handle: VariableHandle) -> Any:
+        """Load a spilled variable back, memory-mapping it where the format allows"""
+        self._spilled.pop(name, None)
+        return self.object_store.get(handle, mmap=True)
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """Resident versus spilled bytes for this session"""
+        return {
+            "budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": self.estimate_memory(),
+            "spilled_bytes": sum(handle.size_bytes for handle in self._spilled.values()),
+            "spilled_variables": sorted(self._spilled),
+        }
+    
+    def is_busy(self) -> bool:
+        """Whether a cell is currently executing in this context"""
+        return self._busy.locked()
+    
+    def hibernate(self) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot the session to its workspace and release its memory
+        
+        Variables go to the object store in their per-type formats; the manifest
+        records their handles, imported modules, pyplot figures and execution
+        history. The next context created for this workspace resumes from it.
+        
+        Returns:
+            Report with the snapshot size, duration and anything that could not be saved,
+            or None when a cell is running; the session is then left as it is
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return self._hibernate()
+        finally:
+            self._busy.release()
+    
+    def _hibernate(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        variables: Dict[str, VariableHandle] = {}
+        modules: Dict[str, str] = {}
+        dropped = []
+        
+        for name, value in list(self.globals_dict.user_items()):
+            if isinstance(value, types.ModuleType):
+                modules[name] = value.__name__
+                continue
+            handle = self.object_store.put(name, value)
+            if handle.stored:
+                variables[name] = handle
+            else:
+                dropped.append(name)  # Functions, connections, generators, ...
+        
+        # Spilled or not-yet-reloaded variables are already on disk
+        for name in self.globals_dict.lazy_names():
+            handle = self._spilled.get(name) or self._handles.get(name)
+            if handle is not None:
+                variables[name] = handle
+        
+        figures = []
+        plt = imported_module("matplotlib.pyplot")
+        with session_scope(self._io):
+            for num in plt.get_fignums() if plt is not None else []:
+                figure = plt.figure(num)
+                handle = self.object_store.put(f"figure_{num}", figure)
+                if handle.stored:
+                    figures.append(handle)
+                plt.close(figure)
+        
+        manifest = {
+            "variables": {name: handle.model_dump() for name, handle in variables.items()},
+            "modules": modules,
+            "figures": [handle.model_dump() for handle in figures],
+            "history": self.execution_history,
+            "dropped": dropped,
+        }
+        manifest_path = self.workspace_path / SNAPSHOT_MANIFEST
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, default=str), encoding="utf-8")
+        
+        # Release everything the session held; only the snapshot's objects stay on disk
+        self._sql.close()
+        self.globals_dict.clear_user()
+        self._spilled.clear()
+        self._last_cell = None
+        self._pre_cell_copies = {}
+        self.object_store.collect([*variables.values(), *figures])
+        self.execution_history = []
+        
+        return {
+            "hibernate_seconds": time.perf_counter() - start,
+            "snapshot_bytes": manifest_path.stat().st_size
+                + sum(handle.size_bytes for handle in [*variables.values(), *figures]),
+            "variables": len(variables),
+            "figures": len(figures),
+            "dropped": dropped,
+        }
+    
+    def _resume_from_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Restore a hibernated session lazily; variables load on first use"""
+        manifest_path = self.workspace_path / SNAPSHOT_MANIFEST
+        if not manifest_path.exists():
+            return None
+        
+        start = time.perf_counter()
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            
+            for name, data in manifest["variables"].items():
+                handle = VariableHandle(**data)
+                if self.object_store.contains(handle):
+                    self.globals_dict.add_lazy(name, functools.partial(self.object_store.get, handle))
+                    self._handles[name] = handle
+            
+            for name, module_name in manifest["modules"].items():
+                dict.__setitem__(self.globals_dict, name, importlib.import_module(module_name))
+            
+            # Unpickled figures re-register themselves with the session's pyplot state
+            if manifest["figures"]:
+                importlib.import_module("matplotlib.pyplot")
+            with session_scope(self._io):
+                for data in manifest["figures"]:
+                    self.object_store.get(VariableHandle(**data))
+            
+            self.execution_history = manifest["history"] + self.execution_history
+        except Exception as e:
+            print(f"Warning: Could not resume session snapshot: {e}")
+            return None
+        finally:
+            # A snapshot is consumed once; later state lives in the new context
+            manifest_path.unlink(missing_ok=True)
+        
+        return {
+            "resume_seconds": time.perf_counter() - start,
+            "variables": len(manifest["variables"]),
+            "figures": len(manifest["figures"]),
+        }
     
     def get_context(self) -> Dict[str, Any]:
         """Get current execution context variables (empty for fresh context)"""
@@ -189,11 +991,13 @@ class ExecutionContext:
     def get_available_variables(self) -> str:
         """Get string representation of available variables"""
         variables = []
-        for key, value in self.globals_dict.items():
+        for key, value in [*self.globals_dict.base_items(), *self.globals_dict.user_items()]:
             if not key.startswith('_') and not callable(value):
                 try:
                     var_type = type(value).__name__
-                    if hasattr(value, 'shape'):  # pandas/numpy objects
+                    if isinstance(value, types.ModuleType):
+                        var_info = f"{key}: module"  # Never import a lazy library just to list it
+                    elif hasattr(value, 'shape'):  # pandas/numpy objects
                         var_info = f"{key}: {var_type} {value.shape}"
                     else:
                         var_info = f"{key}: {var_type}"
@@ -201,11 +1005,22 @@ class ExecutionContext:
                 except:
                     variables.append(f"{key}: {type(value).__name__}")
         
+        # Stored variables that have not been loaded back yet
+        variables.extend(f"{key}: (stored)" for key in self.globals_dict.lazy_names())
+        
         return "Available variables:\n" + "\n".join(variables) if variables else "No variables defined yet."
     
+    def estimate_memory(self) -> int:
+        """Estimate bytes held by user variables in this context"""
+        return sum(_estimate_size(value) for _, value in self.globals_dict.user_items())
+    
+    def import_report(self) -> Dict[str, Any]:
+        """Seconds spent importing the sandbox libraries loaded so far in this process"""
+        return import_report()
+    
     def add_library(self, name: str, library: Any):
         """Add a library to the execution context"""
-        self.globals_dict[name] = library
+        self.globals_dict.set_base(name, library)
     
     def get_execution_history(self) -> list:
         """Get execution history for debugging"""
@@ -227,12 +1042,106 @@ class ExecutionContext:
         return "\n".join(info)
     
     def cleanup(self):
-        """Cleanup workspace and restore original working directory"""
-        try:
-            os.chdir(self.original_cwd)
-        except Exception as e:
-            print(f"Warning: Could not restore original working directory: {e}")
+        """Release the session's pyplot figures and database connections"""
+        self._io.figures.clear()
+        self._sql.close()
     
     def __del__(self):
         """Cleanup when object is destroyed"""
-        self.cleanup()
\ No newline at end of file
+        self.cleanup()
+
+
+# Manifest of a hibernated session, relative to its workspace
+SNAPSHOT_MANIFEST = Path(".snapshot") / "manifest.json"
+
+# Variables smaller than this are never worth spilling
+SPILL_MIN_BYTES = 1024 * 1024
+
+# Builtin types whose content can change without rebinding the variable
+_MUTABLE_BUILTIN_TYPES = (list, dict, set)
+
+
+def _data_types() -> tuple:
+    """DataFrame, Series and ndarray types, spilled under memory pressure and mutable in place
+
+    Only libraries already imported are considered; a value of a library
+    that was never imported, or that another session's thread is still
+    importing, cannot exist.
+    """
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    data_types = ()
+    if pd is not None:
+        data_types += (pd.DataFrame, pd.Series)
+    if np is not None:
+        data_types += (np.ndarray,)
+    return data_types
+
+
+
+def _copy_size(value: Any) -> int:
+    """Bytes a copy of a value takes; memory-mapped arrays count in full"""
+    np = imported_module("numpy")
+    if np is not None and isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return _estimate_size(value)
+
+
+def _copy_value(value: Any) -> Any:
+    """Independent copy of a DataFrame, Series, ndarray or mutable builtin"""
+    np = imported_module("numpy")
+    if np is not None and isinstance(value, np.ndarray):
+        return np.array(value)  # A plain in-memory array, also for memory-mapped ones
+    if isinstance(value, _MUTABLE_BUILTIN_TYPES):
+        return copy.deepcopy(value)
+    return value.copy(deep=True)
+
+
+def _same_content(before: Any, after: Any) -> bool:
+    """Whether a value still matches the copy taken before the cell"""
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    try:
+        if type(before) is not type(after) and not (np is not None and isinstance(after, np.ndarray)):
+            return False
+        if pd is not None and isinstance(before, (pd.DataFrame, pd.Series)):
+            return before.equals(after)
+        if np is not None and isinstance(before, np.ndarray):
+            return before.dtype == after.dtype and np.array_equal(before, after, equal_nan=before.dtype.kind in "fc")
+        return bool(before == after)
+    except Exception:
+        return False  # Incomparable content counts as changed
+
+
+def format_timeout_observation(timeout: float) -> str:
+    """Observation text telling the agent its cell hit the wall-clock limit"""
+    return (
+        f"TimeoutError: execution exceeded {timeout:g}s and was interrupted. "
+        f"Output produced before the timeout is shown above. Use a cheaper approach "
+        f"(sample the data, vectorize loops) or split the work into smaller steps."
+    )
+
+
+def format_busy_observation(timeout: float) -> str:
+    """Observation text telling the agent its cell did not run because the previous one is still running"""
+    return (
+        f"Error: the previous cell is still running; it could not be interrupted and did not finish "
+        f"within {timeout:g}s, so this cell was not run. Try again later, and avoid long calls into "
+        f"native code that cannot be interrupted."
+    )
+
+
+def _estimate_size(value: Any) -> int:
+    """Best-effort size of a value, using library-native accounting where available"""
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    try:
+        if pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+            usage = value.memory_usage(index=True, deep=False)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        if np is not None and isinstance(value, np.ndarray):
+            # Memory-mapped arrays are paged in from disk on demand
+            return 0 if getattr(value, '_mmap', None) is not None else int(value.nbytes)
+        return sys.getsizeof(value)
+    except Exception:
+        return 0
@@ -0,0 +1,674 @@
+"""
+Per-Session Isolation for CodeAct Agent
+
+Lets many sessions execute cells concurrently in threads of one process.
+Nothing process-wide is switched per cell: the running session is held in a
+context variable and the process-wide pieces cells touch are routed through it,
+each library as soon as it has been imported (never importing one itself):
+
+- stdout: ``sys.stdout`` is a router writing to the running cell's capture
+- working directory: each session has its own, starting at its workspace.
+  Relative paths given to ``open``, pandas readers and writers, numpy
+  save/load and ``savefig`` resolve against it. Cells importing ``os``,
+  ``os.path``, ``glob``, ``shutil`` or ``pathlib`` get session views of those
+  modules whose path functions, ``Path`` and ``getcwd``/``chdir`` do the
+  same; the real modules, as the rest of the process sees them, are untouched
+- pyplot: the figure registry (``Gcf.figs``) is one per session, so figure
+  numbers, ``plt.gcf()`` and ``plt.close('all')`` only see the session's figures
+- matplotlib settings: changes a cell makes to ``rcParams`` (directly, with
+  ``plt.style.use``, ``sns.set_theme`` or ``rc_context``) are kept per session
+  on top of the process-wide values, which other sessions keep seeing
+
+Outside a session scope every patched function behaves exactly as before.
+Threads a cell starts do not inherit the scope: they print to the real stdout,
+resolve paths against the process working directory and see the process-wide
+``rcParams``.
+"""
+
+import builtins
+import contextlib
+import contextvars
+import functools
+import io
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Set, TextIO, Tuple
+
+
+@dataclass
+class SessionIO:
+    """Process-global state kept per session"""
+
+    workspace: Path
+    # Working directory of the session's cells; ``os.chdir`` in a cell moves it
+    cwd: Optional[Path] = None
+    stdout: Optional[TextIO] = None
+    figures: "OrderedDict[Any, Any]" = field(default_factory=OrderedDict)
+    # The session's changes to matplotlib's rcParams
+    rc_params: Dict[str, Any] = field(default_factory=dict)
+    # File access of the running cell, recorded while ``accessed`` is a set
+    accessed: Optional[Set[str]] = None
+    wrote: bool = False
+
+    def __post_init__(self):
+        if self.cwd is None:
+            self.cwd = self.workspace
+
+    def track_files(self, enabled: bool):
+        """Start (or stop) recording the paths the running cell reads and whether it writes any"""
+        self.accessed = set() if enabled else None
+        self.wrote = False
+
+
+_current: contextvars.ContextVar[Optional[SessionIO]] = contextvars.ContextVar("codeact_session_io", default=None)
+
+_install_lock = threading.Lock()
+
+
+def current_session() -> Optional[SessionIO]:
+    return _current.get()
+
+
+def imported_module(name: str) -> Optional[types.ModuleType]:
+    """A module whose import has completed, or None; another session's thread may still be importing it"""
+    module = sys.modules.get(name)
+    if module is None or getattr(getattr(module, "__spec__", None), "_initializing", False):
+        return None
+    return module
+
+
+@contextlib.contextmanager
+def session_scope(session: SessionIO, stdout: Optional[TextIO] = None) -> Iterator[SessionIO]:
+    """Route stdout, relative paths and pyplot state to ``session`` in the current context"""
+    install()
+    previous_stdout = session.stdout
+    if stdout is not None:
+        session.stdout = stdout
+    token = _current.set(session)
+    try:
+        yield session
+    finally:
+        _current.reset(token)
+        session.stdout = previous_stdout
+
+
+def resolve_path(path: Any) -> Any:
+    """Anchor a relative filesystem path at the running session's working directory"""
+    session = _current.get()
+    if session is None:
+        return path
+    if isinstance(path, str):
+        # Leave URLs and literal documents (read_json, read_html) alone
+        if not path or os.path.isabs(path) or "://" in path or "\n" in path or path.lstrip()[:1] in ("{", "[", "<"):
+            return path
+        return os.path.join(session.cwd, path)
+    if isinstance(path, os.PathLike):
+        fspath = os.fspath(path)
+        if isinstance(fspath, str) and not os.path.isabs(fspath):
+            return session.cwd / fspath
+    return path
+
+
+def record_access(path: Any, writes: bool):
+    """Note a path the running cell reads, or that it wrote somewhere"""
+    session = _current.get()
+    if session is None or session.accessed is None or not isinstance(path, (str, os.PathLike)):
+        return  # Buffers and file descriptors are not files the cell names
+    if writes:
+        session.wrote = True
+    else:
+        session.accessed.add(os.fspath(path))
+
+
+def workspace_open(file, mode="r", *args, **kwargs):
+    """``open`` for executed cells: relative paths are workspace paths"""
+    path = resolve_path(file)
+    record_access(path, writes=any(flag in mode for flag in "wax+"))
+    return builtins.open(path, mode, *args, **kwargs)
+
+
+class _StdoutRouter(io.TextIOBase):
+    """``sys.stdout`` replacement that writes to the running cell's capture"""
+
+    def __init__(self, fallback: TextIO):
+        self._fallback = fallback
+
+    def _target(self) -> TextIO:
+        session = _current.get()
+        if session is not None and session.stdout is not None:
+            return session.stdout
+        return self._fallback
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        target = self._target()
+        if hasattr(target, "flush"):
+            target.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        # encoding, fileno, isatty, buffer, ... come from the real stream
+        return getattr(self._fallback, name)
+
+
+class _SessionFigures(MutableMapping):
+    """Stand-in for ``Gcf.figs`` that resolves to the running session's figures
+
+    Code running outside any session (server threads, tests) shares one
+    default registry, as pyplot does normally.
+    """
+
+    def __init__(self, default: "OrderedDict[Any, Any]"):
+        self._default = default
+
+    def _figures(self) -> "OrderedDict[Any, Any]":
+        session = _current.get()
+        return session.figures if session is not None else self._default
+
+    def __getitem__(self, key):
+        return self._figures()[key]
+
+    def __setitem__(self, key, value):
+        self._figures()[key] = value
+
+    def __delitem__(self, key):
+        del self._figures()[key]
+
+    def __iter__(self):
+        return iter(self._figures())
+
+    def __len__(self) -> int:
+        return len(self._figures())
+
+    def __reversed__(self):
+        return reversed(self._figures())
+
+    def __contains__(self, key) -> bool:
+        return key in self._figures()
+
+    def move_to_end(self, key, last: bool = True):
+        self._figures().move_to_end(key, last)
+
+    def values(self):
+        return self._figures().values()
+
+    def items(self):
+        return self._figures().items()
+
+    def keys(self):
+        return self._figures().keys()
+
+
+class _SessionRcParams:
+    """Mixin for matplotlib's ``RcParams`` that keeps a session's changes to the process-wide instance apart
+
+    Reads in a session see its own changes over the process-wide values;
+    copies and other instances behave as plain ``RcParams``.
+    """
+
+    _process_params = None
+
+    def _changes(self) -> Optional[Dict[str, Any]]:
+        session = _current.get()
+        if session is None or self is not _SessionRcParams._process_params:
+            return None
+        return session.rc_params
+
+    def _get(self, key):
+        changes = self._changes()
+        if changes is not None and key in changes:
+            return changes[key]
+        return super()._get(key)
+
+    def _set(self, key, val):
+        changes = self._changes()
+        if changes is None:
+            return super()._set(key, val)
+        changes[key] = val
+
+    def _update_raw(self, other_params):
+        changes = self._changes()
+        if changes is None:
+            return super()._update_raw(other_params)
+        changes.update(dict.items(other_params) if isinstance(other_params, dict) else other_params)
+
+    def __delitem__(self, key):
+        changes = self._changes()
+        if changes is None:
+            return super().__delitem__(key)
+        changes.pop(key, None)
+
+    def clear(self):
+        # ``rcdefaults`` clears and refills; in a session that only drops the session's changes
+        changes = self._changes()
+        if changes is None:
+            return super().clear()
+        changes.clear()
+
+
+# Path parameters of the library functions whose relative paths are workspace paths
+_PANDAS_READERS = {
+    "read_csv": "filepath_or_buffer",
+    "read_table": "filepath_or_buffer",
+    "read_fwf": "filepath_or_buffer",
+    "read_excel": "io",
+    "read_json": "path_or_buf",
+    "read_parquet": "path",
+    "read_feather": "path",
+    "read_pickle": "filepath_or_buffer",
+    "read_hdf": "path_or_buf",
+    "read_stata": "filepath_or_buffer",
+    "read_sas": "filepath_or_buffer",
+    "read_spss": "path",
+    "read_orc": "path",
+    "read_xml": "path_or_buffer",
+    "read_html": "io",
+}
+
+_PANDAS_WRITERS = {
+    "to_csv": "path_or_buf",
+    "to_excel": "excel_writer",
+    "to_json": "path_or_buf",
+    "to_parquet": "path",
+    "to_feather": "path",
+    "to_pickle": "path",
+    "to_hdf": "path_or_buf",
+    "to_stata": "path",
+    "to_orc": "path",
+    "to_xml": "path_or_buffer",
+    "to_html": "buf",
+    "to_latex": "buf",
+    "to_markdown": "buf",
+    "to_string": "buf",
+}
+
+_NUMPY_READERS = {
+    "load": "file",
+    "loadtxt": "fname",
+    "genfromtxt": "fname",
+    "fromfile": "file",
+}
+
+_NUMPY_WRITERS = {
+    "save": "file",
+    "savez": "file",
+    "savez_compressed": "file",
+    "savetxt": "fname",
+}
+
+# Path parameters of the standard library functions session modules resolve, as
+# (position, keyword) pairs; keyword-only parameters have no position
+_OS_READERS = {
+    "access": ((0, "path"),),
+    "listdir": ((0, "path"),),
+    "lstat": ((0, "path"),),
+    "open": ((0, "path"),),
+    "readlink": ((0, "path"),),
+    "scandir": ((0, "path"),),
+    "stat": ((0, "path"),),
+    "statvfs": ((0, "path"),),
+    "walk": ((0, "top"),),
+}
+
+_OS_WRITERS = {
+    "chmod": ((0, "path"),),
+    "link": ((0, "src"), (1, "dst")),
+    "makedirs": ((0, "name"),),
+    "mkdir": ((0, "path"),),
+    "remove": ((0, "path"),),
+    "removedirs": ((0, "name"),),
+    "rename": ((0, "src"), (1, "dst")),
+    "renames": ((0, "old"), (1, "new")),
+    "replace": ((0, "src"), (1, "dst")),
+    "rmdir": ((0, "path"),),
+    "symlink": ((1, "dst"),),  # The target is relative to the link, not the working directory
+    "truncate": ((0, "path"),),
+    "unlink": ((0, "path"),),
+    "utime": ((0, "path"),),
+}
+
+_OS_PATH_FUNCTIONS = {
+    "abspath": ((0, "path"),),
+    "exists": ((0, "path"),),
+    "getatime": ((0, "filename"),),
+    "getctime": ((0, "filename"),),
+    "getmtime": ((0, "filename"),),
+    "getsize": ((0, "filename"),),
+    "isdir": ((0, "s"),),
+    "isfile": ((0, "path"),),
+    "islink": ((0, "path"),),
+    "ismount": ((0, "path"),),
+    "lexists": ((0, "path"),),
+    "realpath": ((0, "filename"),),
+    "relpath": ((0, "path"), (1, "start")),
+    "samefile": ((0, "f1"), (1, "f2")),
+}
+
+_GLOB_FUNCTIONS = {
+    "glob": ((None, "root_dir"),),
+    "iglob": ((None, "root_dir"),),
+}
+
+_SHUTIL_READERS = {
+    "disk_usage": ((0, "path"),),
+}
+
+_SHUTIL_WRITERS = {
+    "copy": ((0, "src"), (1, "dst")),
+    "copy2": ((0, "src"), (1, "dst")),
+    "copyfile": ((0, "src"), (1, "dst")),
+    "copymode": ((0, "src"), (1, "dst")),
+    "copystat": ((0, "src"), (1, "dst")),
+    "copytree": ((0, "src"), (1, "dst")),
+    "make_archive": ((0, "base_name"), (2, "root_dir")),
+    "move": ((0, "src"), (1, "dst")),
+    "rmtree": ((0, "path"),),
+    "unpack_archive": ((0, "filename"), (1, "extract_dir")),
+}
+
+# Parameters that default to the process working directory; cells get the session's instead
+_CWD_DEFAULTS = {
+    "listdir": (0, "path"),
+    "scandir": (0, "path"),
+    "relpath": (1, "start"),
+    "glob": (None, "root_dir"),
+    "iglob": (None, "root_dir"),
+    "make_archive": (2, "root_dir"),
+    "unpack_archive": (1, "extract_dir"),
+}
+
+
+def _resolving(
+    function: Callable,
+    parameter: str,
+    position: int = 0,
+    default: Optional[str] = None,
+    writes: bool = False,
+) -> Callable:
+    """Wrap ``function`` so its path argument is resolved against the session workspace
+
+    ``default`` is the path the function uses when the argument is omitted
+    (``os.listdir()`` lists ``"."``); ``writes`` marks functions that modify
+    the filesystem when given a path.
+    """
+    if getattr(function, "__codeact_resolving__", False):
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _current.get() is not None:
+            path = None
+            if len(args) > position:
+                path = resolve_path(args[position])
+                args = (*args[:position], path, *args[position + 1:])
+            elif parameter in kwargs:
+                path = kwargs[parameter] = resolve_path(kwargs[parameter])
+            elif default is not None:
+                path = kwargs[parameter] = resolve_path(default)
+            record_access(path, writes)
+        return function(*args, **kwargs)
+
+    wrapper.__codeact_resolving__ = True
+    return wrapper
+
+
+def _resolving_all(
+    function: Callable,
+    parameters: Tuple[Tuple[Optional[int], str], ...],
+    cwd_default: Optional[Tuple[Optional[int], str]] = None,
+    writes: bool = False,
+) -> Callable:
+    """Wrap ``function`` so each of its path ``parameters`` is resolved against the session's working directory
+
+    ``cwd_default`` is a parameter that means the process working directory
+    when omitted and is given the session's instead. Calls with a ``*dir_fd``
+    argument are left alone, their relative paths are relative to that directory.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        session = _current.get()
+        if session is None or any(value is not None for key, value in kwargs.items() if key.endswith("dir_fd")):
+            return function(*args, **kwargs)
+        args = list(args)
+        for position, keyword in parameters:
+            if position is not None and len(args) > position:
+                path = args[position] = resolve_path(args[position])
+            elif keyword in kwargs:
+                path = kwargs[keyword] = resolve_path(kwargs[keyword])
+            else:
+                continue
+            record_access(path, writes)
+        if cwd_default is not None:
+            position, keyword = cwd_default
+            if (position is None or len(args) <= position) and kwargs.get(keyword) is None:
+                kwargs[keyword] = str(session.cwd)
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _patch(owner: Any, functions: dict, position: int = 0, writes: bool = False):
+    for name, parameter in functions.items():
+        parameter, default = parameter if isinstance(parameter, tuple) else (parameter, None)
+        function = getattr(owner, name, None)
+        if function is not None:
+            setattr(owner, name, _resolving(function, parameter, position, default, writes))
+
+
+def _patch_pandas(pd):
+    _patch(pd, _PANDAS_READERS)
+    _patch(pd.DataFrame, _PANDAS_WRITERS, position=1, writes=True)
+    _patch(pd.Series, _PANDAS_WRITERS, position=1, writes=True)
+
+
+def _patch_numpy(np):
+    _patch(np, _NUMPY_READERS)
+    _patch(np, _NUMPY_WRITERS, writes=True)
+
+
+def _patch_matplotlib(mpl):
+    if not isinstance(mpl.rcParams, _SessionRcParams):
+        mpl.rcParams.__class__ = type("SessionRcParams", (_SessionRcParams, type(mpl.rcParams)), {"__module__": __name__})
+        _SessionRcParams._process_params = mpl.rcParams
+
+
+def _patch_pyplot(plt):
+    from matplotlib import _pylab_helpers
+    from matplotlib.figure import Figure
+
+    plt.switch_backend("Agg")  # Headless; pyplot never opens windows
+    plt.ioff()
+    if not isinstance(_pylab_helpers.Gcf.figs, _SessionFigures):
+        _pylab_helpers.Gcf.figs = _SessionFigures(_pylab_helpers.Gcf.figs)
+    _patch(Figure, {"savefig": "fname"}, position=1, writes=True)
+    _patch(plt, {"imread": "fname"})
+    _patch(plt, {"imsave": "fname"}, writes=True)
+
+
+# Libraries are patched once they have been imported, never imported just to be patched
+_PATCHERS = {
+    "numpy": _patch_numpy,
+    "pandas": _patch_pandas,
+    "matplotlib": _patch_matplotlib,
+    "matplotlib.pyplot": _patch_pyplot,
+}
+_patched: set = set()
+
+
+def install():
+    """Install the stdout router, and path resolution and per-session matplotlib state for loaded libraries
+
+    Cheap to call repeatedly: it runs before every cell, after lazy library
+    loads and after imports in cells, each time patching only what is new.
+    """
+    if not isinstance(sys.stdout, _StdoutRouter):
+        # Re-installed when something (a test runner, a worker) swapped stdout since
+        sys.stdout = _StdoutRouter(sys.stdout)
+    if len(_patched) == len(_PATCHERS):
+        return
+    with _install_lock:
+        for name, patcher in _PATCHERS.items():
+            module = imported_module(name)
+            if name not in _patched and module is not None:
+                patcher(module)
+                _patched.add(name)
+
+
+def tracking_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """``__import__`` for executed cells: libraries imported directly are isolated too"""
+    module = builtins.__import__(name, globals, locals, fromlist, level)
+    if len(_patched) < len(_PATCHERS):
+        install()
+    return session_module(module)
+
+
+class SessionModule(types.ModuleType):
+    """A cell's view of a standard library module, with its path functions resolved per session
+
+    Attributes not overridden come from the real module, which stays untouched
+    for the rest of the process.
+    """
+
+    def __init__(self, module: types.ModuleType, overrides: Dict[str, Any]):
+        super().__init__(module.__name__, module.__doc__)
+        self.__dict__.update(overrides)
+        self.__wrapped__ = module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__wrapped__, name)
+
+    def __dir__(self):
+        return dir(self.__wrapped__)
+
+
+def _resolved(module: types.ModuleType, *tables: Tuple[dict, bool]) -> Dict[str, Callable]:
+    """Path-resolving wrappers of the functions in ``tables`` of (functions, writes) pairs"""
+    overrides = {}
+    for functions, writes in tables:
+        for name, parameters in functions.items():
+            function = getattr(module, name, None)
+            if function is not None:
+                overrides[name] = _resolving_all(function, parameters, _CWD_DEFAULTS.get(name), writes)
+    return overrides
+
+
+def _getcwd() -> str:
+    session = _current.get()
+    return str(session.cwd) if session is not None else os.getcwd()
+
+
+def _getcwdb() -> bytes:
+    return os.fsencode(_getcwd())
+
+
+def _chdir(path: Any):
+    """``os.chdir`` for cells: moves the session's working directory, never the process's"""
+    session = _current.get()
+    if session is None or isinstance(path, int):
+        return os.chdir(path)
+    target = Path(resolve_path(os.fsdecode(path) if isinstance(path, bytes) else path))
+    if not target.is_dir():
+        raise (NotADirectoryError if target.exists() else FileNotFoundError)(
+            f"No such directory: '{os.fspath(path)}'"
+        )
+    session.cwd = Path(os.path.normpath(target))
+
+
+def _session_os(os_module: types.ModuleType) -> types.ModuleType:
+    path_module = session_module(os_module.path)
+    return SessionModule(os_module, {
+        **_resolved(os_module, (_OS_READERS, False), (_OS_WRITERS, True)),
+        "path": path_module,
+        "getcwd": _getcwd,
+        "getcwdb": _getcwdb,
+        "chdir": _chdir,
+    })
+
+
+def _session_os_path(path_module: types.ModuleType) -> types.ModuleType:
+    return SessionModule(path_module, _resolved(path_module, (_OS_PATH_FUNCTIONS, False)))
+
+
+def _session_glob(glob_module: types.ModuleType) -> types.ModuleType:
+    return SessionModule(glob_module, _resolved(glob_module, (_GLOB_FUNCTIONS, False)))
+
+
+def _session_shutil(shutil_module: types.ModuleType) -> types.ModuleType:
+    return SessionModule(shutil_module, _resolved(shutil_module, (_SHUTIL_READERS, False), (_SHUTIL_WRITERS, True)))
+
+
+class _SessionPathType(type):
+    """Metaclass of the session ``Path``: construction anchors relative paths, everything else is the real class"""
+
+    def __call__(cls, *args, **kwargs):
+        return resolve_path(cls.__wrapped__(*args, **kwargs))
+
+    def __instancecheck__(cls, instance) -> bool:
+        return isinstance(instance, cls.__wrapped__)
+
+    def __subclasscheck__(cls, subclass) -> bool:
+        return issubclass(subclass, cls.__wrapped__)
+
+    def __getattr__(cls, name: str) -> Any:
+        return getattr(cls.__wrapped__, name)
+
+
+def _session_path_class(path_class: type) -> type:
+    """Session view of a concrete ``pathlib`` class; the paths it makes are ordinary, absolute paths"""
+
+    def cwd(cls):
+        session = _current.get()
+        return path_class(session.cwd) if session is not None else path_class.cwd()
+
+    return _SessionPathType(path_class.__name__, (), {
+        "__wrapped__": path_class,
+        "__module__": path_class.__module__,
+        "__doc__": path_class.__doc__,
+        "cwd": classmethod(cwd),
+    })
+
+
+def _session_pathlib(pathlib_module: types.ModuleType) -> types.ModuleType:
+    concrete = type(pathlib_module.Path())
+    return SessionModule(pathlib_module, {
+        "Path": _session_path_class(pathlib_module.Path),
+        concrete.__name__: _session_path_class(concrete),
+    })
+
+
+# Standard library modules whose process-wide working directory cells see through a session view
+_SESSION_MODULE_BUILDERS = {
+    "os": _session_os,
+    os.path.__name__: _session_os_path,
+    "glob": _session_glob,
+    "shutil": _session_shutil,
+    "pathlib": _session_pathlib,
+}
+_session_modules: Dict[str, types.ModuleType] = {}
+_session_modules_lock = threading.RLock()  # Re-entered: the os view builds the os.path view
+
+
+def session_module(module: Any) -> Any:
+    """The session view of ``module`` if it is one of the working-directory modules, else ``module`` itself"""
+    name = getattr(module, "__name__", None)
+    builder = _SESSION_MODULE_BUILDERS.get(name) if isinstance(module, types.ModuleType) else None
+    if builder is None or isinstance(module, SessionModule):
+        return module
+    view = _session_modules.get(name)
+    if view is None:
+        with _session_modules_lock:
+            view = _session_modules.get(name)
+            if view is None:
+                view = _session_modules[name] = builder(module)
+    return view
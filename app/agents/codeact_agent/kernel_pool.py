@@ -0,0 +1,758 @@
+"""
+Kernel Pool for CodeAct Agent
+
+Runs execution contexts in pre-warmed worker processes so heavy cells execute
+outside the server process, in parallel across cores, and pins each session to
+one worker so its variables stay resident between cycles.
+"""
+
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+
+from .execution_context import ExecutionContext, format_timeout_observation
+from .schemas import VariableHandle
+from .session_registry import SessionRegistry
+
+
+# Libraries imported once by the fork server so every worker starts warm
+PRELOAD_MODULES = [
+    "pandas",
+    "numpy",
+    "matplotlib",
+    "matplotlib.pyplot",
+    "seaborn",
+]
+
+
+# Extra time a worker gets to deliver its own timeout observation before it is killed
+CELL_TIMEOUT_GRACE_SECONDS = 5.0
+
+# How long a killed worker's checkpoint gets to take over before the worker is replaced
+CHECKPOINT_RESUME_SECONDS = 5.0
+
+# Requests that run a cell and get a checkpoint taken before them
+_CHECKPOINTED_METHODS = {"execute_code", "run_cell"}
+
+# Requests that leave session state untouched and keep the current checkpoint valid
+_READ_ONLY_METHODS = {
+    "get_context",
+    "get_available_variables",
+    "get_execution_history",
+    "estimate_memory",
+    "memory_report",
+    "get_workspace_info",
+    "last_cell_changes",
+    "resource_usage",
+    "import_report",
+    "cache_stats",
+    "load_cache_stats",
+    "sql_stats",
+}
+
+# Commands a worker sends its checkpoint over the control pipe
+_DISCARD = b"d"
+_RESUME = b"r"
+
+
+class KernelCrashedError(RuntimeError):
+    """Raised when a kernel worker process dies while serving a request
+    
+    ``restored`` is set when the worker's pre-cell checkpoint took over, so the
+    session kept its variables as they were before the failed cell.
+    """
+    
+    def __init__(self, message: str, restored: bool = False):
+        super().__init__(message)
+        self.restored = restored
+
+
+class KernelTimeoutError(KernelCrashedError):
+    """Raised when a kernel worker is killed for missing its deadline"""
+
+
+def _picklable(variables: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the variables that can be sent back to the server process"""
+    result = {}
+    for key, value in variables.items():
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue  # Live handles (connections, generators, ...) stay in the kernel
+        result[key] = value
+    return result
+
+
+# Discarded checkpoints still to be reaped by the worker that forked them
+_discarded_pids: List[int] = []
+
+
+class _Checkpoint:
+    """Copy-on-write fork of a worker taken right before one of its cells
+    
+    The forked child holds the pre-cell memory image while it waits on a pipe.
+    It exits when the checkpoint is discarded, and takes over serving requests
+    when the cell is undone or the worker dies running it.
+    """
+    
+    def __init__(self, key: Hashable, pid: int, control_fd: int):
+        self.key = key
+        self.pid = pid
+        self._control_fd = control_fd
+    
+    def discard(self):
+        try:
+            os.write(self._control_fd, _DISCARD)
+        except OSError:
+            pass  # Already gone
+        os.close(self._control_fd)
+        _discarded_pids.append(self.pid)
+        _reap_discarded()
+    
+    def resume(self):
+        """Hand the worker over to the checkpoint; the caller must exit right after"""
+        os.write(self._control_fd, _RESUME)
+        os.close(self._control_fd)
+
+
+def _take_checkpoint(key: Hashable) -> Tuple[Optional[_Checkpoint], Optional[str]]:
+    """
+    Fork a checkpoint of the current worker
+    
+    Returns the checkpoint in the worker. In the forked child the call only
+    returns once the checkpoint is resumed, with None and the reason it took
+    over: "undo", or "crashed" when the worker died.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(read_fd)
+        return _Checkpoint(key, pid, write_fd), None
+
+    os.close(write_fd)
+    command = os.read(read_fd, 1)  # Empty once the worker is gone
+    os.close(read_fd)
+    if command == _DISCARD:
+        os._exit(0)
+    _discarded_pids.clear()  # Children of the worker, not of this process
+    return None, "undo" if command == _RESUME else "crashed"
+
+
+def _reap_discarded():
+    for pid in list(_discarded_pids):
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done = pid
+        if done:
+            _discarded_pids.remove(pid)
+
+
+def _worker_main(conn, registry_options: Dict[str, Any], checkpoints: bool = False):
+    """Serve execution requests for the sessions pinned to this worker"""
+    # The server owns shutdown; a terminal Ctrl+C must not abort a running cell
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    registry = SessionRegistry(**registry_options)
+    checkpoint: Optional[_Checkpoint] = None
+
+    # Live output is sent from a timer thread while the main thread may reply
+    send_lock = threading.Lock()
+
+    def send(message: Tuple):
+        with send_lock:
+            conn.send(message)
+
+    # The server cancels the running cell with SIGUSR1
+    running: Dict[str, ExecutionContext] = {}
+
+    def cancel_cell(signum, frame):
+        context = running.get("context")
+        if context is not None:
+            context.cancel()
+
+    signal.signal(signal.SIGUSR1, cancel_cell)
+    send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        op = message[0]
+        if op == "shutdown":
+            break
+
+        if op == "call" and message[3] in _CHECKPOINTED_METHODS and checkpoints:
+            if checkpoint is not None:
+                checkpoint.discard()
+            checkpoint, resumed = _take_checkpoint(message[1])
+            if resumed == "crashed":
+                # This process is the pre-cell image taking over from a dead worker
+                try:
+                    send(("restored", os.getpid()))
+                except OSError:
+                    break
+            if resumed:
+                continue
+        elif op == "close" or (op == "call" and message[3] not in _READ_ONLY_METHODS):
+            # Anything else that changes state would be silently reverted by an undo
+            if checkpoint is not None:
+                checkpoint.discard()
+                checkpoint = None
+
+        try:
+            if op == "close":
+                _, key = message
+                result = registry.evict(key)
+            elif op == "undo":
+                _, key = message
+                context = registry.get(key)
+                if context is not None and checkpoint is not None and checkpoint.key == key:
+                    # Jump back to the pre-cell process image instead of reverting in place
+                    send(("moved", (checkpoint.pid, context.last_cell_changes())))
+                    checkpoint.resume()
+                    os._exit(0)
+                result = context.undo_last_cell() if context is not None else None
+                if checkpoint is not None:
+                    # Undone in place, so the checkpoint no longer matches this session
+                    checkpoint.discard()
+                    checkpoint = None
+            else:
+                _, key, spec, method, args, kwargs = message
+                workspace_dir, framework_document_path = spec
+                context = registry.get_or_create(
+                    key, lambda: ExecutionContext(workspace_dir, framework_document_path, isolated=True)
+                )
+                context.activate()
+                if kwargs.pop("stream_output", False):
+                    kwargs["on_output"] = lambda chunk: send(("output", chunk))
+                running["context"] = context
+                try:
+                    result = getattr(context, method)(*args, **kwargs)
+                finally:
+                    running.pop("context", None)
+                if method == "execute_code":
+                    output, new_variables = result
+                    result = (output, _picklable(new_variables))
+            send(("ok", result))
+        except Exception as e:
+            send(("error", f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+
+    if checkpoint is not None:
+        checkpoint.discard()
+    registry.clear()
+    conn.close()
+
+
+class _KernelWorker:
+    """Server-side handle on one kernel worker process"""
+
+    def __init__(self, mp_context, registry_options: Dict[str, Any], checkpoints: bool = False):
+        self.conn, child_conn = mp_context.Pipe()
+        self.checkpoints = checkpoints
+        self.process = mp_context.Process(
+            target=_worker_main,
+            args=(child_conn, registry_options, checkpoints),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        # Requests on one worker are serialized; different workers run in parallel
+        self.lock = threading.Lock()
+        self.sessions: set = set()
+        # Session whose request is in flight, so a cancel only reaches its own cell
+        self.active_key: Optional[Hashable] = None
+        self.last_used = time.monotonic()
+        self.pid: Optional[int] = None
+        self.ready = False
+
+    def wait_ready(self):
+        """Block until the worker has finished importing its libraries"""
+        if self.ready:
+            return
+        with self.lock:
+            if not self.ready:
+                _, self.pid = self._recv()
+                self.ready = True
+
+    def request(
+        self,
+        message: Tuple,
+        timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Any:
+        """Send one request and wait for its reply, killing the worker past the deadline"""
+        self.wait_ready()
+        with self.lock:
+            self.last_used = time.monotonic()
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            try:
+                self.conn.send(message)
+            except (BrokenPipeError, OSError) as e:
+                raise KernelCrashedError(f"Kernel worker {self.pid} is gone: {e}") from e
+            self.active_key = message[1] if len(message) > 1 else None
+            try:
+                while True:
+                    if deadline is not None and not self.conn.poll(max(0.0, deadline - time.monotonic())):
+                        # Stuck outside the interpreter (e.g. in a native call): only a kill stops it
+                        pid = self.pid
+                        self._kill()
+                        raise KernelTimeoutError(
+                            f"Kernel worker {pid} did not respond within {timeout:g}s",
+                            restored=self._await_checkpoint()
+                        )
+                    status, payload = self._recv()
+                    if status != "output":
+                        break
+                    # Live output of the running cell; the reply follows
+                    if on_output is not None:
+                        on_output(payload)
+            finally:
+                self.active_key = None
+            self.last_used = time.monotonic()
+
+        if status == "restored":
+            pid, self.pid = self.pid, payload
+            raise KernelCrashedError(f"Kernel worker {pid} died while running the cell", restored=True)
+        if status == "moved":
+            # The worker handed over to its checkpoint process
+            self.pid, payload = payload
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def _await_checkpoint(self) -> bool:
+        """Wait for the checkpoint of a killed worker to take over"""
+        if not self.checkpoints:
+            return False
+        deadline = time.monotonic() + CHECKPOINT_RESUME_SECONDS
+        while self.conn.poll(max(0.0, deadline - time.monotonic())):
+            try:
+                status, payload = self.conn.recv()
+            except (EOFError, OSError):
+                return False  # No checkpoint was waiting
+            if status == "restored":
+                self.pid = payload
+                return True
+            # Output or a reply that raced the kill; the checkpoint's message follows it
+        return False
+
+    def _recv(self) -> Tuple[str, Any]:
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise KernelCrashedError(
+                f"Kernel worker {self.pid} exited with code {self.process.exitcode}"
+            ) from e
+
+    def is_alive(self) -> bool:
+        if self.pid in (None, self.process.pid):
+            return self.process.is_alive()
+        return _pid_alive(self.pid)
+
+    def _kill(self):
+        """Kill the process currently serving this worker"""
+        if self.pid in (None, self.process.pid):
+            self.process.kill()
+            return
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def shutdown(self, timeout: float = 5.0):
+        """Ask the worker to exit, killing it if it does not"""
+        try:
+            with self.lock:
+                self.conn.send(("shutdown",))
+        except (BrokenPipeError, OSError):
+            pass
+        deadline = time.monotonic() + timeout
+        self.process.join(timeout)
+        # A worker that moved to a checkpoint process is not our child and cannot be joined
+        while self.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.is_alive():
+            self._kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process that is not our child is still running"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Orphans linger as zombies until init reaps them
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class KernelSession:
+    """Proxy exposing the ExecutionContext API for a session pinned to a worker"""
+
+    def __init__(self, pool: "KernelPool", key: Hashable, workspace_dir: str, framework_document_path: str = None):
+        self.pool = pool
+        self.key = key
+        self.spec = (workspace_dir, framework_document_path)
+        # Whether the worker already holds the variables carried in graph state
+        self._synced = False
+
+    def _call(
+        self,
+        method: str,
+        *args,
+        _deadline: Optional[float] = None,
+        _on_output: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> Any:
+        if _on_output is not None:
+            kwargs["stream_output"] = True
+        return self._request(("call", self.key, self.spec, method, args, kwargs), _deadline, _on_output)
+
+    def _request(
+        self,
+        message: Tuple,
+        timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Any:
+        worker = self.pool._worker_for(self.key)
+        try:
+            return worker.request(message, timeout=timeout, on_output=on_output)
+        except KernelCrashedError as e:
+            if e.restored:
+                self.pool._count_restore()
+            else:
+                self.pool._discard_worker(worker)
+            raise
+
+    def execute_code(
+        self,
+        code: str,
+        existing_context: Dict[str, Any] = None,
+        timeout: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Execute code in the session's kernel, mirroring ExecutionContext.execute_code"""
+        # Variables already live in the pinned worker; only resend them after a restart
+        context = None if self._synced else existing_context
+        deadline = timeout + CELL_TIMEOUT_GRACE_SECONDS if timeout else None
+        try:
+            result = self._call(
+                "execute_code", code, context, timeout, max_output_tokens, _deadline=deadline, _on_output=on_output
+            )
+        except KernelTimeoutError as e:
+            return f"{format_timeout_observation(timeout)}\n{_recovery_note(e)}", {}
+        except KernelCrashedError as e:
+            return f"Error: the execution kernel crashed ({e}).\n{_recovery_note(e)}", {}
+        self._synced = True
+        return result
+
+    def run_cell(
+        self,
+        code: str,
+        handles: Dict[str, VariableHandle] = None,
+        timeout: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        on_output: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Dict[str, Optional[VariableHandle]]]:
+        """Execute code against handle-based state, mirroring ExecutionContext.run_cell"""
+        # Only handles cross the process boundary; a restarted worker re-hydrates spilled or hibernated variables
+        deadline = timeout + CELL_TIMEOUT_GRACE_SECONDS if timeout else None
+        try:
+            return self._call(
+                "run_cell", code, handles, timeout, max_output_tokens, _deadline=deadline, _on_output=on_output
+            )
+        except KernelTimeoutError as e:
+            return f"{format_timeout_observation(timeout)}\n{_recovery_note(e)}", {}
+        except KernelCrashedError as e:
+            return f"Error: the execution kernel crashed ({e}).\n{_recovery_note(e)}", {}
+
+    def cancel(self) -> bool:
+        """Interrupt this session's running cell, mirroring ExecutionContext.cancel"""
+        with self.pool._lock:
+            worker = self.pool._affinity.get(self.key)
+        if worker is None or worker.active_key != self.key or worker.pid is None:
+            return False
+        try:
+            os.kill(worker.pid, signal.SIGUSR1)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def undo_last_cell(self) -> Optional[Dict[str, Optional[VariableHandle]]]:
+        """Revert the session to before its last cell, mirroring ExecutionContext.undo_last_cell"""
+        try:
+            return self._request(("undo", self.key))
+        except KernelCrashedError:
+            return None
+
+    def last_cell_changes(self) -> Dict[str, Optional[VariableHandle]]:
+        return self._call("last_cell_changes")
+
+    def resource_usage(self) -> Dict[str, Any]:
+        return self._call("resource_usage")
+
+    def import_report(self) -> Dict[str, Any]:
+        return self._call("import_report")
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._call("cache_stats")
+
+    def load_cache_stats(self) -> Dict[str, Any]:
+        return self._call("load_cache_stats")
+
+    def sql_stats(self) -> Dict[str, Any]:
+        return self._call("sql_stats")
+
+    def set_framework_document(self, framework_document_path: str = None):
+        if framework_document_path:
+            self.spec = (self.spec[0], framework_document_path)
+
+    def activate(self):
+        """Workers switch to the session workspace on every request"""
+
+    def get_context(self) -> Dict[str, Any]:
+        return {}
+
+    def get_available_variables(self) -> str:
+        return self._call("get_available_variables")
+
+    def get_execution_history(self) -> list:
+        return self._call("get_execution_history")
+
+    def clear_history(self):
+        return self._call("clear_history")
+
+    def estimate_memory(self) -> int:
+        return self._call("estimate_memory")
+
+    def memory_report(self) -> Dict[str, Any]:
+        return self._call("memory_report")
+
+    def get_workspace_info(self) -> str:
+        return self._call("get_workspace_info")
+
+    def cleanup(self):
+        self.pool.release(self.key)
+
+
+def _recovery_note(error: KernelCrashedError) -> str:
+    """Observation suffix telling the model what state the session was left in"""
+    if error.restored:
+        return "The kernel was restored to its state from before this cell; variables are unchanged."
+    return (
+        "The kernel had to be restarted; variables that were spilled or hibernated to disk will be reloaded "
+        "on next use, others must be recomputed."
+    )
+
+
+class KernelPool:
+    """Pre-warmed pool of kernel worker processes with session affinity"""
+
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: Optional[int] = None,
+        sessions_per_worker: int = 4,
+        idle_timeout: float = 300.0,
+        session_ttl: Optional[float] = 1800.0,
+        preload: List[str] = None,
+        checkpoints: bool = True,
+    ):
+        self.min_workers = min_workers
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sessions_per_worker = sessions_per_worker
+        self.idle_timeout = idle_timeout
+        self.session_ttl = session_ttl
+        # Fork a copy-on-write checkpoint of the worker before every cell
+        self.checkpoints = checkpoints and hasattr(os, "fork")
+
+        # Fork workers from a server that already imported the heavy libraries
+        methods = multiprocessing.get_all_start_methods()
+        self._mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            modules = PRELOAD_MODULES if preload is None else preload
+            self._mp_context.set_forkserver_preload([*modules, __name__])
+
+        # Session expiry is driven from here so the worker registries never evict on their own
+        self._registry_options = {
+            "max_sessions": 1 << 30,
+            "ttl_seconds": None,
+            "hibernate": settings.CODEACT_SESSION_HIBERNATION_ENABLED,
+        }
+
+        self._workers: List[_KernelWorker] = []
+        self._affinity: Dict[Hashable, _KernelWorker] = {}
+        self._sessions: Dict[Hashable, KernelSession] = {}
+        self._session_last_used: Dict[Hashable, float] = {}
+        self._lock = threading.RLock()
+
+        self.spawned = 0
+        self.retired = 0
+        self.crashes = 0
+        self.restores = 0
+
+    def start(self) -> "KernelPool":
+        """Start the minimum number of workers and wait for them to warm up"""
+        with self._lock:
+            while len(self._workers) < self.min_workers:
+                self._spawn()
+            workers = list(self._workers)
+        for worker in workers:
+            worker.wait_ready()
+        return self
+
+    def session(self, key: Hashable, workspace_dir: str, framework_document_path: str = None) -> KernelSession:
+        """Return a proxy for the session, pinning it to a worker"""
+        self._reap()
+        with self._lock:
+            self._worker_for(key)
+            proxy = self._sessions.get(key)
+            if proxy is None:
+                proxy = self._sessions[key] = KernelSession(self, key, workspace_dir, framework_document_path)
+        return proxy
+
+    def release(self, key: Hashable):
+        """Drop a session's kernel state and its worker pinning"""
+        with self._lock:
+            worker = self._affinity.pop(key, None)
+            self._sessions.pop(key, None)
+            self._session_last_used.pop(key, None)
+            if worker is None:
+                return
+            worker.sessions.discard(key)
+        try:
+            worker.request(("close", key))
+        except KernelCrashedError:
+            self._discard_worker(worker)
+
+    def shutdown(self):
+        """Stop every worker process"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._affinity.clear()
+            self._sessions.clear()
+            self._session_last_used.clear()
+        for worker in workers:
+            worker.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy and lifecycle counters"""
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "sessions": len(self._affinity),
+                "sessions_per_worker": [len(worker.sessions) for worker in self._workers],
+                "spawned": self.spawned,
+                "retired": self.retired,
+                "crashes": self.crashes,
+                "restores": self.restores,
+            }
+
+    def _worker_for(self, key: Hashable) -> _KernelWorker:
+        """Return the worker pinned to a session, assigning one on first use"""
+        with self._lock:
+            self._session_last_used[key] = time.monotonic()
+            worker = self._affinity.get(key)
+            if worker is not None:
+                return worker
+
+            worker = min(self._workers, key=lambda w: len(w.sessions), default=None)
+            if worker is None or (
+                len(worker.sessions) >= self.sessions_per_worker and len(self._workers) < self.max_workers
+            ):
+                worker = self._spawn()
+            worker.sessions.add(key)
+            self._affinity[key] = worker
+            return worker
+
+    def _spawn(self) -> _KernelWorker:
+        worker = _KernelWorker(self._mp_context, self._registry_options, self.checkpoints)
+        self._workers.append(worker)
+        self.spawned += 1
+        return worker
+
+    def _count_restore(self):
+        with self._lock:
+            self.restores += 1
+
+    def _discard_worker(self, worker: _KernelWorker):
+        """Forget a dead worker so its sessions are re-pinned on next use"""
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers.remove(worker)
+            for key in worker.sessions:
+                self._affinity.pop(key, None)
+                proxy = self._sessions.get(key)
+                if proxy is not None:
+                    proxy._synced = False
+            self.crashes += 1
+            while len(self._workers) < self.min_workers:
+                self._spawn()
+        worker.shutdown(timeout=0)
+
+    def _reap(self):
+        """Expire idle sessions and retire idle workers above the minimum"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, used in self._session_last_used.items()
+                if self.session_ttl and now - used > self.session_ttl
+            ]
+        for key in expired:
+            self.release(key)
+
+        retired = []
+        with self._lock:
+            for worker in list(self._workers):
+                if not worker.is_alive():
+                    self._discard_worker(worker)
+                elif (
+                    len(self._workers) > self.min_workers
+                    and not worker.sessions
+                    and now - worker.last_used > self.idle_timeout
+                ):
+                    self._workers.remove(worker)
+                    self.retired += 1
+                    retired.append(worker)
+        for worker in retired:
+            worker.shutdown()
+
+_kernel_pool: Optional[KernelPool] = None
+_kernel_pool_lock = threading.Lock()
+
+
+def get_kernel_pool() -> KernelPool:
+    """Return the process-wide kernel pool, starting it on first use"""
+    global _kernel_pool
+    with _kernel_pool_lock:
+        if _kernel_pool is None:
+            _kernel_pool = KernelPool(
+                min_workers=settings.CODEACT_KERNEL_POOL_MIN_WORKERS,
+                max_workers=settings.CODEACT_KERNEL_POOL_MAX_WORKERS,
+                sessions_per_worker=settings.CODEACT_KERNEL_POOL_SESSIONS_PER_WORKER,
+                idle_timeout=settings.CODEACT_KERNEL_POOL_IDLE_TIMEOUT_SECONDS,
+                session_ttl=settings.CODEACT_SESSION_TTL_SECONDS,
+                checkpoints=settings.CODEACT_KERNEL_CHECKPOINTS_ENABLED,
+            ).start()
+        return _kernel_pool
@@ -0,0 +1,80 @@
+"""
+Lazy Library Loading for CodeAct Agent
+
+The sandbox namespace exposes pandas, numpy, pyplot and seaborn under their
+usual aliases, but importing them all costs seconds. ``LazyModule`` stands in
+for a library and imports it on first attribute access, so server startup and
+sessions that never plot do not pay for matplotlib and seaborn. Every import a
+proxy triggers is timed for ``import_report``.
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+
+_report_lock = threading.Lock()
+_import_seconds: Dict[str, float] = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access
+
+    Subclasses ``ModuleType`` so code treating namespace modules specially
+    (skipping them when storing variables, say) still recognizes it.
+    ``on_load`` runs once, right after the import.
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[types.ModuleType], None]] = None):
+        super().__init__(name)
+        self.__dict__["_lazy_on_load"] = on_load
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _lazy_load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is not None:
+            return module
+        with self.__dict__["_lazy_lock"]:
+            module = self.__dict__["_lazy_module"]
+            if module is None:
+                name = self.__name__
+                already_loaded = name in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(name)
+                if not already_loaded:
+                    with _report_lock:
+                        _import_seconds.setdefault(name, time.perf_counter() - start)
+                on_load = self.__dict__["_lazy_on_load"]
+                if on_load is not None:
+                    on_load(module)
+                self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def _lazy_loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_load(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._lazy_load(), name, value)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._lazy_load())
+
+    def __repr__(self) -> str:
+        if self._lazy_loaded:
+            return repr(self.__dict__["_lazy_module"])
+        return f"<lazy module '{self.__name__}' (not imported yet)>"
+
+
+def import_report() -> Dict[str, Any]:
+    """Seconds spent importing each library a proxy loaded, slowest first"""
+    with _report_lock:
+        imports = dict(sorted(_import_seconds.items(), key=lambda item: item[1], reverse=True))
+    return {"imports": imports, "total_seconds": sum(imports.values())}
@@ -0,0 +1,235 @@
+"""
+Columnar Load Cache for CodeAct Agent
+
+Parsing a large CSV, Excel or JSON file with pandas takes minutes, and every
+session touching the same extract parses it again. ``load_data`` parses a file
+once and keeps a columnar copy (Arrow IPC, or a pickle without pyarrow) keyed
+by the file's path, size and modification time. Later loads, from any session
+of the server's user, memory-map the copy instead of parsing text. Copies are
+unpickled, so the cache directory is private to that user.
+
+Copies of an older version of a file are replaced when the file changes, and
+the least recently used copies are removed once the cache outgrows its budget.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+from .isolation import record_access, resolve_path
+from .object_store import private_directory, user_cache_dir
+
+
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# pandas reader per file suffix, with default arguments
+_READERS: Dict[str, tuple] = {
+    ".csv": ("read_csv", {}),
+    ".tsv": ("read_csv", {"sep": "\t"}),
+    ".txt": ("read_csv", {}),
+    ".xlsx": ("read_excel", {}),
+    ".xls": ("read_excel", {}),
+    ".json": ("read_json", {}),
+    ".jsonl": ("read_json", {"lines": True}),
+    ".parquet": ("read_parquet", {}),
+    ".feather": ("read_feather", {}),
+}
+
+# Formats that are columnar already and gain nothing from a copy
+_COLUMNAR_SUFFIXES = {".parquet", ".feather"}
+
+
+def _default_root() -> Path:
+    return Path(settings.CODEACT_LOAD_CACHE_DIR or user_cache_dir("load-cache"))
+
+
+class LoadCache:
+    """Per-user cache of data files converted to a columnar, memory-mappable format"""
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None):
+        self.root = private_directory(root)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.parse_seconds = 0.0
+        self.load_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def load(self, path: Any, **kwargs) -> Any:
+        """Load a data file as a DataFrame, from its columnar copy when one is current"""
+        import pandas as pd
+
+        path = resolve_path(path)
+        if not isinstance(path, (str, os.PathLike)):
+            return self._parse(path, kwargs)  # Buffers and URLs are read as they are
+        path = os.path.abspath(path)
+        record_access(path, writes=False)
+
+        suffix = Path(path).suffix.lower()
+        if suffix in _COLUMNAR_SUFFIXES:
+            return self._parse(path, kwargs)
+        stat = os.stat(path)
+
+        source_key = self._digest(path, sorted(kwargs.items()))
+        version_key = self._digest(stat.st_size, stat.st_mtime_ns)
+        for fmt in ("arrow", "pickle"):
+            copy_path = self.root / f"{source_key}-{version_key}.{fmt}"
+            if copy_path.exists():
+                try:
+                    return self._load_copy(copy_path, fmt)
+                except Exception:
+                    copy_path.unlink(missing_ok=True)  # Torn or incompatible copy; parse again
+
+        with self._lock:
+            self.misses += 1
+        start = time.perf_counter()
+        frame = self._parse(path, kwargs)
+        parse_seconds = time.perf_counter() - start
+        with self._lock:
+            self.parse_seconds += parse_seconds
+        if isinstance(frame, pd.DataFrame):  # read_excel(sheet_name=None) gives a dict
+            self._store(frame, source_key, version_key, parse_seconds)
+        return frame
+
+    @staticmethod
+    def _digest(*parts: Any) -> str:
+        return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+    @staticmethod
+    def _parse(path: Any, kwargs: Dict[str, Any]) -> Any:
+        import pandas as pd
+
+        suffix = Path(path).suffix.lower() if isinstance(path, (str, os.PathLike)) else ".csv"
+        reader, defaults = _READERS.get(suffix, _READERS[".csv"])
+        return getattr(pd, reader)(path, **{**defaults, **kwargs})
+
+    def _load_copy(self, copy_path: Path, fmt: str) -> Any:
+        start = time.perf_counter()
+        if fmt == "arrow":
+            from pyarrow import feather
+            # Memory-mapped: column buffers are paged in from the page cache, not read and parsed
+            frame = _writable(feather.read_table(copy_path, memory_map=True).to_pandas(split_blocks=True))
+        else:
+            with open(copy_path, "rb") as f:
+                frame = pickle.load(f)
+        load_seconds = time.perf_counter() - start
+
+        os.utime(copy_path)  # Recency for eviction
+        meta = self._read_meta(copy_path)
+        with self._lock:
+            self.hits += 1
+            self.load_seconds += load_seconds
+            self.saved_seconds += max(meta.get("parse_seconds", 0.0) - load_seconds, 0.0)
+        return frame
+
+    def _store(self, frame: Any, source_key: str, version_key: str, parse_seconds: float):
+        """Write the columnar copy atomically and drop copies of older versions of the file"""
+        for fmt in (["arrow", "pickle"] if ARROW_AVAILABLE else ["pickle"]):
+            copy_path = self.root / f"{source_key}-{version_key}.{fmt}"
+            tmp_path = copy_path.with_name(f".{copy_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                if fmt == "arrow":
+                    import pyarrow as pa
+                    from pyarrow import feather
+                    # Uncompressed so the copy can be memory-mapped
+                    feather.write_feather(pa.Table.from_pandas(frame), tmp_path, compression="uncompressed")
+                else:
+                    with open(tmp_path, "wb") as f:
+                        pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, copy_path)
+            except Exception:
+                continue  # e.g. mixed-type object columns are not Arrow-friendly
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+            copy_path.with_suffix(".json").write_text(json.dumps({"parse_seconds": parse_seconds}))
+            for stale in self.root.glob(f"{source_key}-*"):
+                if not stale.name.startswith(f"{source_key}-{version_key}."):
+                    stale.unlink(missing_ok=True)
+            self._evict()
+            return
+
+    @staticmethod
+    def _read_meta(copy_path: Path) -> Dict[str, Any]:
+        try:
+            return json.loads(copy_path.with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _evict(self):
+        """Remove least recently used copies until the cache fits its budget"""
+        if self.max_bytes is None:
+            return
+        copies = []
+        for copy_path in self.root.iterdir():
+            if copy_path.suffix in (".arrow", ".pickle"):
+                try:
+                    stat = copy_path.stat()
+                except OSError:
+                    continue
+                copies.append((stat.st_mtime, stat.st_size, copy_path))
+        total = sum(size for _, size, _ in copies)
+        for _, size, copy_path in sorted(copies, key=lambda copy: copy[0]):
+            if total <= self.max_bytes:
+                break
+            copy_path.unlink(missing_ok=True)
+            copy_path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loads = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / loads if loads else 0.0,
+                "parse_seconds": self.parse_seconds,
+                "load_seconds": self.load_seconds,
+                "saved_seconds": self.saved_seconds,
+                "format": "arrow" if ARROW_AVAILABLE else "pickle",
+            }
+
+
+def _writable(frame: Any) -> Any:
+    """Copy the columns Arrow handed over as read-only views, so cells can edit the frame in place"""
+    for position in range(frame.shape[1]):
+        column = frame.iloc[:, position]
+        if not column.to_numpy(copy=False).flags.writeable:
+            frame.isetitem(position, column.copy())
+    return frame
+
+
+_load_cache: Optional[LoadCache] = None
+_load_cache_lock = threading.Lock()
+
+
+def get_load_cache() -> LoadCache:
+    """Return the process-wide load cache, creating it on first use"""
+    global _load_cache
+    with _load_cache_lock:
+        if _load_cache is None:
+            max_mb = settings.CODEACT_LOAD_CACHE_MAX_MB
+            _load_cache = LoadCache(_default_root(), int(max_mb * 1024 * 1024) if max_mb else None)
+        return _load_cache
+
+
+def load_data(path: Any, **kwargs) -> Any:
+    """
+    Load a CSV, TSV, Excel or JSON file into a DataFrame
+
+    The first load parses the file and keeps a columnar copy; later loads of
+    the unchanged file, from any session, read the copy in seconds. Keyword
+    arguments are passed to the pandas reader (``read_csv``, ``read_excel``,
+    ``read_json``) and are part of the cache key.
+    """
+    return get_load_cache().load(path, **kwargs)
@@ -0,0 +1,226 @@
+"""
+Layered Execution Namespace for CodeAct Agent
+
+Provides the namespace cells execute in without copying it per cell:
+
+- base layer: libraries and workspace constants, served through the
+  namespace's ``__builtins__`` so they never mix with user variables
+- session layer: the namespace dict itself, holding persisted variables
+- cell layer: an undo log of the names the running cell writes, recorded
+  as the writes happen so new variables are known without key-set diffs
+"""
+
+import builtins
+import dis
+import types
+from typing import Any, Callable, Dict, Iterable, Iterator, Set, Tuple
+
+
+_MISSING = object()
+
+
+class _Unloaded:
+    """Undo-log entry for a lazy variable that was overwritten before it was loaded"""
+
+    __slots__ = ("loader",)
+
+    def __init__(self, loader: Callable[[], Any]):
+        self.loader = loader
+
+
+class SessionNamespace(dict):
+    """Write-tracking dict used as both globals and locals of executed cells
+
+    Module-level assignments, imports, ``def`` and ``del`` in a cell go
+    through ``__setitem__``/``__delitem__`` because the namespace is not an
+    exact dict. Writes made from inside functions via ``global`` bypass the
+    tracking; they still persist but are not reported as cell writes.
+    """
+
+    def __init__(self, base: Dict[str, Any] = None):
+        super().__init__()
+        # Base layer: real builtins overlaid with the environment's libraries
+        self._environment: Dict[str, Any] = dict(base or {})
+        self.base: Dict[str, Any] = {**builtins.__dict__, **self._environment}
+        dict.__setitem__(self, '__builtins__', self.base)
+
+        # Cell layer: previous value of every name the running cell wrote
+        self._writes: Dict[str, Any] = {}
+        self._recording = False
+
+        # Variables known to the session but not loaded yet, with their loaders
+        self._lazy: Dict[str, Callable[[], Any]] = {}
+
+    def __missing__(self, key: str) -> Any:
+        # Module-level name lookups in a cell land here for variables not loaded yet
+        if key in self._lazy:
+            return self._load(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if self._recording and key not in self._writes:
+            self._writes[key] = self._previous(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key in self._lazy:
+            self._load(key)
+        if self._recording and key not in self._writes:
+            self._writes[key] = self._previous(key)
+        dict.__delitem__(self, key)
+
+    def _previous(self, key: str) -> Any:
+        """Current binding of a name as recorded in the undo log"""
+        if key in self._lazy and not dict.__contains__(self, key):
+            return _Unloaded(self._lazy[key])
+        return dict.get(self, key, _MISSING)
+
+    def set_base(self, name: str, value: Any):
+        """Add a library or constant to the base layer"""
+        self._environment[name] = value
+        self.base[name] = value
+
+    def merge(self, variables: Dict[str, Any]):
+        """Bring externally held variables into the session layer without recording them"""
+        for key, value in variables.items():
+            if dict.get(self, key, _MISSING) is not value:
+                dict.__setitem__(self, key, value)
+
+    def add_lazy(self, key: str, loader: Callable[[], Any]):
+        """Register a variable that is loaded on first access"""
+        if not dict.__contains__(self, key):
+            self._lazy[key] = loader
+
+    def lazy_names(self) -> Iterable[str]:
+        """Variables registered for loading on first access"""
+        return list(self._lazy)
+
+    def spill(self, key: str, loader: Callable[[], Any]):
+        """Drop a variable from memory, reloading it through ``loader`` on next access"""
+        dict.pop(self, key)
+        self._lazy[key] = loader
+
+    def load_referenced(self, names: Set[str]):
+        """Load lazy variables a cell refers to (see ``referenced_names``)
+
+        Lookups from inside functions and comprehensions read the dict directly
+        and never reach ``__missing__``, so referenced names are loaded up front.
+        """
+        if not self._lazy:
+            return
+        for key in names & self._lazy.keys():
+            self._load(key)
+
+    def discard(self, key: str):
+        """Forget a variable, loaded or lazy, without recording the removal"""
+        dict.pop(self, key, None)
+        self._lazy.pop(key, None)
+
+    def _load(self, key: str) -> Any:
+        value = self._lazy.pop(key)()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def begin_cell(self):
+        """Start recording the writes of a new cell"""
+        self._writes = {}
+        self._recording = True
+
+    def commit_cell(self) -> Dict[str, Any]:
+        """Stop recording and return the variables the cell created or rebound"""
+        self._recording = False
+        for key in self._writes:
+            self._lazy.pop(key, None)
+        return {key: dict.__getitem__(self, key) for key in self._writes if dict.__contains__(self, key)}
+
+    def deleted_in_cell(self) -> Iterable[str]:
+        """Names that existed before the last cell and were deleted by it"""
+        return [
+            key for key, previous in self._writes.items()
+            if previous is not _MISSING and not dict.__contains__(self, key)
+        ]
+
+    def rollback_cell(self):
+        """Restore every name the last cell wrote to its previous binding
+
+        Also valid after ``commit_cell``, which keeps the log until the next
+        cell starts. Objects the cell mutated in place are not reverted.
+        """
+        self._recording = False
+        for key, previous in self._writes.items():
+            self.discard(key)
+            if isinstance(previous, _Unloaded):
+                self._lazy[key] = previous.loader
+            elif previous is not _MISSING:
+                dict.__setitem__(self, key, previous)
+        self._writes = {}
+
+    def clear_user(self):
+        """Drop every session variable, loaded or lazy, keeping the base layer"""
+        for key in [key for key in self if key != '__builtins__']:
+            dict.__delitem__(self, key)
+        self._lazy.clear()
+        self._writes = {}
+
+    def base_items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over the libraries and constants the environment provides"""
+        return iter(self._environment.items())
+
+    def user_items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over session-layer variables as they were when called"""
+        # Other threads (a running cell, registry memory accounting) may assign variables meanwhile
+        while True:
+            try:
+                items = list(dict.items(self))
+                break
+            except RuntimeError:
+                continue
+        return ((key, value) for key, value in items if key != '__builtins__')
+
+
+def referenced_names(code: types.CodeType) -> Set[str]:
+    """All global/free names a code object and its nested code objects refer to"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= referenced_names(const)
+    return names
+
+
+# Instructions through which a cell depends on the current value (or existence) of a global name
+_READ_OPS = frozenset({"LOAD_NAME", "LOAD_GLOBAL", "DELETE_NAME", "DELETE_GLOBAL"})
+
+
+def read_names(code: types.CodeType) -> Set[str]:
+    """Global names a code object and its nested code objects read, excluding pure writes and attributes"""
+    names = {instruction.argval for instruction in dis.get_instructions(code) if instruction.opname in _READ_OPS}
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= read_names(const)
+    return names
+
+
+def input_names(code: types.CodeType) -> Set[str]:
+    """Global names whose value before the cell can affect it
+
+    Reads, minus names the cell binds unconditionally before reading them:
+    a store counts only in the straight-line start of the cell, before any
+    jump or exception handling makes later stores conditional.
+    """
+    bytecode = dis.Bytecode(code)
+    straight_until = min((entry.start for entry in bytecode.exception_entries), default=None)
+    bound: Set[str] = set()
+    straight = True
+    names: Set[str] = set()
+    for instruction in bytecode:
+        if "JUMP" in instruction.opname or instruction.opname == "FOR_ITER" or (
+            straight_until is not None and instruction.offset >= straight_until
+        ):
+            straight = False
+        if instruction.opname in _READ_OPS and instruction.argval not in bound:
+            names.add(instruction.argval)
+        elif instruction.opname in ("STORE_NAME", "STORE_GLOBAL") and straight:
+            bound.add(instruction.argval)
+        elif instruction.opname == "LOAD_CONST" and isinstance(instruction.argval, types.CodeType):
+            names |= read_names(instruction.argval) - bound
+    return names
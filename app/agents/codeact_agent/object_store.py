@@ -0,0 +1,194 @@
+"""
+Object Store for CodeAct Agent
+
+Content-addressed on-disk store for session variables. Graph state only
+carries lightweight handles; the objects themselves stay in the session's
+kernel and are written here only when they leave memory (spilled under the
+memory budget or hibernated with the session), so they can be re-hydrated.
+"""
+
+import hashlib
+import importlib.util
+import os
+import pickle
+import stat
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .isolation import imported_module
+from .schemas import VariableHandle
+
+
+def _parquet_available() -> bool:
+    """Parquet needs an optional engine; fall back to pickle without one"""
+    return any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet"))
+
+
+PARQUET_AVAILABLE = _parquet_available()
+
+
+def private_directory(path: Path) -> Path:
+    """Create ``path`` if needed as a directory only the current user can access
+
+    Caches that unpickle the files they find must not read files another user
+    could have planted: a directory owned by someone else is refused, and one
+    owned by the current user is restricted to mode 0700.
+    """
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = path.stat()
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {path} is owned by another user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        path.chmod(0o700)
+    return path
+
+
+def user_cache_dir(name: str) -> Path:
+    """Per-user cache location ``$XDG_CACHE_HOME/codeact/<name>`` (``~/.cache`` by default)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "codeact" / name
+
+
+def _is_frame(value: Any) -> bool:
+    pd = imported_module("pandas")  # Nothing is a DataFrame before pandas was imported
+    return pd is not None and isinstance(value, pd.DataFrame)
+
+
+def _is_array(value: Any) -> bool:
+    np = imported_module("numpy")
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def content_hash(value: Any) -> Optional[str]:
+    """Stable digest of a value's content, or None if it cannot be hashed"""
+    digest = hashlib.blake2b(digest_size=16)
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    try:
+        if pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+            columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+            dtypes = list(map(str, value.dtypes)) if isinstance(value, pd.DataFrame) else [str(value.dtype)]
+            digest.update(repr((type(value).__name__, columns, dtypes)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        elif np is not None and isinstance(value, np.ndarray) and value.dtype != object:
+            digest.update(repr((value.dtype.str, value.shape)).encode())
+            digest.update(np.ascontiguousarray(value).data)
+        else:
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        try:
+            # Unhashable cells (lists in object columns, ...) still pickle
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return None
+    return digest.hexdigest()
+
+
+def describe(name: str, value: Any) -> VariableHandle:
+    """Build a handle with the variable's type and shape"""
+    shape = getattr(value, "shape", None)
+    try:
+        shape = [int(dim) for dim in shape] if shape is not None else None
+    except (TypeError, ValueError):
+        shape = None
+    # Memory-mapped arrays behave as (and are stored as) plain ndarrays
+    np = imported_module("numpy")
+    value_type = np.ndarray if np is not None and isinstance(value, np.memmap) else type(value)
+    return VariableHandle(name=name, type_name=value_type.__name__, shape=shape)
+
+
+class ObjectStore:
+    """Content-addressed variable store in a workspace directory
+
+    DataFrames are written as Parquet when an engine is installed, numeric
+    arrays as ``.npy`` and everything else as pickle. Objects are keyed by
+    content hash, so an unchanged variable is never written twice, and
+    ``collect`` deletes the objects no live handle refers to any more.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, name: str, value: Any) -> VariableHandle:
+        """Persist a variable (if not stored already) and return its handle"""
+        handle = describe(name, value)
+        handle.content_hash = content_hash(value)
+        if handle.content_hash is None:
+            return handle  # Lives only in the kernel; cannot be restored after eviction
+
+        for fmt in self._formats_for(value):
+            handle.format = fmt
+            path = self._path(handle)
+            try:
+                if not path.exists():
+                    self._write(path, fmt, value)
+            except Exception:
+                continue  # e.g. mixed-type object columns are not Parquet-friendly
+            handle.stored = True
+            handle.size_bytes = path.stat().st_size
+            return handle
+        return handle
+
+    def get(self, handle: VariableHandle, mmap: bool = False) -> Any:
+        """Load the object a handle refers to, optionally memory-mapping it"""
+        if not handle.stored:
+            raise KeyError(f"Variable '{handle.name}' was never stored and cannot be restored")
+        path = self._path(handle)
+        if handle.format == "parquet":
+            import pandas as pd
+            return pd.read_parquet(path, memory_map=mmap) if mmap else pd.read_parquet(path)
+        if handle.format == "npy":
+            import numpy as np
+            # Copy-on-write mapping: pages load on demand and writes never touch the store
+            return np.load(path, mmap_mode="c" if mmap else None, allow_pickle=False)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def contains(self, handle: VariableHandle) -> bool:
+        return handle.stored and self._path(handle).exists()
+
+    def collect(self, live: Iterable[Optional[VariableHandle]]) -> int:
+        """Delete stored objects that none of the ``live`` handles refers to; returns the bytes freed"""
+        keep = {self._path(handle).name for handle in live if handle is not None and handle.stored}
+        freed = 0
+        for path in self.root.iterdir():
+            if path.name in keep or path.name.startswith("."):
+                continue  # Dot files are writes in progress
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue  # Removed concurrently, or still mapped on platforms that forbid it
+            freed += size
+        return freed
+
+    def _formats_for(self, value: Any) -> list:
+        """Preferred storage formats for a value, best first"""
+        if _is_frame(value) and PARQUET_AVAILABLE:
+            return ["parquet", "pickle"]
+        if _is_array(value) and value.dtype != object:
+            return ["npy", "pickle"]
+        return ["pickle"]
+
+    def _path(self, handle: VariableHandle) -> Path:
+        return self.root / f"{handle.content_hash}.{handle.format}"
+
+    def _write(self, path: Path, fmt: str, value: Any):
+        """Write atomically so concurrent readers never see a partial file"""
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            if fmt == "parquet":
+                value.to_parquet(tmp_path)
+            elif fmt == "npy":
+                import numpy as np
+                with open(tmp_path, "wb") as f:
+                    np.save(f, value, allow_pickle=False)
+            else:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
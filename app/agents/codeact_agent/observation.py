@@ -0,0 +1,315 @@
+"""
+Observation Capture for CodeAct Agent
+
+Bounds what a cell can put into the conversation. Stdout is captured in a
+head/tail ring buffer sized from a token budget, and large DataFrames, Series
+and arrays print as compact summaries instead of full dumps. While a cell runs,
+its output can also be streamed live in rate-limited chunks.
+"""
+
+import builtins
+import contextlib
+import io
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Iterator, Optional
+
+from .isolation import imported_module
+from .resource_limits import OutputLimitExceeded
+
+
+# Rough characters-per-token ratio used to turn token budgets into buffer sizes
+CHARS_PER_TOKEN = 4
+
+# Share of the budget kept from the start of the output; the rest keeps the end
+HEAD_SHARE = 0.4
+
+# Objects up to this size print in full; larger ones are summarized
+COMPACT_MAX_ROWS = 20
+COMPACT_MAX_COLUMNS = 20
+
+# Rows and columns shown in a summary's preview and statistics
+SUMMARY_HEAD_ROWS = 5
+SUMMARY_COLUMNS = 10
+
+# Largest live chunk; output printed faster than it is streamed is elided in the middle
+STREAM_MAX_CHUNK_CHARS = 8000
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def elision_marker(elided_chars: int) -> str:
+    return f"\n... [{elided_chars:,} characters (~{elided_chars // CHARS_PER_TOKEN:,} tokens) elided] ...\n"
+
+
+def truncate_middle(text: str, max_chars: Optional[int]) -> str:
+    """Keep the head and tail of a text within ``max_chars``, marking the elided middle"""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    head_chars = int(max_chars * HEAD_SHARE)
+    tail_chars = max_chars - head_chars
+    head, tail = _snap_head(text[:head_chars]), _snap_tail(text[len(text) - tail_chars:])
+    return f"{head}{elision_marker(len(text) - len(head) - len(tail))}{tail}"
+
+
+def _snap_head(head: str) -> str:
+    """Cut the head back to a line boundary when one is close"""
+    cut = head.rfind("\n")
+    return head[:cut + 1] if cut >= len(head) // 2 else head
+
+
+def _snap_tail(tail: str) -> str:
+    """Start the tail at a line boundary when one is close"""
+    cut = tail.find("\n")
+    return tail[cut + 1:] if 0 <= cut <= len(tail) // 2 else tail
+
+
+class OutputStreamer:
+    """Coalesces captured output into rate-limited chunks for a live listener
+
+    Writes are buffered and handed to ``emit`` at most once per ``interval``;
+    a timer delivers pending output when a cell prints and then goes quiet.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str], None],
+        interval: float = 0.5,
+        max_chunk_chars: int = STREAM_MAX_CHUNK_CHARS,
+    ):
+        self.emit = emit
+        self.interval = interval
+        self.max_chunk_chars = max_chunk_chars
+        self.chunks = 0
+        self._pending = io.StringIO()
+        self._last_emit = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def write(self, text: str):
+        with self._lock:
+            if self._closed:
+                return
+            self._pending.write(text)
+            wait = self._last_emit + self.interval - time.monotonic()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            chunk = self._pending.getvalue()
+            if not chunk:
+                return
+            self._pending = io.StringIO()
+            self._last_emit = time.monotonic()
+            self.chunks += 1
+            try:
+                self.emit(truncate_middle(chunk, self.max_chunk_chars))
+            except Exception:
+                pass  # A broken listener must never fail the cell
+
+    def close(self):
+        """Deliver what is left and stop the timer; later writes are ignored"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.flush()
+        with self._lock:
+            self._closed = True
+
+
+class BoundedOutput(io.TextIOBase):
+    """Write-only text stream keeping the head and tail of what is written
+
+    Memory stays bounded by ``max_chars`` however much a cell prints; the
+    middle is dropped as it streams through and replaced by an elision marker.
+    Everything written is also passed to ``listener`` when one is given, and
+    writing past ``max_total`` stops the cell with ``OutputLimitExceeded``.
+    """
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        listener: Optional[OutputStreamer] = None,
+        max_total: Optional[int] = None,
+        limit_scope: str = "cell",
+    ):
+        self.max_chars = max_chars
+        self.listener = listener
+        self.max_total = max_total
+        self.limit_scope = limit_scope
+        self.head_chars = int(max_chars * HEAD_SHARE) if max_chars is not None else None
+        self.tail_chars = max_chars - self.head_chars if max_chars is not None else 0
+        self.total_chars = 0
+        self._head = io.StringIO()
+        self._head_len = 0
+        self._tail: deque = deque()
+        self._tail_len = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        written = len(text)
+        if self.max_total is not None and self.total_chars + written > self.max_total:
+            raise OutputLimitExceeded("output_bytes", self.limit_scope, self.max_total, self.total_chars + written)
+        self.total_chars += written
+        if self.listener is not None:
+            self.listener.write(text)
+
+        if self.head_chars is None or self._head_len < self.head_chars:
+            take = text if self.head_chars is None else text[:self.head_chars - self._head_len]
+            self._head.write(take)
+            self._head_len += len(take)
+            text = text[len(take):]
+
+        if text:
+            self._tail.append(text)
+            self._tail_len += len(text)
+            # Drop whole chunks that fall out of the tail window
+            while len(self._tail) > 1 and self._tail_len - len(self._tail[0]) >= self.tail_chars:
+                self._tail_len -= len(self._tail.popleft())
+        return written
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_chars > self._head_len + self._tail_len or self._tail_len > self.tail_chars
+
+    def getvalue(self) -> str:
+        head = self._head.getvalue()
+        tail = "".join(self._tail)
+        if not self.truncated:
+            return head + tail
+        head, tail = _snap_head(head), _snap_tail(tail[-self.tail_chars:] if self.tail_chars else "")
+        return f"{head}{elision_marker(self.total_chars - len(head) - len(tail))}{tail}"
+
+
+def compact_repr(value: Any) -> Optional[str]:
+    """Summary of a large DataFrame, Series or ndarray, or None to print it as usual"""
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    try:
+        if pd is not None and isinstance(value, pd.DataFrame):
+            return _summarize_frame(value)
+        if pd is not None and isinstance(value, pd.Series):
+            return _summarize_series(value)
+        if np is not None and isinstance(value, np.ndarray):
+            return _summarize_array(value, np)
+    except Exception:
+        return None  # Fall back to the object's own repr
+    return None
+
+
+def _summarize_frame(frame) -> Optional[str]:
+    rows, columns = frame.shape
+    if rows <= COMPACT_MAX_ROWS and columns <= COMPACT_MAX_COLUMNS:
+        return None
+
+    lines = [f"DataFrame: {rows:,} rows x {columns:,} columns"]
+    schema = ", ".join(f"{name} ({dtype})" for name, dtype in list(frame.dtypes.items())[:COMPACT_MAX_COLUMNS])
+    more = f", ... {columns - COMPACT_MAX_COLUMNS:,} more" if columns > COMPACT_MAX_COLUMNS else ""
+    lines.append(f"Columns: {schema}{more}")
+
+    preview = frame.iloc[:SUMMARY_HEAD_ROWS, :SUMMARY_COLUMNS]
+    lines.append(f"Head:\n{preview.to_string(max_colwidth=40)}")
+
+    numeric = frame.iloc[:, :SUMMARY_COLUMNS].select_dtypes("number")
+    if not numeric.empty:
+        stats = numeric.agg(["mean", "std", "min", "max"]).T
+        stats.insert(0, "nulls", numeric.isna().sum())
+        lines.append(f"Numeric summary:\n{stats.to_string(float_format=lambda x: f'{x:.4g}')}")
+    return "\n".join(lines)
+
+
+def _summarize_series(series) -> Optional[str]:
+    if len(series) <= COMPACT_MAX_ROWS:
+        return None
+
+    lines = [f"Series '{series.name}': {len(series):,} values ({series.dtype}), {int(series.isna().sum()):,} nulls"]
+    lines.append(f"Head:\n{series.head(SUMMARY_HEAD_ROWS).to_string(max_rows=SUMMARY_HEAD_ROWS)}")
+    if series.dtype.kind in "iufb":
+        stats = series.agg(["mean", "std", "min", "max"])
+        lines.append("Stats: " + ", ".join(f"{name}={value:.4g}" for name, value in stats.items()))
+    else:
+        counts = series.value_counts().head(SUMMARY_HEAD_ROWS)
+        lines.append(f"{series.nunique():,} distinct; most common:\n{counts.to_string()}")
+    return "\n".join(lines)
+
+
+def _summarize_array(array, np) -> Optional[str]:
+    if array.size <= COMPACT_MAX_ROWS * COMPACT_MAX_COLUMNS and (array.ndim < 1 or array.shape[0] <= COMPACT_MAX_ROWS):
+        return None
+
+    lines = [f"ndarray: shape {array.shape}, dtype {array.dtype}"]
+    lines.append(np.array2string(array, threshold=COMPACT_MAX_ROWS, edgeitems=3, precision=4))
+    if array.dtype.kind in "iuf" and array.size:
+        lines.append(
+            f"Stats: mean={np.nanmean(array):.4g}, std={np.nanstd(array):.4g}, "
+            f"min={np.nanmin(array):.4g}, max={np.nanmax(array):.4g}"
+        )
+    return "\n".join(lines)
+
+
+def observation_print(*args, **kwargs):
+    """``print`` for executed cells: large data objects print as compact summaries"""
+    if kwargs.get("file") is None:
+        args = tuple(_compact_or_self(arg) for arg in args)
+    builtins.print(*args, **kwargs)
+
+
+def _compact_or_self(value: Any) -> Any:
+    summary = compact_repr(value)
+    return value if summary is None else summary
+
+
+_PANDAS_DISPLAY_OPTIONS = {
+    "display.max_rows": COMPACT_MAX_ROWS,
+    "display.min_rows": SUMMARY_HEAD_ROWS * 2,
+    "display.max_columns": COMPACT_MAX_COLUMNS,
+    "display.max_colwidth": 50,
+}
+
+# pandas options are process-wide: the first running cell sets them and the last one restores them,
+# so cells overlapping in different threads never restore each other's settings halfway
+_display_lock = threading.Lock()
+_display_users = 0
+_display_saved: dict = {}
+
+
+@contextlib.contextmanager
+def compact_display() -> Iterator[None]:
+    """Display options that keep implicit reprs (f-strings, ``str(df)``) short"""
+    global _display_users
+    pd = imported_module("pandas")
+    np = imported_module("numpy")
+    if pd is not None:
+        with _display_lock:
+            if _display_users == 0:
+                _display_saved.update((key, pd.get_option(key)) for key in _PANDAS_DISPLAY_OPTIONS)
+                for key, value in _PANDAS_DISPLAY_OPTIONS.items():
+                    pd.set_option(key, value)
+            _display_users += 1
+    try:
+        with contextlib.ExitStack() as stack:
+            if np is not None:
+                # Context-local since numpy 2.1, so overlapping cells need no coordination
+                stack.enter_context(np.printoptions(threshold=COMPACT_MAX_ROWS * COMPACT_MAX_COLUMNS, edgeitems=3))
+            yield
+    finally:
+        if pd is not None:
+            with _display_lock:
+                _display_users -= 1
+                if _display_users == 0:
+                    for key, value in _display_saved.items():
+                        pd.set_option(key, value)
+                    _display_saved.clear()
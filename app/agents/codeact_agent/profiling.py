@@ -0,0 +1,261 @@
+"""
+Data-Quality Profiling for CodeAct Agent
+
+The data-quality framework asks for completeness, uniqueness, validity and
+consistency checks on every column of a table. Writing those as ad-hoc pandas
+cells costs several model round trips per table; ``profile_data`` computes
+them for all columns at once and prints as a compact summary sized for the
+prompt:
+
+- completeness: nulls and null ratio
+- uniqueness: distinct values, duplicate rows (or duplicate keys)
+- validity: values outside the column's dominant shape pattern (digits as
+  ``9``, letters as ``A``/``a``, as in the framework's pattern analysis) or
+  outside a caller-supplied regex; leading/trailing whitespace
+- outliers: values more than 3 standard deviations from the mean, and
+  outside the 1.5 x IQR fences
+- type drift: text columns whose values parse as more than one kind
+  (number, date, boolean, text)
+
+Counts over the whole table (nulls, distinct values, duplicates, ranges) are
+exact. Pattern, outlier and type-drift checks run on a fixed random sample
+once a table is longer than ``sample_rows``, and their counts are scaled to
+the full table.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+from .load_cache import load_data
+
+
+# Share of a column's values that must follow one shape before others count as violations
+DOMINANT_PATTERN_SHARE = 0.8
+
+# Columns, metrics and issues shown by ``DataProfile.summary``; the rest are in ``.columns`` and ``.issues``
+SUMMARY_MAX_COLUMNS = 40
+SUMMARY_MAX_ISSUES = 30
+SUMMARY_METRICS = ["dtype", "null_ratio", "distinct", "min", "max", "top_pattern"]
+
+_ISO_DATE = r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?"
+_SLASH_DATE = r"^\d{1,2}/\d{1,2}/\d{2,4}$"
+_BOOLEANS = ["true", "false", "yes", "no", "y", "n"]
+
+
+@dataclass
+class DataProfile:
+    """Per-column quality metrics of a table, printed as a compact summary"""
+
+    rows: int
+    columns: Any  # DataFrame indexed by column name
+    duplicate_rows: int
+    sampled_rows: Optional[int] = None
+    key_columns: Optional[List[str]] = None
+    issues: List[str] = field(default_factory=list)
+
+    def summary(self, max_columns: int = SUMMARY_MAX_COLUMNS, max_issues: int = SUMMARY_MAX_ISSUES) -> str:
+        """Table size, duplicates, the metrics table and the issues found"""
+        lines = [f"Profile: {self.rows:,} rows x {len(self.columns):,} columns"]
+        if self.sampled_rows is not None:
+            lines[0] += f" (patterns, outliers and type drift from a {self.sampled_rows:,}-row sample)"
+        duplicates = f"Duplicate keys ({', '.join(self.key_columns)})" if self.key_columns else "Duplicate rows"
+        lines.append(f"{duplicates}: {self.duplicate_rows:,}")
+
+        shown = self.columns.iloc[:max_columns][SUMMARY_METRICS].astype(object)
+        shown["null_ratio"] = shown["null_ratio"].map(lambda ratio: f"{ratio:.1%}")
+        for name in ("min", "max"):
+            shown[name] = shown[name].map(_format_bound)
+        lines.append(shown.where(shown.notna(), "").to_string(max_colwidth=24))
+        if len(self.columns) > max_columns:
+            lines.append(f"... {len(self.columns) - max_columns:,} more columns in .columns")
+
+        if self.issues:
+            lines.append("Issues:")
+            lines.extend(f"- {issue}" for issue in self.issues[:max_issues])
+            if len(self.issues) > max_issues:
+                lines.append(f"... {len(self.issues) - max_issues:,} more in .issues")
+        else:
+            lines.append("Issues: none found")
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
+
+
+def _format_bound(value: Any) -> Any:
+    if isinstance(value, float):
+        return "" if value != value else f"{value:.4g}"
+    return value
+
+
+def shape_pattern(values: Any) -> Any:
+    """Shape of each string: digits become ``9``, upper-case letters ``A``, lower-case ``a``"""
+    return (
+        values.str.replace(r"[0-9]", "9", regex=True)
+        .str.replace(r"[A-Z]", "A", regex=True)
+        .str.replace(r"[a-z]", "a", regex=True)
+    )
+
+
+def _value_kinds(text: Any) -> Any:
+    """Kind each value parses as: number, date, bool or text"""
+    import numpy as np
+    import pandas as pd
+
+    stripped = text.str.strip()
+    is_number = pd.to_numeric(stripped, errors="coerce").notna()
+    is_date = stripped.str.match(_ISO_DATE) | stripped.str.match(_SLASH_DATE)
+    is_bool = stripped.str.lower().isin(_BOOLEANS)
+    kinds = np.select([is_number, is_date, is_bool], ["number", "date", "bool"], "text")
+    return pd.Series(kinds, index=text.index)
+
+
+def _distinct_counts(frame: Any) -> Any:
+    import pandas as pd
+
+    try:
+        return frame.nunique()
+    except TypeError:  # Lists or dicts in an object column
+        return pd.Series({
+            column: values.astype(str).where(values.notna()).nunique() for column, values in frame.items()
+        }, dtype="int64")
+
+
+def _duplicates(frame: Any, key_columns: Optional[Sequence[str]]) -> int:
+    subset = list(key_columns) if key_columns else None
+    try:
+        return int(frame.duplicated(subset=subset).sum())
+    except TypeError:
+        return int(frame.astype(str).duplicated(subset=subset).sum())
+
+
+def profile_data(
+    data: Any,
+    sample_rows: Optional[int] = None,
+    key_columns: Optional[Sequence[str]] = None,
+    patterns: Optional[Dict[str, str]] = None,
+    z_threshold: float = 3.0,
+    **kwargs,
+) -> DataProfile:
+    """
+    Profile every column of a table for data-quality issues in one pass
+
+    ``data`` is a DataFrame or a file path (loaded with ``load_data``, which
+    receives ``kwargs``). ``key_columns`` counts duplicate keys instead of
+    duplicate rows; ``patterns`` maps columns to the regex their values must
+    fully match. ``print`` the result for a compact summary; ``.columns``
+    holds the full metrics table and ``.issues`` every issue found.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = data if isinstance(data, pd.DataFrame) else load_data(data, **kwargs)
+    rows = len(frame)
+    sample_rows = sample_rows or settings.CODEACT_PROFILE_SAMPLE_ROWS
+    sample = frame.sample(n=sample_rows, random_state=0) if rows > sample_rows else frame
+    scale = rows / len(sample) if len(sample) else 1.0
+    patterns = patterns or {}
+
+    # Whole-table counts, each one vectorized across all columns
+    nulls = frame.isna().sum()
+    non_null = rows - nulls
+    distinct = _distinct_counts(frame)
+    metrics = pd.DataFrame({
+        "dtype": frame.dtypes.astype(str),
+        "nulls": nulls,
+        "null_ratio": nulls / rows if rows else 0.0,
+        "distinct": distinct,
+        "distinct_ratio": (distinct / non_null.replace(0, np.nan)).fillna(0.0),
+    })
+
+    numeric = frame.select_dtypes(include=["number"], exclude=["bool"])
+    ranged = frame.select_dtypes(include=["number", "datetime", "datetimetz"], exclude=["bool"])
+    metrics["min"] = pd.Series(ranged.min().to_dict(), dtype=object).reindex(metrics.index)
+    metrics["max"] = pd.Series(ranged.max().to_dict(), dtype=object).reindex(metrics.index)
+
+    # Outliers: z-scores as in the framework, and Tukey's IQR fences
+    metrics["outliers"] = pd.Series(0, index=metrics.index)
+    metrics["iqr_outliers"] = pd.Series(0, index=metrics.index)
+    sampled_numeric = sample[numeric.columns]
+    if not sampled_numeric.empty:
+        mean, std = sampled_numeric.mean(), sampled_numeric.std()
+        z_outliers = ((sampled_numeric - mean).abs() > z_threshold * std.replace(0, np.nan)).sum()
+        quartiles = sampled_numeric.quantile([0.25, 0.75])
+        spread = quartiles.loc[0.75] - quartiles.loc[0.25]
+        fences = (sampled_numeric < quartiles.loc[0.25] - 1.5 * spread) | (sampled_numeric > quartiles.loc[0.75] + 1.5 * spread)
+        metrics.loc[numeric.columns, "outliers"] = (z_outliers * scale).round().astype(int)
+        metrics.loc[numeric.columns, "iqr_outliers"] = (fences.sum() * scale).round().astype(int)
+
+    # Text columns: shape patterns, whitespace and type drift
+    text_columns = [
+        column for column in frame.columns
+        if frame[column].dtype == object or isinstance(frame[column].dtype, pd.StringDtype)
+    ]
+    metrics["top_pattern"] = metrics["kind"] = None
+    metrics["pattern_ratio"] = metrics["type_drift"] = np.nan
+    metrics["pattern_violations"] = metrics["whitespace"] = 0
+    for column in text_columns:
+        values = sample[column].dropna()
+        if values.empty:
+            continue
+        text = values.astype(str)
+        if column in patterns:
+            matches = text.str.fullmatch(patterns[column])
+            top, share = patterns[column], float(matches.mean())
+        else:
+            shapes = shape_pattern(text).value_counts(normalize=True)
+            top, share = shapes.index[0], float(shapes.iloc[0])
+        metrics.at[column, "top_pattern"] = top
+        metrics.at[column, "pattern_ratio"] = share
+        if column in patterns or share >= DOMINANT_PATTERN_SHARE:
+            metrics.at[column, "pattern_violations"] = int(round((1 - share) * len(text) * scale))
+        metrics.at[column, "whitespace"] = int(round((text != text.str.strip()).sum() * scale))
+
+        kinds = _value_kinds(text).value_counts(normalize=True)
+        metrics.at[column, "kind"] = kinds.index[0]
+        metrics.at[column, "type_drift"] = 1.0 - float(kinds.iloc[0])
+
+    profile = DataProfile(
+        rows=rows,
+        columns=metrics,
+        duplicate_rows=_duplicates(frame, key_columns),
+        sampled_rows=len(sample) if len(sample) < rows else None,
+        key_columns=list(key_columns) if key_columns else None,
+    )
+    profile.issues = _issues(profile)
+    return profile
+
+
+def _issues(profile: DataProfile) -> List[str]:
+    """Issues per column, most severe kinds first"""
+    issues = []
+    if profile.duplicate_rows:
+        what = "keys" if profile.key_columns else "rows"
+        issues.append(f"{profile.duplicate_rows:,} duplicate {what}")
+    for column, metric in profile.columns.iterrows():
+        found = []
+        if metric["nulls"] == profile.rows and profile.rows:
+            found.append("entirely null")
+        elif metric["nulls"]:
+            found.append(f"{metric['null_ratio']:.1%} null")
+        if metric["distinct"] == 1 and profile.rows > 1:
+            found.append("constant")
+        if metric["type_drift"] > 0:
+            found.append(f"{metric['type_drift']:.1%} of values are not {metric['kind']} (type drift)")
+        if metric["pattern_violations"]:
+            found.append(f"~{metric['pattern_violations']:,} values break pattern {_quote(metric['top_pattern'])}")
+        if metric["whitespace"]:
+            found.append(f"~{metric['whitespace']:,} values with leading/trailing whitespace")
+        if metric["outliers"]:
+            found.append(f"~{metric['outliers']:,} z-score outliers ({metric['iqr_outliers']:,} outside the IQR fences)")
+        if found:
+            issues.append(f"{column}: " + "; ".join(found))
+    return issues
+
+
+def _quote(pattern: str) -> str:
+    pattern = re.sub(r"\s", " ", str(pattern))
+    return repr(pattern if len(pattern) <= 30 else pattern[:27] + "...")
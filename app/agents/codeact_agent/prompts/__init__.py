@@ -13,5 +13,11 @@ def load_codeact_system_prompt():
     return (PROMPT_DIR / "codeact_system.md").read_text(encoding="utf-8")
 
 
+def load_history_summary_prompt():
+    """Load the prompt that folds older CodeAct turns into a running summary."""
+    return (PROMPT_DIR / "history_summary.md").read_text(encoding="utf-8")
+
+
 # Pre-load the prompts for quicker access
-CODEACT_SYSTEM = load_codeact_system_prompt()
\ No newline at end of file
+CODEACT_SYSTEM = load_codeact_system_prompt()
+HISTORY_SUMMARY = load_history_summary_prompt()
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""
+Resource Limits for CodeAct Agent
+
+Per-cell and per-session ceilings on CPU time, memory, wall clock, output and
+open files. Kernel workers enforce CPU, memory and open files with process
+rlimits; in-process contexts, which share the server process, enforce what can
+be scoped to the executing thread (CPU via its clock, output, wall clock).
+
+A cell that hits a limit is stopped with ``ResourceLimitExceeded`` and the
+agent gets an observation naming the limit so it can retry more cheaply.
+"""
+
+import contextlib
+import json
+import math
+import os
+import signal
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+_HINTS = {
+    "cpu_seconds": "Reduce the computation: sample the data, vectorize Python loops, "
+                   "and avoid quadratic operations such as cross joins.",
+    "memory_mb": "Use less memory: load only the columns you need, process the data in chunks, "
+                 "downcast dtypes, and avoid materializing large joins or copies.",
+    "wall_seconds": "Split the work into smaller steps or use a cheaper approach.",
+    "output_bytes": "Print less: show .head(), .describe() or aggregates instead of whole objects.",
+    "open_files": "Close files once done (use `with open(...)`) and avoid opening many files at once.",
+}
+
+_UNITS = {
+    "cpu_seconds": "s of CPU time",
+    "memory_mb": " MB of memory",
+    "wall_seconds": "s of wall-clock time",
+    "output_bytes": " bytes of output",
+    "open_files": " open files",
+}
+
+
+class ResourceLimitExceeded(BaseException):
+    """Raised inside a running cell when it hits a resource limit
+
+    Derives from BaseException so agent code cannot swallow it with a broad
+    ``except Exception``. Subclasses fix ``limit`` so the exception can also be
+    raised asynchronously by class.
+    """
+
+    limit = "resource"
+
+    def __init__(self, limit: str = None, scope: str = "cell", limit_value: float = None, used: float = None):
+        super().__init__(limit or self.limit)
+        self.limit = limit or self.limit
+        self.scope = scope
+        self.limit_value = limit_value
+        self.used = used
+
+
+class CpuLimitExceeded(ResourceLimitExceeded):
+    limit = "cpu_seconds"
+
+
+class OutputLimitExceeded(ResourceLimitExceeded):
+    limit = "output_bytes"
+
+
+@dataclass
+class ResourceLimits:
+    """Limits applied to cells; None leaves a resource unlimited"""
+
+    cpu_seconds: Optional[float] = None
+    memory_mb: Optional[float] = None
+    output_bytes: Optional[int] = None
+    open_files: Optional[int] = None
+    session_cpu_seconds: Optional[float] = None
+    session_wall_seconds: Optional[float] = None
+    session_output_bytes: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls) -> "ResourceLimits":
+        return cls(
+            cpu_seconds=settings.CODEACT_CELL_CPU_SECONDS,
+            memory_mb=settings.CODEACT_CELL_MEMORY_MB,
+            output_bytes=settings.CODEACT_CELL_OUTPUT_BYTES,
+            open_files=settings.CODEACT_CELL_OPEN_FILES,
+            session_cpu_seconds=settings.CODEACT_SESSION_CPU_SECONDS,
+            session_wall_seconds=settings.CODEACT_SESSION_WALL_SECONDS,
+            session_output_bytes=settings.CODEACT_SESSION_OUTPUT_BYTES,
+        )
+
+
+@dataclass
+class SessionUsage:
+    """Resources used by all cells of a session so far"""
+
+    cells: int = 0
+    cpu_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    output_bytes: int = 0
+
+    def remaining(self, limits: ResourceLimits) -> "CellBudget":
+        """Per-cell budget: the cell limits, capped by what is left of the session's"""
+        return CellBudget(
+            cpu_seconds=_tighter(limits.cpu_seconds, limits.session_cpu_seconds, self.cpu_seconds),
+            cpu_scope=_scope(limits.cpu_seconds, limits.session_cpu_seconds, self.cpu_seconds),
+            wall_seconds=_tighter(None, limits.session_wall_seconds, self.wall_seconds),
+            output_bytes=_tighter(limits.output_bytes, limits.session_output_bytes, self.output_bytes),
+            output_scope=_scope(limits.output_bytes, limits.session_output_bytes, self.output_bytes),
+        )
+
+    def exhausted(self, limits: ResourceLimits) -> Optional[ResourceLimitExceeded]:
+        """The session limit already used up, if any; no further cells may run"""
+        for limit, cap, used in (
+            ("cpu_seconds", limits.session_cpu_seconds, self.cpu_seconds),
+            ("wall_seconds", limits.session_wall_seconds, self.wall_seconds),
+            ("output_bytes", limits.session_output_bytes, self.output_bytes),
+        ):
+            if cap is not None and used >= cap:
+                return ResourceLimitExceeded(limit, "session", cap, used)
+        return None
+
+    def exhaust(self, error: ResourceLimitExceeded):
+        """Mark a session limit as used up once a cell ran into it"""
+        if error.scope == "session" and error.limit_value is not None and hasattr(self, error.limit):
+            setattr(self, error.limit, max(getattr(self, error.limit), error.limit_value))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class CellBudget:
+    """Effective limits for one cell and whether each comes from the cell or session limit"""
+
+    cpu_seconds: Optional[float]
+    cpu_scope: str
+    wall_seconds: Optional[float]
+    output_bytes: Optional[int]
+    output_scope: str
+
+
+def _tighter(cell_limit, session_limit, session_used):
+    left = session_limit - session_used if session_limit is not None else None
+    candidates = [limit for limit in (cell_limit, left) if limit is not None]
+    return min(candidates) if candidates else None
+
+
+def _scope(cell_limit, session_limit, session_used) -> str:
+    if session_limit is None:
+        return "cell"
+    if cell_limit is None or session_limit - session_used < cell_limit:
+        return "session"
+    return "cell"
+
+
+def format_limit_observation(error: ResourceLimitExceeded) -> str:
+    """Observation naming the limit a cell hit, with a machine-readable line"""
+    details = {"limit": error.limit, "scope": error.scope, "limit_value": error.limit_value}
+    if error.used is not None:
+        details["used"] = round(error.used, 3)
+    value = f"{error.limit_value:g}{_UNITS.get(error.limit, '')}" if error.limit_value is not None else error.limit
+    if error.scope == "session":
+        headline = f"the session's budget of {value} is used up"
+    else:
+        headline = f"the cell exceeded its limit of {value} and was stopped"
+    return (
+        f"ResourceLimitExceeded: {headline}.\n"
+        f"Limit: {json.dumps(details)}\n"
+        f"{_HINTS.get(error.limit, '')}"
+    )
+
+
+def _virtual_memory_bytes() -> Optional[int]:
+    """Current address-space size of this process, from /proc"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _open_file_count() -> Optional[int]:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+@contextlib.contextmanager
+def process_limits(
+    cpu_seconds: Optional[float] = None,
+    memory_mb: Optional[float] = None,
+    open_files: Optional[int] = None,
+    cpu_scope: str = "cell",
+) -> Iterator[None]:
+    """
+    Apply rlimits to the current process for the duration of one cell
+
+    Only for kernel workers, where the process runs nothing but the cell. Limits
+    are relative to current usage: the cell may use ``cpu_seconds`` more CPU,
+    grow the address space by ``memory_mb`` (RSS itself cannot be capped with
+    rlimits on Linux) and open ``open_files`` more files. Soft limits only, so
+    they can be lifted again afterwards.
+    """
+    if resource is None:
+        yield
+        return
+
+    previous = {}
+
+    def lower(kind: int, soft: int):
+        current = resource.getrlimit(kind)
+        hard = current[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        previous[kind] = current
+        resource.setrlimit(kind, (soft, hard))
+
+    def on_cpu_limit(signum, frame):
+        raise ResourceLimitExceeded("cpu_seconds", cpu_scope, cpu_seconds)
+
+    previous_handler = None
+    try:
+        if cpu_seconds is not None:
+            # SIGXCPU is sent once the process's CPU time passes the soft limit
+            previous_handler = signal.signal(signal.SIGXCPU, on_cpu_limit)
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            lower(resource.RLIMIT_CPU, math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds))
+        if memory_mb is not None:
+            baseline = _virtual_memory_bytes()
+            if baseline is not None:
+                lower(resource.RLIMIT_AS, baseline + int(memory_mb * 1024 * 1024))
+        if open_files is not None:
+            baseline = _open_file_count()
+            if baseline is not None:
+                lower(resource.RLIMIT_NOFILE, baseline + open_files)
+        yield
+    finally:
+        for kind, limits in previous.items():
+            resource.setrlimit(kind, limits)
+        if previous_handler is not None:
+            signal.signal(signal.SIGXCPU, previous_handler)
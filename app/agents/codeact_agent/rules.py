@@ -0,0 +1,248 @@
+"""
+Data-Quality Rule Engine for CodeAct Agent
+
+The data-quality framework defines rule categories (not-null, range, regex
+pattern, referential integrity, uniqueness) that agents otherwise check one
+generated cell at a time. ``check_rules`` takes the whole rule set as data,
+compiles it once into vectorized masks and evaluates every rule in a single
+pass over a DataFrame or a chunked file, so re-checking after a cleansing step
+is one call:
+
+    rules = [
+        {"rule": "not_null", "column": "order_id"},
+        {"rule": "range", "column": "amount", "min": 0, "max": 10_000},
+        {"rule": "regex", "column": "code", "pattern": r"[A-Z]{2}-\\d{4}"},
+        {"rule": "referential", "column": "customer_id", "values": customers["id"]},
+        {"rule": "unique", "columns": ["order_id"]},
+    ]
+    print(check_rules("data/orders.csv", rules))
+
+Rules other than not-null ignore nulls. Not-null and range rules on many
+columns compile into one frame-wide mask each. Uniqueness carries the keys
+seen in earlier chunks (as 64-bit hashes), so duplicates across chunks count.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .chunked import read_chunks
+
+
+RULE_TYPES = ("not_null", "range", "regex", "referential", "unique")
+
+# Violating rows kept per rule, and rules listed by ``RuleReport.summary``
+DEFAULT_SAMPLES = 5
+SUMMARY_MAX_RULES = 50
+
+
+@dataclass
+class Rule:
+    """One declarative rule, normalized"""
+
+    name: str
+    rule: str
+    columns: List[str]
+    min: Any = None
+    max: Any = None
+    pattern: Optional[str] = None
+    values: Any = None
+
+
+def _parse_rule(spec: Dict[str, Any]) -> Rule:
+    spec = dict(spec)
+    kind = spec.pop("rule", None) or spec.pop("type", None)
+    kind = {"not-null": "not_null", "notnull": "not_null", "uniqueness": "unique", "pattern": "regex",
+            "foreign_key": "referential", "in": "referential"}.get(kind, kind)
+    if kind not in RULE_TYPES:
+        raise ValueError(f"Unknown rule type {kind!r} in {spec}; expected one of {', '.join(RULE_TYPES)}")
+    columns = spec.pop("columns", None) or [spec.pop("column", None)]
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    if None in columns:
+        raise ValueError(f"Rule {kind!r} needs a 'column' (or 'columns' for uniqueness)")
+    if kind != "unique" and len(columns) != 1:
+        raise ValueError(f"Rule {kind!r} applies to one column, got {columns}")
+
+    rule = Rule(name=spec.pop("name", None) or f"{kind}:{','.join(columns)}", rule=kind, columns=columns)
+    if kind == "range":
+        rule.min, rule.max = spec.pop("min", None), spec.pop("max", None)
+        if rule.min is None and rule.max is None:
+            raise ValueError(f"Range rule {rule.name!r} needs 'min' and/or 'max'")
+    elif kind == "regex":
+        rule.pattern = spec.pop("pattern")
+    elif kind == "referential":
+        import pandas as pd
+
+        rule.values = pd.Index(pd.Series(spec.pop("values")).dropna().unique())
+    return rule
+
+
+@dataclass
+class RuleReport:
+    """Violation counts per rule, with sample violating rows"""
+
+    results: Any  # DataFrame indexed by rule name
+    samples: Dict[str, Any] = field(default_factory=dict)
+    rows: int = 0
+
+    @property
+    def passed(self) -> bool:
+        return not int(self.results["violations"].sum()) if len(self.results) else True
+
+    def summary(self, max_rules: int = SUMMARY_MAX_RULES, sample_rows: int = 3) -> str:
+        """Rows checked, the rules that failed with a few violating rows each, and the rules that passed"""
+        failed = self.results[self.results["violations"] > 0]
+        lines = [f"Rules: {len(self.results):,} checked on {self.rows:,} rows, {len(failed):,} failed"]
+        for name, result in failed.iloc[:max_rules].iterrows():
+            lines.append(f"- {name}: {result['violations']:,} violations ({result['violation_ratio']:.2%})")
+            sample = self.samples.get(name)
+            if sample is not None and len(sample):
+                lines.append("  " + sample.head(sample_rows).to_string(max_colwidth=30).replace("\n", "\n  "))
+        if len(failed) > max_rules:
+            lines.append(f"... {len(failed) - max_rules:,} more failed rules in .results")
+        passed = self.results.index[self.results["violations"] == 0]
+        if len(passed):
+            lines.append(f"Passed: {', '.join(passed[:max_rules])}" + (" ..." if len(passed) > max_rules else ""))
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
+
+
+class RuleSet:
+    """A rule set compiled into vectorized checks"""
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]):
+        self.rules = [_parse_rule(spec) for spec in rules]
+        names = [rule.name for rule in self.rules]
+        duplicated = {name for name in names if names.count(name) > 1}
+        if duplicated:
+            raise ValueError(f"Rule names must be unique; give these a 'name': {', '.join(sorted(duplicated))}")
+        self.columns = list(dict.fromkeys(column for rule in self.rules for column in rule.columns))
+
+        # Not-null and range rules on any number of columns each become one frame-wide comparison
+        self._not_null = [rule for rule in self.rules if rule.rule == "not_null"]
+        self._ranges = [rule for rule in self.rules if rule.rule == "range"]
+        self._others = [rule for rule in self.rules if rule.rule in ("regex", "referential")]
+        self._unique = [rule for rule in self.rules if rule.rule == "unique"]
+
+    def masks(self, frame: Any, seen: Optional[Dict[str, Any]] = None) -> Any:
+        """Violation mask per rule (columns named by rule) for one DataFrame or chunk
+
+        ``seen`` carries the key hashes of earlier chunks for uniqueness rules
+        and is updated in place.
+        """
+        import numpy as np
+        import pandas as pd
+
+        masks = {}
+        if self._not_null:
+            nulls = frame[[rule.columns[0] for rule in self._not_null]].isna()
+            nulls.columns = [rule.name for rule in self._not_null]
+            masks.update(nulls.items())
+        if self._ranges:
+            values = frame[[rule.columns[0] for rule in self._ranges]]
+            values.columns = [rule.name for rule in self._ranges]
+            lows = pd.Series({rule.name: rule.min for rule in self._ranges if rule.min is not None}, dtype=object)
+            highs = pd.Series({rule.name: rule.max for rule in self._ranges if rule.max is not None}, dtype=object)
+            outside = pd.DataFrame(False, index=frame.index, columns=values.columns)
+            with np.errstate(invalid="ignore"):  # Nulls compare False
+                if len(lows):
+                    outside[lows.index] |= values[lows.index].lt(lows, axis=1)
+                if len(highs):
+                    outside[highs.index] |= values[highs.index].gt(highs, axis=1)
+            masks.update(outside.items())
+        for rule in self._others:
+            column = frame[rule.columns[0]]
+            present = column.notna()
+            if rule.rule == "regex":
+                matches = column[present].astype(str).str.fullmatch(rule.pattern)
+            else:
+                matches = column[present].isin(rule.values)
+            mask = pd.Series(False, index=frame.index)
+            mask[present] = ~matches.to_numpy(dtype=bool)
+            masks[rule.name] = mask
+        for rule in self._unique:
+            hashes = _key_hashes(frame[rule.columns])
+            duplicated = pd.Series(hashes, index=frame.index).duplicated().to_numpy()
+            if seen is not None:
+                earlier = seen.get(rule.name)
+                if earlier is not None:
+                    duplicated |= np.isin(hashes, earlier)
+                seen[rule.name] = np.union1d(earlier, hashes) if earlier is not None else np.unique(hashes)
+            masks[rule.name] = pd.Series(duplicated, index=frame.index)
+        return pd.DataFrame({rule.name: masks[rule.name] for rule in self.rules}, index=frame.index)
+
+    def evaluate(
+        self, data: Any, samples: int = DEFAULT_SAMPLES, chunksize: Optional[int] = None, **kwargs
+    ) -> RuleReport:
+        """Check every rule in one pass over a DataFrame, a file or an iterable of chunks"""
+        import pandas as pd
+
+        violations = pd.Series(0, index=[rule.name for rule in self.rules], dtype="int64")
+        kept: Dict[str, List[Any]] = {rule.name: [] for rule in self.rules}
+        seen: Dict[str, Any] = {}
+        rows = 0
+        if isinstance(data, pd.DataFrame) and chunksize is None:
+            chunks = [data]
+        else:
+            chunks = read_chunks(data, chunksize, **kwargs)
+        for chunk in chunks:
+            missing = [column for column in self.columns if column not in chunk.columns]
+            if missing:
+                raise KeyError(f"Columns used by rules are missing from the data: {missing}")
+            masks = self.masks(chunk, seen)
+            rows += len(chunk)
+            violations += masks.sum().astype("int64")
+            for rule in self.rules:
+                have = sum(len(sample) for sample in kept[rule.name])
+                if have < samples and violations[rule.name]:
+                    kept[rule.name].append(chunk[masks[rule.name].to_numpy()].head(samples - have))
+
+        results = pd.DataFrame({
+            "rule": [rule.rule for rule in self.rules],
+            "columns": [", ".join(rule.columns) for rule in self.rules],
+            "violations": violations,
+            "violation_ratio": violations / rows if rows else 0.0,
+        }, index=violations.index)
+        return RuleReport(
+            results=results,
+            samples={name: pd.concat(frames) for name, frames in kept.items() if frames},
+            rows=rows,
+        )
+
+
+def _key_hashes(keys: Any) -> Any:
+    """64-bit hash of each row's key; integer keys hash alike whether a chunk holds them as int or float"""
+    import numpy as np
+    import pandas as pd
+
+    normalized = {}
+    for column, values in keys.items():
+        if values.dtype.kind in "iu" or (
+            values.dtype.kind == "f" and bool((values.dropna() == np.floor(values.dropna())).all())
+        ):
+            values = values.astype("Int64")
+        normalized[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy(dtype=np.uint64)
+
+
+def check_rules(
+    data: Any,
+    rules: Sequence[Dict[str, Any]],
+    samples: int = DEFAULT_SAMPLES,
+    chunksize: Optional[int] = None,
+    **kwargs,
+) -> RuleReport:
+    """
+    Check a declarative data-quality rule set in one pass
+
+    ``data`` is a DataFrame, a file path (CSV, JSON Lines or Parquet, read in
+    chunks) or an iterable of DataFrame chunks. Each rule is a dict with
+    ``rule`` (not_null, range, regex, referential or unique), ``column`` (or
+    ``columns`` for a composite unique key), an optional ``name`` and its
+    parameters: ``min``/``max`` for range, ``pattern`` (full match) for regex,
+    ``values`` (the allowed keys, e.g. another table's id column) for
+    referential. ``print`` the report for a summary with sample violating
+    rows; ``.results`` holds counts per rule and ``.samples`` the rows.
+    """
+    return RuleSet(rules).evaluate(data, samples=samples, chunksize=chunksize, **kwargs)
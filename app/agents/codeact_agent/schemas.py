@@ -5,6 +5,108 @@ from pydantic import BaseModel, Field, field_validator
 from pathlib import Path
 
 
+class VariableHandle(BaseModel):
+    """Lightweight reference to a session variable kept out of graph state"""
+    
+    name: str = Field(description="Variable name in the execution namespace")
+    
+    type_name: str = Field(description="Type of the referenced object")
+    
+    shape: Optional[List[int]] = Field(
+        default=None, description="Shape for array-like objects (DataFrames, ndarrays)"
+    )
+    
+    content_hash: Optional[str] = Field(
+        default=None, description="Digest of the object's content, used as its object store key"
+    )
+    
+    format: Optional[str] = Field(
+        default=None, description="Object store encoding (parquet, npy or pickle)"
+    )
+    
+    stored: bool = Field(
+        default=False, description="Whether the object store holds a copy for re-hydration"
+    )
+    
+    size_bytes: int = Field(
+        default=0, description="Size of the stored copy on disk"
+    )
+
+
+def merge_context(
+    left: Dict[str, Optional[VariableHandle]], right: Dict[str, Optional[VariableHandle]]
+) -> Dict[str, VariableHandle]:
+    """Merge variable handles from a step into state; a None handle removes the variable"""
+    merged = {**(left or {}), **(right or {})}
+    return {name: handle for name, handle in merged.items() if handle is not None}
+
+
+class StepUsage(BaseModel):
+    """Tokens, time and cost of one graph step"""
+    
+    node: str = Field(description="What ran: model, summary, final_answer or execution")
+    
+    input_tokens: int = Field(default=0, description="Prompt tokens, as reported by the provider or estimated")
+    
+    output_tokens: int = Field(default=0, description="Response tokens, as reported by the provider or estimated")
+    
+    seconds: float = Field(default=0.0, description="Wall-clock latency of the step")
+    
+    cost: float = Field(default=0.0, description="Token cost at the configured prices")
+
+
+class RunUsage(BaseModel):
+    """Cumulative usage of a run; the per-step records are streamed as usage events"""
+    
+    steps: int = Field(default=0, description="Number of steps")
+    
+    input_tokens: int = Field(default=0, description="Prompt tokens of all model calls")
+    
+    output_tokens: int = Field(default=0, description="Response tokens of all model calls")
+    
+    model_seconds: float = Field(default=0.0, description="Time spent waiting for the model")
+    
+    execution_seconds: float = Field(default=0.0, description="Time spent waiting for code cells")
+    
+    cost: float = Field(default=0.0, description="Token cost of all model calls")
+    
+    started_at: Optional[float] = Field(
+        default=None, description="Unix time the run started; only the usage that starts a run sets it"
+    )
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+    
+    @classmethod
+    def of(cls, *steps: StepUsage) -> "RunUsage":
+        """Usage of the given steps"""
+        return cls(
+            steps=len(steps),
+            input_tokens=sum(step.input_tokens for step in steps),
+            output_tokens=sum(step.output_tokens for step in steps),
+            model_seconds=sum(step.seconds for step in steps if step.node != "execution"),
+            execution_seconds=sum(step.seconds for step in steps if step.node == "execution"),
+            cost=sum(step.cost for step in steps),
+        )
+
+
+def merge_usage(left: Optional[RunUsage], right: Optional[RunUsage]) -> RunUsage:
+    """Add a step's usage to the run's; a usage with a start time begins a new run and replaces it"""
+    left, right = left or RunUsage(), right or RunUsage()
+    if right.started_at is not None:
+        return right
+    return RunUsage(
+        steps=left.steps + right.steps,
+        input_tokens=left.input_tokens + right.input_tokens,
+        output_tokens=left.output_tokens + right.output_tokens,
+        model_seconds=left.model_seconds + right.model_seconds,
+        execution_seconds=left.execution_seconds + right.execution_seconds,
+        cost=left.cost + right.cost,
+        started_at=left.started_at,
+    )
+
+
 class CodeActState(BaseModel):
     """State definition for the CodeAct Agent/Workflow."""
 
@@ -16,8 +118,8 @@ class CodeActState(BaseModel):
         default=None, description="The Python code script to be executed"
     )
     
-    context: Dict[str, Any] = Field(
-        default_factory=dict, description="Persistent execution context with variables and tools"
+    context: Annotated[Dict[str, VariableHandle], merge_context] = Field(
+        default_factory=dict, description="Handles to the session's variables; the objects live in the kernel or object store"
     )
     
     framework_document_path: Optional[str] = Field(
@@ -32,6 +134,22 @@ class CodeActState(BaseModel):
         default_factory=list, description="Generated report sections and outputs"
     )
     
+    history_summary: Optional[str] = Field(
+        default=None, description="Running summary that replaces older turns in the prompt"
+    )
+    
+    summary_through: int = Field(
+        default=0, description="Index of the first message the prompt sends verbatim after the summary"
+    )
+    
+    usage: Annotated[RunUsage, merge_usage] = Field(
+        default_factory=RunUsage, description="Tokens, latency and cost of the current run"
+    )
+    
+    budget_exceeded: Optional[str] = Field(
+        default=None, description="The budget that ended the current run early, if any"
+    )
+    
     @field_validator('framework_document_path')
     @classmethod
     def validate_framework_path(cls, v: Optional[str]) -> Optional[str]:
@@ -69,4 +187,45 @@ class CodeActConfig(BaseModel):
     
     workspace_name: Optional[str] = Field(
         default=None, description="Custom workspace name override"
-    )
\ No newline at end of file
+    )
+    
+    execution_timeout: Optional[float] = Field(
+        default=None, description="Wall-clock seconds a single code cell may run before it is interrupted"
+    )
+    
+    model_timeout: Optional[float] = Field(
+        default=None, description="Wall-clock seconds allowed for one model call in the async graph"
+    )
+    
+    speculative_execution: Optional[bool] = Field(
+        default=None,
+        description="Start the first python block while the model is still streaming its response; side effects of a discarded block are not undone"
+    )
+    
+    stop_sequences: Optional[List[str]] = Field(
+        default=None, description="Sequences that end a model response, e.g. the closing code fence"
+    )
+    
+    max_output_tokens: Optional[int] = Field(
+        default=None, description="Output token budget for each model response"
+    )
+    
+    compaction_threshold_tokens: Optional[int] = Field(
+        default=None, description="Estimated prompt size past which older turns are folded into a running summary"
+    )
+    
+    token_budget: Optional[int] = Field(
+        default=None, description="Input and output tokens a run may use before it wraps up"
+    )
+    
+    wall_clock_budget_seconds: Optional[float] = Field(
+        default=None, description="Wall-clock seconds a run may take before it wraps up"
+    )
+    
+    cost_budget: Optional[float] = Field(
+        default=None, description="Token cost a run may incur before it wraps up"
+    )
+    
+    observation_max_tokens: Optional[int] = Field(
+        default=None, description="Approximate token budget for the observation of one code cell"
+    )
@@ -0,0 +1,240 @@
+"""
+Session Registry for CodeAct Agent
+
+Keeps live ExecutionContexts alive across graph steps so a session's workspace,
+namespace and execution history are built once and reused every cycle.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.core.config import settings
+
+from .execution_context import ExecutionContext
+
+
+@dataclass
+class _SessionEntry:
+    """A live execution context plus its bookkeeping"""
+
+    context: ExecutionContext
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SessionRegistry:
+    """Process-wide LRU/TTL cache of execution contexts keyed by session"""
+
+    def __init__(
+        self,
+        max_sessions: int = 64,
+        ttl_seconds: Optional[float] = 1800.0,
+        max_memory_bytes: Optional[int] = None,
+        hibernate: bool = False,
+        reap_interval: Optional[float] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        # Evicted sessions are snapshotted to their workspace instead of discarded
+        self.hibernate = hibernate
+        # Idle sessions are also expired in the background, not only on lookups
+        self.reap_interval = reap_interval
+        self._reaper: Optional[threading.Thread] = None
+
+        self._sessions: "OrderedDict[Hashable, _SessionEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Sessions being created or hibernated outside the lock
+        self._pending: Dict[Hashable, threading.Event] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hibernations = 0
+        self.resumes = 0
+        self._hibernate_seconds = 0.0
+        self._resume_seconds = 0.0
+        self._snapshot_bytes = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], ExecutionContext]) -> ExecutionContext:
+        """Return the live context for a session, creating it on first use
+
+        The registry lock only guards the session table: contexts are built,
+        resumed and hibernated outside it, so a slow session never holds up
+        lookups of the others.
+        """
+        self._ensure_reaper()
+        self._evict_expired()
+
+        while True:
+            with self._lock:
+                entry = self._sessions.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.last_used = time.monotonic()
+                    self._sessions.move_to_end(key)
+                    entry.context.activate()
+                    return entry.context
+                # Wait for a create or hibernate of the same session to finish, then look again
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            pending.wait()
+
+        try:
+            context = factory()
+            with self._lock:
+                if context.resume_report:
+                    self.resumes += 1
+                    self._resume_seconds += context.resume_report["resume_seconds"]
+                self._sessions[key] = _SessionEntry(context=context)
+        finally:
+            self._release_pending(key)
+        self._enforce_limits(keep=key)
+        return context
+
+    def get(self, key: Hashable) -> Optional[ExecutionContext]:
+        """Return the live context for a session without creating one"""
+        with self._lock:
+            entry = self._sessions.get(key)
+            return entry.context if entry is not None else None
+
+    def evict(self, key: Hashable, idle_before: Optional[float] = None) -> bool:
+        """
+        Drop a session's context, hibernating it first when enabled
+
+        A session that is running a cell, was used since ``idle_before`` or
+        could not be hibernated stays live.
+
+        Returns:
+            Whether the session was evicted
+        """
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or key in self._pending or entry.context.is_busy():
+                return False
+            if idle_before is not None and entry.last_used >= idle_before:
+                return False
+            # Lookups of this session wait until its snapshot is written
+            del self._sessions[key]
+            self._pending[key] = threading.Event()
+        try:
+            if self.hibernate:
+                try:
+                    report = entry.context.hibernate()
+                except Exception as e:
+                    print(f"Warning: Could not hibernate session {key}: {e}")
+                    report = None
+                if report is None:
+                    with self._lock:
+                        self._sessions[key] = entry
+                    return False
+                with self._lock:
+                    self.hibernations += 1
+                    self._hibernate_seconds += report["hibernate_seconds"]
+                    self._snapshot_bytes += report["snapshot_bytes"]
+            with self._lock:
+                self.evictions += 1
+            entry.context.cleanup()
+            return True
+        finally:
+            self._release_pending(key)
+
+    def clear(self):
+        """Evict every live session"""
+        with self._lock:
+            keys = list(self._sessions)
+        for key in keys:
+            self.evict(key)
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by the variables of all live sessions"""
+        with self._lock:
+            contexts = [entry.context for entry in self._sessions.values()]
+        return sum(context.estimate_memory() for context in contexts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy"""
+        memory_bytes = self.memory_usage()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_bytes": memory_bytes,
+                "hibernations": self.hibernations,
+                "resumes": self.resumes,
+                "avg_hibernate_seconds": self._hibernate_seconds / self.hibernations if self.hibernations else 0.0,
+                "avg_resume_seconds": self._resume_seconds / self.resumes if self.resumes else 0.0,
+                "avg_snapshot_bytes": self._snapshot_bytes / self.hibernations if self.hibernations else 0.0,
+            }
+
+    def _evict_expired(self):
+        """Evict sessions idle for longer than the TTL"""
+        if not self.ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            expired = [key for key, entry in self._sessions.items() if entry.last_used < cutoff]
+        for key in expired:
+            # Skipped if the session was used or started a cell since the list was taken
+            self.evict(key, idle_before=cutoff)
+
+    def _ensure_reaper(self):
+        """Start the background thread that expires idle sessions"""
+        if not self.reap_interval or not self.ttl_seconds or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="codeact-session-reaper", daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self._evict_expired()
+            except Exception as e:
+                print(f"Warning: Session reaper failed: {e}")
+
+    def _enforce_limits(self, keep: Hashable):
+        """Evict least recently used sessions until count and memory fit"""
+        while len(self._sessions) > self.max_sessions and self._evict_lru(keep):
+            pass
+
+        if self.max_memory_bytes is None:
+            return
+        while self.memory_usage() > self.max_memory_bytes and self._evict_lru(keep):
+            pass
+
+    def _evict_lru(self, keep: Hashable) -> bool:
+        """Evict the least recently used idle session other than ``keep``"""
+        with self._lock:
+            candidates = [
+                key for key, entry in self._sessions.items()
+                if key != keep and not entry.context.is_busy()
+            ]
+        return any(self.evict(key) for key in candidates)
+
+    def _release_pending(self, key: Hashable):
+        """Let lookups waiting on a session's create or hibernate continue"""
+        with self._lock:
+            pending = self._pending.pop(key)
+        pending.set()
+
+
+session_registry = SessionRegistry(
+    max_sessions=settings.CODEACT_MAX_SESSIONS,
+    ttl_seconds=settings.CODEACT_SESSION_TTL_SECONDS,
+    max_memory_bytes=int(settings.CODEACT_SESSION_MEMORY_LIMIT_MB * 1024 * 1024),
+    hibernate=settings.CODEACT_SESSION_HIBERNATION_ENABLED,
+    reap_interval=settings.CODEACT_SESSION_REAP_INTERVAL_SECONDS,
+)
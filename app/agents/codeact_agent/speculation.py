@@ -0,0 +1,129 @@
+"""
+Speculative Cell Execution for CodeAct Agent
+
+A model usually closes its code fence well before it finishes the prose that
+follows. While the response streams, ``CodeFenceScanner`` watches for the
+first complete ```python block and the agent starts it in the session's
+kernel straight away, so generation and execution overlap. Once the whole
+response has arrived:
+
+- if its script is exactly that block, the execution node takes the
+  speculative result instead of running the cell again
+- otherwise the cell is cancelled if still running and undone, and the
+  script runs as usual
+
+Undo restores the namespace only. Side effects of a discarded cell (files
+written, SQL statements, requests) stay, and happen a second time when the
+final script runs the same code. Speculation is therefore off by default
+(``CODEACT_SPECULATIVE_EXECUTION``); enable it for read-only analysis.
+"""
+
+import concurrent.futures
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .schemas import VariableHandle
+
+
+# The first python block, as ``CodeActAgent._extract_code_blocks`` matches it
+_PYTHON_BLOCK = re.compile(r"```python\n(.*?)\n```", re.DOTALL)
+_OPENING_FENCE = "```python\n"
+
+# How often a discarded cell that is still starting up is asked to cancel
+DISCARD_POLL_SECONDS = 0.05
+
+
+def open_python_block(content: str) -> Optional[str]:
+    """Code of a trailing python block whose closing fence never arrived, if any"""
+    # Only the last python block can be open, when no fence follows its opening
+    start = content.rfind(_OPENING_FENCE)
+    if start == -1:
+        return None
+    code = content[start + len(_OPENING_FENCE):]
+    if "```" in code or not code.strip():
+        return None
+    return code.rstrip()
+
+
+class CodeFenceScanner:
+    """Incremental parser reporting the first complete python block of a streamed response"""
+
+    def __init__(self):
+        self._parts = []
+        self.block: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: str) -> Optional[str]:
+        """Add streamed text; returns the first python block once, when its closing fence arrives"""
+        self._parts.append(text)
+        # A fence can only close in a chunk carrying a backtick
+        if self.block is not None or "`" not in text:
+            return None
+        match = _PYTHON_BLOCK.search(self.text)
+        if match is None:
+            return None
+        self.block = match.group(1)
+        return self.block
+
+    def close(self) -> Optional[str]:
+        """End the stream; returns a python block it left open once, as a stop sequence swallows the closing fence"""
+        if self.block is not None:
+            return None
+        self.block = open_python_block(self.text)
+        return self.block
+
+
+class SpeculativeCell:
+    """A code block running in its session while the model finishes the response"""
+
+    def __init__(
+        self,
+        code: str,
+        open_context: Callable[[], Any],
+        run: Callable[[Any], Tuple[str, Dict[str, Optional[VariableHandle]]]],
+        on_discard: Optional[Callable[[], None]] = None,
+    ):
+        self.code = code
+        self.context = None
+        self.on_discard = on_discard
+        self.future: "concurrent.futures.Future" = concurrent.futures.Future()
+        self._lock = threading.Lock()
+        self._discarded = False
+        self._started = False
+        threading.Thread(
+            target=self._run, args=(open_context, run), name="codeact-speculative-cell", daemon=True
+        ).start()
+
+    def _run(self, open_context: Callable[[], Any], run: Callable[[Any], Tuple]):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            context = open_context()
+            with self._lock:
+                self.context = context
+                self._started = not self._discarded
+            self.future.set_result(run(context) if self._started else None)
+        except BaseException as e:
+            self.future.set_exception(e)
+
+    def result(self, timeout: Optional[float] = None) -> Tuple[str, Dict[str, Optional[VariableHandle]]]:
+        """The cell's output and handle updates, as ``run_cell`` returns them"""
+        return self.future.result(timeout)
+
+    def discard(self):
+        """Stop the cell if it is still running, then undo it"""
+        with self._lock:
+            self._discarded = True
+        # The cell may not have reached its watchdog yet, so cancelling is retried until it ends
+        while not self.future.done():
+            if self.context is not None:
+                self.context.cancel()
+            concurrent.futures.wait([self.future], timeout=DISCARD_POLL_SECONDS)
+        if self._started:
+            self.context.undo_last_cell()
+        if self.on_discard is not None:
+            self.on_discard()
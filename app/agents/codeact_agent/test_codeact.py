@@ -4,11 +4,19 @@ Test script for CodeAct Agent Phase 1
 Tests basic functionality and data science library integration.
 """
 import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
 
 from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_openai import ChatOpenAI
 
-from agents.codeact_agent import create_codeact_agent, ExecutionContext
+from agents.codeact_agent import (
+    create_codeact_agent, CellCache, ExecutionContext, LoadCache, SessionRegistry, KernelPool, ResourceLimits
+)
 
 
 load_dotenv()
@@ -68,6 +76,998 @@ print("Data science libraries work!")
     return True
 
 
+def test_session_registry():
+    """Test that session contexts are reused and evicted by the registry"""
+
+    print("\nTesting SessionRegistry...")
+
+    registry = SessionRegistry(max_sessions=1, ttl_seconds=None)
+
+    first = registry.get_or_create(("test_user", "a"), lambda: ExecutionContext("test_workspace/registry_a"))
+    again = registry.get_or_create(("test_user", "a"), lambda: ExecutionContext("test_workspace/registry_a"))
+    assert first is again, "Registry should reuse the live context"
+
+    # A second session exceeds max_sessions and evicts the first
+    registry.get_or_create(("test_user", "b"), lambda: ExecutionContext("test_workspace/registry_b"))
+    stats = registry.stats()
+    print(f"Registry stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["evictions"] == 1
+    assert registry.get(("test_user", "a")) is None
+
+    registry.clear()
+
+    # A session running a cell is not evicted to make room, and its variables can be counted meanwhile
+    registry = SessionRegistry(max_sessions=1, ttl_seconds=None, hibernate=True)
+    busy = registry.get_or_create(("test_user", "busy"), lambda: ExecutionContext("test_workspace/registry_busy"))
+    code = "import time\nfor i in range(300):\n    globals()[f'v{i}'] = i\n    time.sleep(0.002)\nx = 1"
+    cell = threading.Thread(target=busy.execute_code, args=(code,))
+    cell.start()
+    while not busy.is_busy():
+        time.sleep(0.01)
+
+    # Contexts are built outside the registry lock, so other lookups go on meanwhile
+    def factory():
+        lookup = threading.Thread(target=registry.get, args=(("test_user", "busy"),))
+        lookup.start()
+        lookup.join(timeout=1)
+        assert not lookup.is_alive(), "Lookup blocked while a context was being built"
+        return ExecutionContext("test_workspace/registry_c")
+
+    registry.get_or_create(("test_user", "c"), factory)
+    assert registry.get(("test_user", "busy")) is busy and registry.stats()["evictions"] == 0
+    while cell.is_alive():
+        busy.estimate_memory()
+    output, _ = busy.execute_code("print(x, v299)")
+    assert output.strip() == "1 299", output
+
+    # Once idle, the session is evicted on the next lookup
+    registry.get_or_create(("test_user", "c"), factory)
+    registry.get_or_create(("test_user", "d"), lambda: ExecutionContext("test_workspace/registry_d"))
+    assert registry.get(("test_user", "busy")) is None and registry.stats()["hibernations"] == 2
+
+    registry.clear()
+
+    print("✅ SessionRegistry tests passed!")
+    return True
+
+
+def test_execution_timeout():
+    """Test that a runaway cell is interrupted and keeps its partial output"""
+
+    print("\nTesting execution timeout...")
+
+    context = ExecutionContext("test_workspace/timeout")
+    output, variables = context.execute_code("print('started')\nwhile True:\n    pass", timeout=0.5)
+    print(f"Timeout output: {output}")
+    assert output.startswith("started") and "TimeoutError" in output
+    assert variables == {}
+
+    # The context stays usable after an interrupted cell
+    output, _ = context.execute_code("print('next cell')", timeout=0.5)
+    assert output.strip() == "next cell", output
+
+    # A cell stuck in native code past the async node's deadline is cancelled and keeps its partial output
+    import asyncio
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from agents.codeact_agent import CodeActAgent, codeact_agent as codeact_module
+
+    responses = [AIMessage(content="```python\nimport time\nprint('waiting')\ntime.sleep(1.5)\n```"), AIMessage(content="Done.")]
+    registry = SessionRegistry(max_sessions=2, ttl_seconds=None)
+    agent = CodeActAgent(
+        GenericFakeChatModel(messages=iter(responses)), os.path.abspath("test_workspace"), registry=registry,
+        speculative_execution=False, execution_timeout=0.2
+    )
+    config = {"configurable": {"thread_id": "stuck", "user_id": "test_user"}}
+    grace, codeact_module.EXECUTION_TIMEOUT_GRACE_SECONDS = codeact_module.EXECUTION_TIMEOUT_GRACE_SECONDS, 0.3
+    try:
+        result = asyncio.run(agent.arun("Wait", config=config, recursion_limit=10))
+    finally:
+        codeact_module.EXECUTION_TIMEOUT_GRACE_SECONDS = grace
+    observation = result["messages"][2].content
+    assert observation.startswith("Observation: waiting") and "TimeoutError" in observation, observation
+
+    # The session is free again once the stuck call returns
+    session = registry.get(("test_user", "stuck"))
+    output, _ = session.execute_code("print('after')", timeout=5)
+    assert output.strip() == "after", output
+    registry.clear()
+
+    print("✅ Execution timeout tests passed!")
+    return True
+
+
+def test_variable_handles():
+    """Test that state carries handles and a fresh context re-hydrates from them"""
+
+    print("\nTesting variable handles...")
+
+    # Resolve once: creating a context changes the working directory
+    workspace = os.path.abspath("test_workspace/handles")
+    shutil.rmtree(workspace, ignore_errors=True)
+
+    context = ExecutionContext(workspace)
+    output, handles = context.run_cell("frame = pd.DataFrame({'a': [1, 2, 3]})\nprint(len(frame))")
+    print(f"Handles: {handles}")
+    assert handles["frame"].type_name == "DataFrame" and handles["frame"].shape == [3, 1]
+
+    # Cells neither hash nor write their variables; they reach the store when they leave memory
+    store = context.object_store.root
+    assert not handles["frame"].stored and not any(store.iterdir())
+    context.hibernate()
+    assert len(list(store.iterdir())) == 1
+
+    # A new context for the same workspace loads the variable on first use
+    resumed = ExecutionContext(workspace)
+    output, _ = resumed.run_cell("print(frame['a'].sum())", handles)
+    assert output.strip() == "6", output
+
+    # The stored copy is kept while undo may need it, then collected
+    resumed.run_cell("frame = frame.assign(b=1)")
+    assert len(list(store.iterdir())) == 1
+    resumed.run_cell("x = 1")
+    assert not any(store.iterdir())
+
+    print("✅ Variable handle tests passed!")
+    return True
+
+
+def test_memory_budget_spill():
+    """Test that least recently used large variables spill to disk and reload on access"""
+
+    print("\nTesting memory budget spill...")
+
+    context = ExecutionContext(os.path.abspath("test_workspace/spill"), memory_budget_bytes=3 * 1024 * 1024)
+    context.run_cell("first = np.ones(300_000)\nsecond = np.ones(300_000)")
+
+    # The next cell only touches `second`, so `first` is spilled
+    context.run_cell("total = second.sum()")
+    report = context.memory_report()
+    print(f"Memory report: {report}")
+    assert report["spilled_variables"] == ["first"] and report["spilled_bytes"] > 0
+
+    output, _ = context.run_cell("print(int(first.sum()))")
+    assert output.strip() == "300000", output
+    assert "first" not in context.memory_report()["spilled_variables"]
+
+    print("✅ Memory budget spill tests passed!")
+    return True
+
+
+def test_bounded_observation():
+    """Test that large outputs are elided and large frames print as summaries"""
+
+    print("\nTesting bounded observations...")
+
+    context = ExecutionContext(os.path.abspath("test_workspace/observation"), observation_max_tokens=200)
+    output, _ = context.execute_code("for i in range(10_000):\n    print('line', i)")
+    assert "line 0\n" in output and "line 9999" in output and "elided" in output
+    assert len(output) < 200 * 5, len(output)
+
+    output, _ = context.execute_code("frame = pd.DataFrame(np.ones((1000, 3)))\nprint(frame)", max_output_tokens=1000)
+    assert output.startswith("DataFrame: 1,000 rows x 3 columns"), output
+    assert "Numeric summary" in output
+
+    print("✅ Bounded observation tests passed!")
+    return True
+
+
+def test_live_output():
+    """Test that output streams while a cell runs and that a running cell can be cancelled"""
+
+    print("\nTesting live output and cancellation...")
+
+    context = ExecutionContext(os.path.abspath("test_workspace/live"))
+    chunks = []
+    output, _ = context.execute_code(
+        "import time\nfor i in range(3):\n    print('tick', i)\n    time.sleep(0.3)",
+        on_output=chunks.append
+    )
+    assert "".join(chunks) == output, chunks
+    assert len(chunks) > 1  # Streamed incrementally, not once at the end
+
+    threading.Timer(0.5, context.cancel).start()
+    output, variables = context.execute_code("import time\nx = 1\nwhile True:\n    time.sleep(0.05)")
+    assert "cancelled" in output and variables == {}
+    assert "x" not in context.globals_dict
+
+    print("✅ Live output tests passed!")
+    return True
+
+
+def test_session_hibernation():
+    """Test that evicted sessions hibernate to disk and resume on next use"""
+
+    print("\nTesting session hibernation...")
+
+    workspace = os.path.abspath("test_workspace/hibernate")
+    shutil.rmtree(workspace, ignore_errors=True)
+    registry = SessionRegistry(max_sessions=4, ttl_seconds=None, hibernate=True)
+
+    context = registry.get_or_create(("test_user", "sleepy"), lambda: ExecutionContext(workspace))
+    context.run_cell("import math\nframe = pd.DataFrame({'a': [1, 2, 3]})\nfig = plt.figure()")
+    registry.evict(("test_user", "sleepy"))
+
+    resumed = registry.get_or_create(("test_user", "sleepy"), lambda: ExecutionContext(workspace))
+    output, _ = resumed.execute_code("print(frame['a'].sum(), math.floor(2.5))")
+    assert output.strip() == "6 2", output
+    assert len(resumed.get_execution_history()) == 2
+
+    stats = registry.stats()
+    print(f"Registry stats: {stats}")
+    assert stats["hibernations"] == 1 and stats["resumes"] == 1
+
+    # A session is never hibernated while a cell runs in it
+    cell = threading.Thread(target=resumed.execute_code, args=("import time\ntime.sleep(0.5)\nx = 1",))
+    cell.start()
+    while not resumed.is_busy():
+        time.sleep(0.01)
+    assert resumed.hibernate() is None
+    assert not registry.evict(("test_user", "sleepy")) and registry.get(("test_user", "sleepy")) is resumed
+    cell.join()
+    output, _ = resumed.execute_code("print(x, frame['a'].sum())")
+    assert output.strip() == "1 6", output
+
+    registry.clear()
+    print("✅ Session hibernation tests passed!")
+    return True
+
+
+def test_undo_last_cell():
+    """Test that undo restores the pre-cell state, including in-place mutations"""
+
+    print("\nTesting undo of the last cell...")
+
+    context = ExecutionContext(os.path.abspath("test_workspace/undo"))
+    context.run_cell("frame = pd.DataFrame({'a': [1, 2, 3]})\nvalues = np.arange(3)\nx = 1")
+    _, handles = context.run_cell("frame.drop(columns=['a'], inplace=True)\nvalues[:] = 0\nx = 2\ny = 3")
+    assert set(handles) == {"frame", "values", "x", "y"}, handles
+
+    changes = context.undo_last_cell()
+    assert changes["y"] is None and changes["x"] is not None
+    output, _ = context.execute_code("print(list(frame.columns), values.sum(), x, 'y' in dir())")
+    assert output.strip() == "['a'] 3 1 False", output
+    assert context.undo_last_cell() is not None  # The print cell itself
+    assert context.undo_last_cell() is None
+
+    print("✅ Undo tests passed!")
+    return True
+
+
+def test_resource_limits():
+    """Test that cells stop at their CPU and output limits and sessions at their budget"""
+
+    print("\nTesting resource limits...")
+
+    limits = ResourceLimits(cpu_seconds=0.5, output_bytes=1000, session_output_bytes=3000)
+    context = ExecutionContext(os.path.abspath("test_workspace/limits"), limits=limits)
+
+    output, _ = context.execute_code("x = 1\nwhile True:\n    x += 1")
+    assert "ResourceLimitExceeded" in output and '"limit": "cpu_seconds"' in output, output
+
+    output, _ = context.execute_code("y = 1\nfor i in range(1000):\n    print('=' * 50)")
+    assert '"limit": "output_bytes"' in output and '"scope": "cell"' in output, output
+    assert "y" not in context.get_context()
+
+    # Each cell may print under its own limit until the session budget runs out
+    for _ in range(2):
+        output, _ = context.execute_code("print('=' * 900)")
+    output, _ = context.execute_code("print('=' * 900)")
+    assert '"scope": "session"' in output, output
+    output, _ = context.execute_code("print(1)")
+    assert "budget" in output, output
+
+    usage = context.resource_usage()["usage"]
+    print(f"Session usage: {usage}")
+    assert usage["cells"] == 5 and usage["cpu_seconds"] >= 0.5
+
+    print("✅ Resource limit tests passed!")
+    return True
+
+
+def test_concurrent_sessions():
+    """Test that sessions running cells in parallel threads keep their own output, files and figures"""
+
+    print("\nTesting concurrent in-process sessions...")
+
+    import matplotlib
+
+    cwd = os.getcwd()
+    style = (matplotlib.rcParams["lines.linewidth"], matplotlib.rcParams["axes.facecolor"])
+    contexts = [ExecutionContext(os.path.abspath(f"test_workspace/concurrent_{i}")) for i in range(4)]
+    code = (
+        "import time\n"
+        "if SESSION == 0:\n"
+        "    sns.set_theme(style='darkgrid')\n"
+        "plt.rcParams['lines.linewidth'] = SESSION + 1\n"
+        "fig = plt.figure()\n"
+        "for i in range(20):\n"
+        "    print(SESSION)\n"
+        "    time.sleep(0.005)\n"
+        "pd.DataFrame({'s': [SESSION]}).to_csv('outputs/session.csv', index=False)\n"
+        "with open('outputs/session.txt', 'w') as f:\n"
+        "    f.write(str(SESSION))\n"
+        "plt.savefig('visualizations/plot.png')\n"
+        "print('figures', len(plt.get_fignums()))\n"
+        "print('linewidth', plt.plot([0, 1])[0].get_linewidth(), plt.rcParams['axes.facecolor'])"
+    )
+    outputs = {}
+
+    def run(index):
+        context = contexts[index]
+        context.add_library("SESSION", index)
+        outputs[index] = context.execute_code(code)[0]
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(contexts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Style changes stay in the session that made them
+    assert (matplotlib.rcParams["lines.linewidth"], matplotlib.rcParams["axes.facecolor"]) == style
+    facecolor = style[1]
+
+    assert os.getcwd() == cwd
+    for index, context in enumerate(contexts):
+        lines = outputs[index].strip().splitlines()
+        assert lines[:-2] == [str(index)] * 20 and lines[-2] == "figures 1", outputs[index]
+        _, linewidth, session_facecolor = lines[-1].split()
+        assert float(linewidth) == index + 1, outputs[index]
+        assert (session_facecolor != facecolor) == (index == 0), outputs[index]
+        assert (context.workspace_path / "outputs" / "session.csv").read_text().split() == ["s", str(index)]
+        assert (context.workspace_path / "outputs" / "session.txt").read_text() == str(index)
+        assert (context.workspace_path / "visualizations" / "plot.png").exists()
+
+    print("✅ Concurrent session tests passed!")
+    return True
+
+
+def test_session_working_directory():
+    """Test that pathlib, glob, shutil and os see the session workspace as the working directory"""
+
+    print("\nTesting per-session working directories...")
+
+    cwd = os.getcwd()
+    workspace = os.path.abspath("test_workspace/cwd")
+    shutil.rmtree(workspace, ignore_errors=True)
+    context = ExecutionContext(workspace)
+    output, _ = context.execute_code(
+        "import glob, os, shutil\n"
+        "from pathlib import Path\n"
+        "Path('data/a.txt').write_text('hello')\n"
+        "shutil.copy('data/a.txt', 'data/b.txt')\n"
+        "print(os.getcwd() == WORKSPACE_PATH, Path.cwd() == Path(WORKSPACE_PATH))\n"
+        "print(sorted(glob.glob('data/*.txt')), os.path.getsize('data/b.txt'))\n"
+        "os.chdir('data')\n"
+        "print(Path('b.txt').read_text(), os.listdir() == os.listdir(DATA_DIR), isinstance(Path('x'), Path))"
+    )
+    assert output.strip().splitlines() == [
+        "True True", "['data/a.txt', 'data/b.txt'] 5", "hello True True"
+    ], output
+
+    # chdir only moved the session's directory; the process and its os module are untouched
+    assert os.getcwd() == cwd and not os.path.exists("b.txt")
+    output, _ = context.execute_code("print(os.getcwd() == DATA_DIR)")
+    assert output.strip() == "True", output
+
+    print("✅ Session working directory tests passed!")
+    return True
+
+
+def test_lazy_libraries():
+    """Test that sandbox libraries are imported on first use, not with the agent package"""
+
+    print("\nTesting lazy library loading...")
+
+    script = (
+        "import os, sys\n"
+        "from agents.codeact_agent import ExecutionContext\n"
+        "assert not {'pandas', 'matplotlib.pyplot', 'seaborn'} & set(sys.modules), 'imported eagerly'\n"
+        "context = ExecutionContext(os.path.abspath('test_workspace/lazy'))\n"
+        "context.execute_code('frame = pd.DataFrame({\"a\": [1]})')\n"
+        "assert 'pandas' in sys.modules and 'seaborn' not in sys.modules\n"
+        "print(sorted(context.import_report()['imports']))\n"
+    )
+    app_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(path for path in sys.path if path)}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=app_dir, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "['pandas']", result.stdout
+
+    print("✅ Lazy library tests passed!")
+    return True
+
+
+def test_cell_cache():
+    """Test that unchanged deterministic cells are replayed and changed inputs invalidate them"""
+
+    print("\nTesting the cell result cache...")
+
+    shutil.rmtree("test_workspace/cell_cache", ignore_errors=True)
+    cache = CellCache(os.path.abspath("test_workspace/cell_cache/store"), min_seconds=0)
+    first = ExecutionContext(os.path.abspath("test_workspace/cell_cache/first"), cell_cache=cache)
+    second = ExecutionContext(os.path.abspath("test_workspace/cell_cache/second"), cell_cache=cache)
+    assert cache.root.stat().st_mode & 0o777 == 0o700  # Results are unpickled; no one else may plant them
+    for context, rows in ((first, "1\n2\n"), (second, "1\n2\n3\n")):
+        (context.workspace_path / "data" / "values.csv").write_text(f"a\n{rows}")
+
+    load = "frame = pd.read_csv('data/values.csv')\nprint(len(frame))"
+    total = "total = int(frame['a'].sum())\nprint(total)"
+    assert first.execute_code(load)[0].strip() == "2"
+    output, variables = first.execute_code(load)
+    assert output.strip() == "2" and variables["frame"]["a"].tolist() == [1, 2]
+    assert first.get_execution_history()[-1]["cached"]
+
+    # Same source in another workspace reads another file
+    assert second.execute_code(load)[0].strip() == "3"
+
+    # Changed variables and changed files are both new inputs
+    assert first.execute_code(total)[0].strip() == "3"
+    first.execute_code("frame = frame * 10")
+    assert first.execute_code(total)[0].strip() == "30"
+    (first.workspace_path / "data" / "values.csv").write_text("a\n5\n")
+    assert first.execute_code(load)[0].strip() == "1"
+
+    # Cells with side effects or randomness always run
+    first.execute_code("frame.to_csv('outputs/copy.csv')")
+    first.execute_code("frame.to_csv('outputs/copy.csv')")
+    first.execute_code("noise = np.random.rand(3)")
+    first.execute_code("noise = np.random.rand(3)")
+    assert not any(entry["cached"] for entry in first.get_execution_history()[-4:])
+
+    stats = first.cache_stats()
+    print(f"Cache stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 8
+
+    print("✅ Cell cache tests passed!")
+    return True
+
+
+def test_load_cache():
+    """Test that data files are parsed once and reloaded from a current columnar copy"""
+
+    print("\nTesting the load cache...")
+
+    shutil.rmtree("test_workspace/load_cache", ignore_errors=True)
+    cache = LoadCache(os.path.abspath("test_workspace/load_cache/store"))
+    context = ExecutionContext(os.path.abspath("test_workspace/load_cache/session"))
+    source = context.workspace_path / "data" / "sales.csv"
+    source.write_text("region,amount\nnorth,10\nsouth,20\n")
+
+    first = cache.load(source)
+    second = cache.load(source)
+    assert first.equals(second) and second["amount"].tolist() == [10, 20]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Reader arguments are part of the key; a changed file replaces its stale copy
+    assert cache.load(source, usecols=["amount"]).columns.tolist() == ["amount"]
+    source.write_text("region,amount\nnorth,10\nsouth,20\neast,30\n")
+    assert len(cache.load(source)) == 3
+    assert len([path for path in cache.root.iterdir() if path.suffix in (".arrow", ".pickle")]) == 2
+    assert cache.stats()["misses"] == 3
+
+    # Copies come back editable in place, and edits never reach the cache
+    assert cache.root.stat().st_mode & 0o777 == 0o700
+    edited = cache.load(source)
+    edited.loc[0, "amount"] = 99
+    edited["amount"].to_numpy(copy=False)[1] = 98
+    assert edited["amount"].tolist() == [99, 98, 30]
+    assert cache.load(source)["amount"].tolist() == [10, 20, 30]
+
+    # Cells load workspace-relative paths
+    output, variables = context.execute_code("sales = load_data('data/sales.csv')\nprint(sales['amount'].sum())")
+    assert output.strip() == "60", output
+    print(f"Load cache stats: {cache.stats()}")
+
+    print("✅ Load cache tests passed!")
+    return True
+
+
+def test_chunked_aggregation():
+    """Test that chunked aggregations match their in-memory pandas equivalents"""
+
+    import numpy as np
+    import pandas as pd
+
+    from agents.codeact_agent.chunked import chunked_groupby, chunked_null_counts, chunked_nunique
+
+    print("\nTesting out-of-core aggregation...")
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "region": rng.choice(["north", "south", "east", None], 1000),
+        "amount": rng.normal(100, 5, 1000),
+        "units": rng.integers(0, 50, 1000).astype(float),
+    })
+    frame.loc[rng.choice(1000, 80), "units"] = np.nan
+    context = ExecutionContext("test_workspace/chunked")
+    path = context.workspace_path / "data" / "sales.csv"
+    frame.to_csv(path, index=False)
+    expected = pd.read_csv(path)
+
+    agg = {"amount": ["mean", "std", "count"], "units": ["sum", "nunique", "max"]}
+    pd.testing.assert_frame_equal(
+        chunked_groupby(path, "region", agg, chunksize=97, workers=3), expected.groupby("region").agg(agg)
+    )
+    # nunique alone keeps every group, including one whose values are all null
+    only_nulls = expected.assign(units=expected["units"].where(expected["region"] != "east"))
+    for nunique in ("nunique", {"units": "nunique"}):
+        pd.testing.assert_frame_equal(
+            chunked_groupby(only_nulls, "region", nunique, chunksize=97), only_nulls.groupby("region").agg(nunique)
+        )
+    pd.testing.assert_series_equal(chunked_null_counts(path, chunksize=97), expected.isna().sum())
+    pd.testing.assert_series_equal(chunked_nunique(expected, chunksize=97), expected.nunique())
+
+    # Cells pass workspace-relative paths
+    output, _ = context.execute_code(
+        "ranges = chunked_value_ranges('data/sales.csv', columns=['units'], chunksize=100)\n"
+        "print(int(ranges.loc['max', 'units']), chunked_out_of_range('data/sales.csv', {'units': (None, 39)})['units'])"
+    )
+    assert output.split() == ["49", str(int((expected["units"] > 39).sum()))], output
+
+    print("✅ Out-of-core aggregation tests passed!")
+    return True
+
+
+def test_data_profile():
+    """Test that one profiling call reports nulls, duplicates, pattern breaks, outliers and type drift"""
+
+    print("\nTesting data-quality profiling...")
+
+    context = ExecutionContext("test_workspace/profile")
+    rows = ["order_id,code,amount,quantity"]
+    rows += [f"{i},AB-{i:04d},{100 + i % 7},{i % 5}" for i in range(400)]
+    rows += ["3,AB-0003,103,3", "401,ZZ,100000,many", "402,,100,"]
+    (context.workspace_path / "data" / "orders.csv").write_text("\n".join(rows) + "\n")
+
+    output, variables = context.execute_code(
+        "report = profile_data('data/orders.csv', key_columns=['order_id'])\nprint(report)"
+    )
+    report = variables["report"]
+    metrics = report.columns
+    assert report.rows == 403 and report.duplicate_rows == 1
+    assert metrics.loc["code", "nulls"] == 1 and metrics.loc["code", "pattern_violations"] == 1
+    assert metrics.loc["amount", "outliers"] == 1
+    assert metrics.loc["quantity", "kind"] == "number" and metrics.loc["quantity", "type_drift"] > 0
+    assert "Issues:" in output and "code:" in output and len(output) < 3000, output
+
+    # Long tables are sampled for the pattern, outlier and drift checks
+    sampled = context.execute_code("print(profile_data(load_data('data/orders.csv'), sample_rows=100))")[0]
+    assert "100-row sample" in sampled, sampled
+
+    print("✅ Data profiling tests passed!")
+    return True
+
+
+def test_sketches():
+    """Test that sketches merged across chunks and processes stay within their error bounds"""
+
+    import pickle
+
+    import numpy as np
+    import pandas as pd
+
+    from agents.codeact_agent.sketches import CountMinSketch, HyperLogLog, KLLSketch, _popcount_bytes, merge_sketches
+
+    print("\nTesting approximate sketches...")
+
+    rng = np.random.default_rng(0)
+    values = rng.zipf(1.5, 400_000)
+    chunks = np.array_split(values, 8)
+
+    # The numpy 1.x popcount agrees with np.bitwise_count
+    words = rng.integers(0, 2 ** 63, 1000, dtype=np.uint64) << np.uint64(1) | np.uint64(1)
+    assert (_popcount_bytes(words) == np.bitwise_count(words)).all()
+
+    # Partial sketches round-trip through pickle, as from worker processes
+    distinct = merge_sketches(pickle.loads(pickle.dumps(HyperLogLog().update(chunk))) for chunk in chunks)
+    true_distinct = len(np.unique(values))
+    assert abs(distinct.count() - true_distinct) <= 4 * distinct.relative_error * true_distinct
+
+    amounts = rng.lognormal(0, 1, len(values))
+    quantiles = merge_sketches(
+        KLLSketch(seed=index).update(chunk) for index, chunk in enumerate(np.array_split(amounts, 8))
+    )
+    qs = np.linspace(0.05, 0.95, 19)
+    ranks = np.searchsorted(np.sort(amounts), quantiles.quantile(qs), side="right") / len(amounts)
+    assert np.abs(ranks - qs).max() <= quantiles.rank_error
+
+    counts = merge_sketches(CountMinSketch().update(chunk) for chunk in chunks)
+    expected = pd.Series(values).value_counts().head(5)
+    top = counts.heavy_hitters(5)
+    assert top.index.tolist() == expected.index.tolist()
+    assert ((top - expected) >= 0).all() and ((top - expected) <= counts.epsilon * len(values)).all()
+
+    context = ExecutionContext("test_workspace/sketches")
+    output, _ = context.execute_code(
+        "frame = pd.DataFrame({'id': np.arange(20000) % 1500})\n"
+        "print(chunked_nunique(frame, approximate=True, chunksize=3000)['id'])"
+    )
+    assert abs(int(output) - 1500) <= 30, output
+
+    print("✅ Sketch tests passed!")
+    return True
+
+
+def test_rule_engine():
+    """Test that a declarative rule set is checked in one pass, whole or in chunks"""
+
+    print("\nTesting the data-quality rule engine...")
+
+    context = ExecutionContext("test_workspace/rules")
+    rows = ["order_id,customer_id,amount,code"]
+    rows += [f"{i},{i % 10},{i * 1.5},AB-{i:04d}" for i in range(300)]
+    rows += ["7,3,10,AB-0007", "300,42,-5,bad", "301,,,AB-0301"]
+    (context.workspace_path / "data" / "orders.csv").write_text("\n".join(rows) + "\n")
+
+    output, variables = context.execute_code(
+        "customers = pd.DataFrame({'id': range(10)})\n"
+        "rules = [\n"
+        "    {'rule': 'not_null', 'column': 'amount'},\n"
+        "    {'rule': 'range', 'column': 'amount', 'min': 0, 'max': 1000},\n"
+        "    {'rule': 'regex', 'column': 'code', 'pattern': r'[A-Z]{2}-\\d{4}'},\n"
+        "    {'rule': 'referential', 'column': 'customer_id', 'values': customers['id']},\n"
+        "    {'rule': 'unique', 'columns': ['order_id']},\n"
+        "]\n"
+        "report = check_rules('data/orders.csv', rules)\n"
+        "chunked = check_rules('data/orders.csv', rules, chunksize=50)\n"
+        "print(report)"
+    )
+    expected = {"not_null:amount": 1, "range:amount": 1, "regex:code": 1, "referential:customer_id": 1, "unique:order_id": 1}
+    for name in ("report", "chunked"):
+        assert variables[name].results["violations"].to_dict() == expected, variables[name].results
+    assert variables["report"].samples["unique:order_id"]["order_id"].tolist() == [7]
+    assert "5 failed" in output and "bad" in output, output
+
+    print("✅ Rule engine tests passed!")
+    return True
+
+
+def test_sql_query():
+    """Test pooled SQL queries with row limits, streaming and a result cache, against SQLite"""
+
+    import sqlite3
+
+    print("\nTesting sql_query...")
+
+    context = ExecutionContext("test_workspace/sql")
+    with sqlite3.connect(context.workspace_path / "data" / "shop.db") as connection:
+        connection.execute("DROP TABLE IF EXISTS orders")
+        connection.execute("CREATE TABLE orders (id INTEGER, region TEXT, amount REAL)")
+        connection.executemany(
+            "INSERT INTO orders VALUES (?, ?, ?)", [(i, ["north", "south"][i % 2], i * 2.0) for i in range(500)]
+        )
+
+    url = "sqlite:///data/shop.db"
+    output, variables = context.execute_code(
+        f"URL = '{url}'\n"
+        "orders = sql_query('SELECT * FROM orders WHERE amount >= :low', {'low': 100}, url=URL)\n"
+        "again = sql_query('SELECT *  FROM orders WHERE amount >= :low;', {'low': 100}, url=URL)\n"
+        "top = sql_query('SELECT * FROM orders ORDER BY amount DESC', url=URL, limit=3)\n"
+        "totals = chunked_groupby(sql_query('SELECT region, amount FROM orders', url=URL, chunksize=64), 'region', 'sum')\n"
+        "print(len(orders), len(again), top['id'].tolist(), totals['amount'].to_dict())"
+    )
+    assert output.strip() == "450 450 [499, 498, 497] {'north': 124500.0, 'south': 125000.0}", output
+    assert context.sql_stats()["cache_hits"] == 1
+
+    # Writes clear the cache, so the next read sees them
+    output, _ = context.execute_code(
+        "print(sql_query('DELETE FROM orders WHERE id < 100', url=URL), "
+        "len(sql_query('SELECT * FROM orders WHERE amount >= :low', {'low': 100}, url=URL)))"
+    )
+    assert output.split() == ["100", "400"], output
+
+    # A data-modifying WITH is a write: run as written, never limited or cached
+    output, _ = context.execute_code(
+        "sql_query('WITH old AS (SELECT id FROM orders WHERE id < 110) "
+        "DELETE FROM orders WHERE id IN (SELECT id FROM old)', url=URL)\n"
+        "print(len(sql_query('SELECT * FROM orders WHERE amount >= :low', {'low': 100}, url=URL)))"
+    )
+    assert output.strip() == "390", output
+
+    # Unbounded reads are capped server-side and say so
+    context._sql.max_rows = 10
+    output, variables = context.execute_code("capped = sql_query('SELECT * FROM orders', url=URL)")
+    assert len(variables["capped"]) == 10 and "capped at 10 rows" in output, output
+    assert context.sql_stats()["pools"]
+
+    context.cleanup()
+    assert not context.sql_stats()["pools"]
+
+    print("✅ sql_query tests passed!")
+    return True
+
+
+def test_speculative_execution():
+    """Test that a block runs while the response streams and is undone when the final script differs"""
+
+    import asyncio
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from agents.codeact_agent import CodeActAgent
+
+    print("\nTesting speculative execution...")
+
+    registry = SessionRegistry(max_sessions=4, ttl_seconds=None)
+    overlapped = []
+
+    class StreamingModel(GenericFakeChatModel):
+        """Holds back the text after the first closing fence until the session has run a cell"""
+
+        session: tuple
+
+        def _stream(self, *args, **kwargs):
+            context = registry.get(self.session)
+            cells = len(context.get_execution_history()) if context else 0
+            text, waited = "", False
+            for chunk in super()._stream(*args, **kwargs):
+                if not waited and text.count("```") == 2:
+                    waited = True
+                    for _ in range(100):
+                        context = registry.get(self.session)
+                        if context and len(context.get_execution_history()) > cells:
+                            break
+                        time.sleep(0.05)
+                    overlapped.append(len(registry.get(self.session).get_execution_history()) > cells)
+                text += chunk.message.content
+                yield chunk
+
+    def agent_for(session, responses):
+        model = StreamingModel(messages=iter(AIMessage(content=text) for text in responses), session=session)
+        return CodeActAgent(model, os.path.abspath("test_workspace"), registry=registry, speculative_execution=True)
+
+    first = "Computing.\n```python\nanswer = 41 + 1\nprint(answer)\n```\nThat prints the answer once it has run."
+    split = "Two steps:\n```python\nbase = 1\n```\nthen\n```python\ntotal = base + 1\nprint(total)\n```"
+    agent = agent_for(("test_user", "speculative"), [first, split, "The total is 2."])
+    config = {"configurable": {"thread_id": "speculative", "user_id": "test_user"}}
+    result = agent.run("Add numbers", config=config, recursion_limit=10)
+
+    observations = [message.content for message in result["messages"] if message.content.startswith("Observation:")]
+    assert observations == ["Observation: 42\n", "Observation: 2\n"], observations
+    assert overlapped == [True, True], overlapped
+    # The first cell ran once; the discarded "base = 1" cell was undone before the full script ran
+    history = registry.get(("test_user", "speculative")).get_execution_history()
+    assert [entry["code"] for entry in history] == [
+        "answer = 41 + 1\nprint(answer)", "base = 1\n\ntotal = base + 1\nprint(total)"
+    ], history
+
+    overlapped.clear()
+    agent = agent_for(("test_user", "speculative_async"), [first, "Done."])
+    config = {"configurable": {"thread_id": "speculative_async", "user_id": "test_user"}}
+    result = asyncio.run(agent.arun("Add numbers", config=config, recursion_limit=10))
+    assert result["messages"][2].content.strip() == "Observation: 42" and overlapped == [True]
+    assert len(registry.get(("test_user", "speculative_async")).get_execution_history()) == 1
+
+    registry.clear()
+    print("✅ Speculative execution tests passed!")
+    return True
+
+
+def test_stop_sequences():
+    """Test that stop sequences and the token budget are bound and truncated responses are handled"""
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from agents.codeact_agent import CodeActAgent
+
+    print("\nTesting stop sequences and output token budgets...")
+
+    responses = [
+        # Cut off by the token budget inside the cell: not run, the model is asked to resend
+        AIMessage(content="Thought\n```python\nvalues = [1,\n", response_metadata={"finish_reason": "length"}),
+        # Ended by the stop sequence on the closing fence
+        AIMessage(content="Shorter:\n```python\nvalues = [1, 2]\nprint(sum(values))\n"),
+        AIMessage(content="The sum is 3."),
+    ]
+    model = GenericFakeChatModel(messages=iter(responses))
+    registry = SessionRegistry(max_sessions=2, ttl_seconds=None)
+    agent = CodeActAgent(
+        model, os.path.abspath("test_workspace"), registry=registry,
+        speculative_execution=False, stop_sequences=["\n```\n", "\nObservation:"], max_output_tokens=256
+    )
+    assert agent._model_for({}).kwargs == {"stop": ["\n```\n", "\nObservation:"], "max_tokens": 256}
+    assert agent._model_for({"configurable": {"max_output_tokens": 64}}).kwargs["max_tokens"] == 64
+
+    assert agent._extract_code_blocks("```python\na = 1\n```\nthen\n```python\nb = 2\n") == "a = 1\n\nb = 2"
+    assert agent._open_code_block("```python\na = 1\n```\ndone") is None
+    # A bare fence left open by the stop sequence still runs when it looks like Python
+    bare = "Run:\n```\nimport pandas as pd\nprint(1)\n"
+    assert agent._extract_code_blocks(bare) == "import pandas as pd\nprint(1)"
+    assert agent._extract_code_blocks("Like this:\n```\nsome words\n") is None
+    command = agent._route_response(AIMessage(content=bare), {})
+    assert command.goto == "execution" and command.update["messages"][0].content.endswith("print(1)\n```")
+
+    config = {"configurable": {"thread_id": "stop", "user_id": "test_user"}}
+    result = agent.run("Sum values", config=config, recursion_limit=10)
+    contents = [message.content for message in result["messages"]]
+    assert "output limit of 256 tokens" in contents[2] and "not run" in contents[2], contents
+    assert contents[3].endswith("print(sum(values))\n```") and contents[4] == "Observation: 3\n", contents
+    history = registry.get(("test_user", "stop")).get_execution_history()
+    assert [entry["code"] for entry in history] == ["values = [1, 2]\nprint(sum(values))"], history
+
+    # With speculation on, the end of a stream cut by the stop sequence closes the block
+    responses = [
+        AIMessage(content="Adding:\n```python\ntotal = 2 + 3\nprint(total)\n"),
+        AIMessage(content="The total is 5."),
+    ]
+    agent = CodeActAgent(
+        GenericFakeChatModel(messages=iter(responses)), os.path.abspath("test_workspace"), registry=registry,
+        speculative_execution=True, stop_sequences=["\n```\n\n", "\nObservation:"]
+    )
+    speculate, speculated = agent._speculate, []
+    agent._speculate = lambda code, state, config: speculated.append(code) or speculate(code, state, config)
+    config = {"configurable": {"thread_id": "stop-speculative", "user_id": "test_user"}}
+    result = agent.run("Add values", config=config, recursion_limit=10)
+    assert speculated == ["total = 2 + 3\nprint(total)"], speculated
+    assert result["messages"][2].content == "Observation: 5\n", result["messages"]
+    history = registry.get(("test_user", "stop-speculative")).get_execution_history()
+    assert [entry["code"] for entry in history] == ["total = 2 + 3\nprint(total)"], history
+
+    registry.clear()
+    print("✅ Stop sequence tests passed!")
+    return True
+
+
+def test_history_compaction():
+    """Test that older turns are folded into a running summary once the prompt passes the threshold"""
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from agents.codeact_agent import CodeActAgent
+
+    print("\nTesting history compaction...")
+
+    prompts = []
+
+    class RecordingModel(GenericFakeChatModel):
+        def _generate(self, messages, *args, **kwargs):
+            prompts.append(messages)
+            return super()._generate(messages, *args, **kwargs)
+
+    responses = [
+        "First:\n```python\na = 1\nprint(a)\n```",
+        "Next:\n```python\nb = a + 1\nprint(b)\n```",
+        "- Set a = 1 and b = a + 1 = 2",  # The running summary
+        "Done: b is 2.",
+    ]
+    model = RecordingModel(messages=iter(AIMessage(content=text) for text in responses))
+    registry = SessionRegistry(max_sessions=2, ttl_seconds=None)
+    agent = CodeActAgent(
+        model, os.path.abspath("test_workspace"), registry=registry, speculative_execution=False,
+        compaction_threshold_tokens=1, compaction_keep_turns=1
+    )
+    config = {"configurable": {"thread_id": "compaction", "user_id": "test_user"}}
+    result = agent.run("Compute b", config=config, recursion_limit=10)
+
+    final = result["final_state"]
+    assert final["summary_through"] == 3, final["summary_through"]
+    assert "Set a = 1" in final["history_summary"] and "a: int" in final["history_summary"], final["history_summary"]
+    # The summary request saw the folded first turn; the last prompt replaced it with the summary
+    assert "a = 1\nprint(a)" in prompts[2][-1].content
+    last = [message.content for message in prompts[3]]
+    assert len(last) == 4 and last[1].startswith("Compute b") and "Set a = 1" in last[1], last
+    assert "b = a + 1" in last[2] and last[3] == "Observation: 2\n" and not any("print(a)" in text for text in last)
+    # The full transcript stays in state
+    assert len(result["messages"]) == 6
+
+    registry.clear()
+    print("✅ History compaction tests passed!")
+    return True
+
+
+def test_usage_budgets():
+    """Test per-step usage accounting in state and its stream, and that a used-up budget ends the run"""
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from agents.codeact_agent import CodeActAgent
+
+    print("\nTesting usage accounting and budgets...")
+
+    def response(text, input_tokens, output_tokens):
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return AIMessage(content=text, usage_metadata=usage)
+
+    responses = [
+        response("```python\nx = 1\nprint(x)\n```", 200, 20),
+        response("```python\ny = x + 1\nprint(y)\n```", 30, 10),  # Brings the run to 260 tokens
+        response("Final answer: x is 1 and y is 2.", 50, 10),
+        response("z is 3.", 10, 5),
+    ]
+    model = GenericFakeChatModel(messages=iter(responses))
+    registry = SessionRegistry(max_sessions=2, ttl_seconds=None)
+    agent = CodeActAgent(
+        model, os.path.abspath("test_workspace"), registry=registry, speculative_execution=False, token_budget=250
+    )
+    config = {"configurable": {"thread_id": "usage", "user_id": "test_user"}, "recursion_limit": 20}
+    initial_state = agent._initial_state("Compute y", None, config)
+
+    events, final = [], None
+    for mode, chunk in agent.graph.stream(initial_state, config=config, stream_mode=["custom", "values"]):
+        if mode == "custom" and chunk["type"] == "usage":
+            events.append(chunk)
+        elif mode == "values":
+            final = chunk
+
+    usage = final["usage"]
+    assert usage.steps == 5
+    assert (usage.input_tokens, usage.output_tokens) == (280, 40) and usage.total_tokens == 320
+    assert usage.execution_seconds > 0 and usage.started_at is not None
+    assert "token budget" in final["budget_exceeded"] and final["script"] is None
+    assert final["messages"][-2].content.startswith("Observation: This run has used up its token budget")
+    assert final["messages"][-1].content == "Final answer: x is 1 and y is 2."
+    # One usage event per step, carrying the running totals
+    assert [event["step"]["node"] for event in events] == ["model", "execution", "model", "execution", "final_answer"]
+    assert events[2]["total"]["input_tokens"] == 230 and events[-1]["total"]["output_tokens"] == 40
+
+    # The next run on the thread starts with fresh usage and budgets
+    follow_up = {**final, "messages": final["messages"] + [HumanMessage(content="Compute z")]}
+    final = agent.graph.invoke(follow_up, config=config)
+    assert final["budget_exceeded"] is None and final["messages"][-1].content == "z is 3."
+    assert (final["usage"].steps, final["usage"].total_tokens) == (1, 15), final["usage"]
+
+    registry.clear()
+    print("✅ Usage accounting tests passed!")
+    return True
+
+
+def test_kernel_checkpoints():
+    """Test that pooled kernels undo and survive crashes from pre-cell checkpoints"""
+
+    print("\nTesting kernel checkpoints...")
+
+    pool = KernelPool(min_workers=1, max_workers=1, checkpoints=True).start()
+    try:
+        session = pool.session(("test_user", "checkpoint"), "test_workspace/checkpoint")
+        session.run_cell("values = np.arange(5)\nx = 1")
+        session.run_cell("values[:] = 0\nx = 2")
+
+        changes = session.undo_last_cell()
+        assert set(changes) == {"values", "x"}, changes
+        output, _ = session.run_cell("print(values.sum(), x)")
+        assert output.strip() == "10 1", output
+
+        # A crash resumes from the checkpoint instead of losing the session
+        output, _ = session.run_cell("import os\nx = 99\nos._exit(1)")
+        assert "restored" in output, output
+        output, _ = session.run_cell("print(x)")
+        assert output.strip() == "1", output
+        assert pool.stats()["restores"] == 1
+    finally:
+        pool.shutdown()
+
+    print("✅ Kernel checkpoint tests passed!")
+    return True
+
+
+def test_kernel_pool():
+    """Test that pooled kernels keep session variables and survive crashes"""
+
+    print("\nTesting KernelPool...")
+
+    pool = KernelPool(min_workers=1, max_workers=2, sessions_per_worker=1).start()
+    try:
+        session = pool.session(("test_user", "pool_a"), "test_workspace/pool_a")
+        output, variables = session.execute_code("x = 21\nprint(x)")
+        assert output.strip() == "21" and variables == {"x": 21}
+
+        # Variables stay resident in the pinned worker between cells
+        output, _ = session.execute_code("print(x * 2)")
+        assert output.strip() == "42", output
+
+        # A crashing cell is reported as an observation and the worker is replaced
+        other = pool.session(("test_user", "pool_b"), "test_workspace/pool_b")
+        output, _ = other.execute_code("import os\nos._exit(1)")
+        assert "crashed" in output, output
+        output, _ = other.execute_code("print('recovered')")
+        assert output.strip() == "recovered", output
+
+        print(f"Pool stats: {pool.stats()}")
+    finally:
+        pool.shutdown()
+
+    print("✅ KernelPool tests passed!")
+    return True
+
+
 def test_codeact_agent_basic():
     """Test basic CodeAct agent functionality"""
 
@@ -119,16 +1119,66 @@ if __name__ == "__main__":
 
     # Test execution context
     context_test = test_execution_context()
+    registry_test = test_session_registry()
+    timeout_test = test_execution_timeout()
+    handles_test = test_variable_handles()
+    spill_test = test_memory_budget_spill()
+    observation_test = test_bounded_observation()
+    live_test = test_live_output()
+    hibernation_test = test_session_hibernation()
+    undo_test = test_undo_last_cell()
+    limits_test = test_resource_limits()
+    concurrent_test = test_concurrent_sessions()
+    cwd_test = test_session_working_directory()
+    lazy_test = test_lazy_libraries()
+    cache_test = test_cell_cache()
+    load_cache_test = test_load_cache()
+    chunked_test = test_chunked_aggregation()
+    profile_test = test_data_profile()
+    sketch_test = test_sketches()
+    rules_test = test_rule_engine()
+    sql_test = test_sql_query()
+    speculative_test = test_speculative_execution()
+    stop_test = test_stop_sequences()
+    compaction_test = test_history_compaction()
+    usage_test = test_usage_budgets()
+    pool_test = test_kernel_pool()
+    checkpoint_test = test_kernel_checkpoints()
 
     # Test full agent (optional, requires API key)
     agent_test = test_codeact_agent_basic()
 
     print("\n" + "=" * 50)
-    if context_test:
+    if context_test and registry_test and timeout_test and handles_test and spill_test and observation_test and live_test and hibernation_test and undo_test and limits_test and concurrent_test and cwd_test and lazy_test and cache_test and load_cache_test and chunked_test and profile_test and sketch_test and rules_test and sql_test and speculative_test and stop_test and compaction_test and usage_test and pool_test and checkpoint_test:
         print("🎉 Phase 1 Core functionality is working!")
         print("✅ Persistent execution context")
         print("✅ Data science libraries integration")
         print("✅ Variable persistence between executions")
+        print("✅ Session context reuse across cycles")
+        print("✅ Wall-clock timeouts for runaway cells")
+        print("✅ Handle-based state with on-disk re-hydration")
+        print("✅ Spill-to-disk under a session memory budget")
+        print("✅ Token-bounded observations with compact data summaries")
+        print("✅ Live output streaming and cancellation")
+        print("✅ Idle session hibernation and resume")
+        print("✅ Undo of the last cell")
+        print("✅ Per-cell and per-session resource limits")
+        print("✅ Concurrent in-process sessions")
+        print("✅ Per-session working directories for os, pathlib, glob and shutil")
+        print("✅ Lazy loading of sandbox libraries")
+        print("✅ Cell result cache with input invalidation")
+        print("✅ Columnar load cache for data files")
+        print("✅ Out-of-core chunked aggregation")
+        print("✅ One-call data-quality profiling")
+        print("✅ Mergeable approximate sketches")
+        print("✅ Single-pass data-quality rule engine")
+        print("✅ Pooled SQL queries with streaming and a result cache")
+        print("✅ Speculative execution of streamed code blocks")
+        print("✅ Stop sequences and output token budgets")
+        print("✅ History compaction into a running summary")
+        print("✅ Usage accounting with token, time and cost budgets")
+        print("✅ Pooled kernel processes with session affinity")
+        print("✅ Copy-on-write kernel checkpoints")
 
         if agent_test:
             print("✅ Full CodeAct agent cycle")
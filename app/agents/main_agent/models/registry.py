@@ -0,0 +1,127 @@
+"""
+Chat model registry for the main agent
+
+Building a chat model per request constructs its SDK client and validates its
+configuration every time, and building the prompt | model chain around it
+repeats that work again. The registry creates each model (by name and options)
+and each chain once per process and hands out the same objects afterwards.
+
+OpenAI-compatible models share one pair of pooled httpx clients, so
+connections stay alive across requests; the pool speaks HTTP/2 when the
+``h2`` package is installed. ``awarm_up`` builds the default chat chain and
+opens a connection to its provider, so the first request does not pay for
+construction or the TLS handshake. The application runs it in the background
+at startup (``LLM_WARM_UP_ENABLED``); it sends no authenticated request and
+gives up after ``LLM_WARM_UP_TIMEOUT_SECONDS``.
+"""
+
+import asyncio
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+# Providers whose chat models accept shared httpx clients
+_HTTPX_PROVIDERS = {"openai", "azure_openai"}
+
+_lock = threading.RLock()
+_models: Dict[Hashable, BaseChatModel] = {}
+_chains: Dict[Hashable, Runnable] = {}
+_http_clients: Optional[Tuple[httpx.Client, httpx.AsyncClient]] = None
+
+
+def _provider(model_name: str, options: Dict[str, Any]) -> Optional[str]:
+    if options.get("model_provider"):
+        return options["model_provider"]
+    if ":" in model_name:
+        return model_name.split(":", 1)[0]
+    return "openai" if model_name.startswith(("gpt-", "o1", "o3", "o4")) else None
+
+
+def http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """The process-wide pooled sync and async HTTP clients for model providers"""
+    global _http_clients
+    with _lock:
+        if _http_clients is None:
+            options = {
+                "http2": importlib.util.find_spec("h2") is not None,
+                "limits": httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS,
+                ),
+                "timeout": httpx.Timeout(settings.LLM_HTTP_TIMEOUT_SECONDS, connect=10.0),
+            }
+            _http_clients = (httpx.Client(**options), httpx.AsyncClient(**options))
+        return _http_clients
+
+
+def get_chat_model(model_name: Optional[str] = None, **options) -> BaseChatModel:
+    """The shared chat model for a model name and options, created on first use"""
+    model_name = model_name or settings.LLM_MODEL_NAME
+    key = (model_name, repr(sorted(options.items())))
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            kwargs = dict(options)
+            if _provider(model_name, options) in _HTTPX_PROVIDERS:
+                kwargs.setdefault("http_client", http_clients()[0])
+                kwargs.setdefault("http_async_client", http_clients()[1])
+            model = _models[key] = init_chat_model(model=model_name, **kwargs)
+        return model
+
+
+def get_chain(key: Hashable, build: Callable[[], Runnable]) -> Runnable:
+    """The shared chain registered under ``key``, built by ``build`` on first use"""
+    with _lock:
+        chain = _chains.get(key)
+        if chain is None:
+            chain = _chains[key] = build()
+        return chain
+
+
+async def awarm_up(*getters: Callable[[], Any]) -> None:
+    """
+    Build the default chat model and the chains returned by ``getters``, and open a provider connection
+
+    Failures are logged, not raised: a missing API key or an unreachable
+    provider must not stop the application from starting.
+    """
+    try:
+        model = get_chat_model()
+        for get in getters:
+            get()
+        # Any response leaves a warm connection in the pool; HEAD needs no API key and sends no prompt
+        client = getattr(model, "root_async_client", None)
+        if client is not None:
+            timeout = settings.LLM_WARM_UP_TIMEOUT_SECONDS
+            await asyncio.wait_for(
+                http_clients()[1].head(str(client.base_url), timeout=httpx.Timeout(timeout)), timeout=timeout
+            )
+        logger.info(
+            "chat_models_warmed_up",
+            model=settings.LLM_MODEL_NAME,
+            http2=importlib.util.find_spec("h2") is not None,
+        )
+    except Exception as e:
+        logger.warning("chat_model_warm_up_failed", model=settings.LLM_MODEL_NAME, error=str(e) or type(e).__name__)
+
+
+async def aclose() -> None:
+    """Close the pooled HTTP clients and forget the registered models and chains"""
+    global _http_clients
+    with _lock:
+        clients, _http_clients = _http_clients, None
+        _models.clear()
+        _chains.clear()
+    if clients is not None:
+        clients[0].close()
+        await clients[1].aclose()
@@ -1,16 +1,31 @@
 from datetime import datetime
 from typing import Any
 
-from langchain.chat_models import init_chat_model
 from langchain_core.prompts import MessagesPlaceholder, ChatPromptTemplate
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import Runnable, RunnableConfig
 
 from app.agents import prompts
+from app.agents.main_agent.models.registry import get_chain, get_chat_model
 from app.agents.main_agent.schemas import GraphState
 from app.agents.utils import extract_chat_history_and_query
 from app.core.config import settings
 
 
+def _build_chat_chain() -> Runnable:
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", prompts.CHAT_SYSTEM),
+        MessagesPlaceholder("chat_history", optional=True),
+        ("user", prompts.CHAT_USER),
+    ])
+
+    return prompt | get_chat_model(settings.LLM_MODEL_NAME)
+
+
+def get_chat_chain() -> Runnable:
+    """The chat prompt and model chain, built once per process and model"""
+    return get_chain(("chat", settings.LLM_MODEL_NAME), _build_chat_chain)
+
+
 async def chat(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
     """Chat node for the main agent."""
 
@@ -23,23 +38,13 @@ async def chat(state: GraphState, config: RunnableConfig) -> dict[str, Any]:
             "current_date_and_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", prompts.CHAT_SYSTEM),
-            MessagesPlaceholder("chat_history", optional=True),
-            ("user", prompts.CHAT_USER),
-        ])
-
-        llm = init_chat_model(
-            model=settings.LLM_MODEL_NAME,
-        )
-
-        chain = prompt | llm
+        chain = get_chat_chain()
 
         message_response = await chain.ainvoke(all_input, config)
 
         # Use text() method instead of checking content directly
         if not message_response.text():
-            error_msg = f"No response from llm: {llm}"
+            error_msg = f"No response from llm: {settings.LLM_MODEL_NAME}"
             raise ValueError(error_msg)
 
         return {
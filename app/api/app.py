@@ -1,6 +1,10 @@
 """This file contains the main application entry point."""
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import (
+    asynccontextmanager,
+    suppress,
+)
 from datetime import datetime
 from typing import (
     Any,
@@ -18,6 +22,8 @@ from fastapi.responses import JSONResponse
 
 from api.v1.routes.api import api_router
 from core import logger
+from app.agents.main_agent.models import registry as model_registry
+from app.agents.main_agent.nodes.chat import get_chat_chain
 from app.core.config import settings
 
 
@@ -34,7 +40,14 @@ async def lifespan(app: FastAPI):
         version=settings.VERSION,
         api_prefix=settings.API_V1_STR,
     )
+    # Build the chat chain and open a provider connection without holding up startup
+    warm_up = asyncio.create_task(model_registry.awarm_up(get_chat_chain)) if settings.LLM_WARM_UP_ENABLED else None
     yield
+    if warm_up is not None:
+        warm_up.cancel()
+        with suppress(asyncio.CancelledError):
+            await warm_up
+    await model_registry.aclose()
     logger.info("application_shutdown")
 
 
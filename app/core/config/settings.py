@@ -1,5 +1,6 @@
 """Application settings and configuration management."""
 from pathlib import Path
+from typing import List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -56,6 +57,324 @@ class Settings(BaseSettings):
         description="Name of the LLM model to use"
     )
 
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(
+        default=100,
+        alias="LLM_HTTP_MAX_CONNECTIONS",
+        description="Connections kept in the shared HTTP pool for LLM providers"
+    )
+
+    LLM_HTTP_KEEPALIVE_SECONDS: float = Field(
+        default=120.0,
+        alias="LLM_HTTP_KEEPALIVE_SECONDS",
+        description="How long an idle connection to an LLM provider is kept open"
+    )
+
+    LLM_HTTP_TIMEOUT_SECONDS: float = Field(
+        default=120.0,
+        alias="LLM_HTTP_TIMEOUT_SECONDS",
+        description="Read timeout of requests to LLM providers"
+    )
+
+    LLM_WARM_UP_ENABLED: bool = Field(
+        default=True,
+        alias="LLM_WARM_UP_ENABLED",
+        description="Build the chat chain and open a connection to the LLM provider in the background at startup"
+    )
+
+    LLM_WARM_UP_TIMEOUT_SECONDS: float = Field(
+        default=5.0,
+        alias="LLM_WARM_UP_TIMEOUT_SECONDS",
+        description="How long the startup warm-up waits for the LLM provider before giving up"
+    )
+
+    CODEACT_MAX_SESSIONS: int = Field(
+        default=64,
+        alias="CODEACT_MAX_SESSIONS",
+        description="Maximum number of live CodeAct execution contexts kept per process"
+    )
+
+    CODEACT_SESSION_TTL_SECONDS: float = Field(
+        default=1800.0,
+        alias="CODEACT_SESSION_TTL_SECONDS",
+        description="Idle time after which a CodeAct execution context is evicted"
+    )
+
+    CODEACT_SESSION_MEMORY_LIMIT_MB: float = Field(
+        default=4096.0,
+        alias="CODEACT_SESSION_MEMORY_LIMIT_MB",
+        description="Combined memory ceiling for live CodeAct execution contexts"
+    )
+
+    CODEACT_SESSION_HIBERNATION_ENABLED: bool = Field(
+        default=True,
+        alias="CODEACT_SESSION_HIBERNATION_ENABLED",
+        description="Snapshot evicted CodeAct sessions to their workspace and resume them on next use"
+    )
+
+    CODEACT_SESSION_REAP_INTERVAL_SECONDS: Optional[float] = Field(
+        default=60.0,
+        alias="CODEACT_SESSION_REAP_INTERVAL_SECONDS",
+        description="How often idle CodeAct sessions are checked for expiry in the background"
+    )
+
+    CODEACT_SESSION_MEMORY_BUDGET_MB: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_SESSION_MEMORY_BUDGET_MB",
+        description="Resident memory budget per CodeAct session; larger variables are spilled to disk"
+    )
+
+    CODEACT_UNDO_COPY_MAX_MB: Optional[float] = Field(
+        default=64.0,
+        alias="CODEACT_UNDO_COPY_MAX_MB",
+        description="Data a cell reads is copied in memory up to this size so undo can revert in-place mutations"
+    )
+
+    CODEACT_KERNEL_POOL_ENABLED: bool = Field(
+        default=False,
+        alias="CODEACT_KERNEL_POOL_ENABLED",
+        description="Run CodeAct cells in pre-warmed worker processes instead of the server process"
+    )
+
+    CODEACT_KERNEL_POOL_MIN_WORKERS: int = Field(
+        default=2,
+        alias="CODEACT_KERNEL_POOL_MIN_WORKERS",
+        description="Number of kernel workers kept warm even when idle"
+    )
+
+    CODEACT_KERNEL_POOL_MAX_WORKERS: Optional[int] = Field(
+        default=None,
+        alias="CODEACT_KERNEL_POOL_MAX_WORKERS",
+        description="Upper bound on kernel workers (defaults to the CPU count)"
+    )
+
+    CODEACT_KERNEL_POOL_SESSIONS_PER_WORKER: int = Field(
+        default=4,
+        alias="CODEACT_KERNEL_POOL_SESSIONS_PER_WORKER",
+        description="Sessions pinned to a worker before the pool scales up"
+    )
+
+    CODEACT_KERNEL_POOL_IDLE_TIMEOUT_SECONDS: float = Field(
+        default=300.0,
+        alias="CODEACT_KERNEL_POOL_IDLE_TIMEOUT_SECONDS",
+        description="Idle time after which surplus kernel workers are retired"
+    )
+
+    CODEACT_KERNEL_CHECKPOINTS_ENABLED: bool = Field(
+        default=True,
+        alias="CODEACT_KERNEL_CHECKPOINTS_ENABLED",
+        description="Fork a copy-on-write checkpoint of the kernel worker before each cell for undo and crash recovery"
+    )
+
+    CODEACT_OBSERVATION_MAX_TOKENS: Optional[int] = Field(
+        default=2000,
+        alias="CODEACT_OBSERVATION_MAX_TOKENS",
+        description="Approximate token budget for one code cell's observation; the middle of longer output is elided"
+    )
+
+    CODEACT_STREAM_INTERVAL_SECONDS: float = Field(
+        default=0.5,
+        alias="CODEACT_STREAM_INTERVAL_SECONDS",
+        description="Minimum seconds between live output chunks streamed from a running code cell"
+    )
+
+    CODEACT_EXECUTION_TIMEOUT_SECONDS: Optional[float] = Field(
+        default=300.0,
+        alias="CODEACT_EXECUTION_TIMEOUT_SECONDS",
+        description="Wall-clock limit for a single CodeAct code cell"
+    )
+
+    CODEACT_MODEL_TIMEOUT_SECONDS: Optional[float] = Field(
+        default=120.0,
+        alias="CODEACT_MODEL_TIMEOUT_SECONDS",
+        description="Wall-clock limit for a single CodeAct model call in the async graph"
+    )
+
+    CODEACT_SPECULATIVE_EXECUTION: bool = Field(
+        default=False,
+        alias="CODEACT_SPECULATIVE_EXECUTION",
+        description="Start the first python block while the response streams; side effects of a discarded block (files, SQL writes) are not undone and happen again with the final script"
+    )
+
+    CODEACT_STOP_SEQUENCES: List[str] = Field(
+        default=["\n```\n\n", "\nObservation:"],
+        alias="CODEACT_STOP_SEQUENCES",
+        description="Sequences that end a CodeAct model response: a closing code fence followed by a blank line, which a bare opening fence is not, and invented observations"
+    )
+
+    CODEACT_MAX_OUTPUT_TOKENS: Optional[int] = Field(
+        default=4096,
+        alias="CODEACT_MAX_OUTPUT_TOKENS",
+        description="Output token budget for each CodeAct model response"
+    )
+
+    CODEACT_COMPACTION_THRESHOLD_TOKENS: Optional[int] = Field(
+        default=32_000,
+        alias="CODEACT_COMPACTION_THRESHOLD_TOKENS",
+        description="Estimated prompt size past which older CodeAct turns are folded into a running summary"
+    )
+
+    CODEACT_COMPACTION_KEEP_TURNS: int = Field(
+        default=4,
+        alias="CODEACT_COMPACTION_KEEP_TURNS",
+        description="Most recent CodeAct turns (response and observation) kept verbatim when compacting"
+    )
+
+    CODEACT_COMPACTION_SUMMARY_MAX_TOKENS: int = Field(
+        default=1024,
+        alias="CODEACT_COMPACTION_SUMMARY_MAX_TOKENS",
+        description="Output token budget for the running summary of compacted CodeAct turns"
+    )
+
+    CODEACT_INPUT_TOKEN_PRICE: float = Field(
+        default=0.0,
+        alias="CODEACT_INPUT_TOKEN_PRICE",
+        description="Cost per million prompt tokens of the CodeAct model, for usage accounting"
+    )
+
+    CODEACT_OUTPUT_TOKEN_PRICE: float = Field(
+        default=0.0,
+        alias="CODEACT_OUTPUT_TOKEN_PRICE",
+        description="Cost per million response tokens of the CodeAct model, for usage accounting"
+    )
+
+    CODEACT_TOKEN_BUDGET: Optional[int] = Field(
+        default=None,
+        alias="CODEACT_TOKEN_BUDGET",
+        description="Tokens a CodeAct run may use before it is asked for its final answer"
+    )
+
+    CODEACT_WALL_CLOCK_BUDGET_SECONDS: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_WALL_CLOCK_BUDGET_SECONDS",
+        description="Wall-clock seconds a CodeAct run may take before it is asked for its final answer"
+    )
+
+    CODEACT_COST_BUDGET: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_COST_BUDGET",
+        description="Token cost a CodeAct run may incur before it is asked for its final answer"
+    )
+
+    CODEACT_BUDGET_ANSWER_MAX_TOKENS: int = Field(
+        default=1024,
+        alias="CODEACT_BUDGET_ANSWER_MAX_TOKENS",
+        description="Output token budget for the final answer of a CodeAct run that used up its budget"
+    )
+
+    CODEACT_CELL_CPU_SECONDS: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_CELL_CPU_SECONDS",
+        description="CPU seconds a single code cell may use"
+    )
+
+    CODEACT_CELL_MEMORY_MB: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_CELL_MEMORY_MB",
+        description="Memory a single code cell may allocate on top of what the kernel already holds (kernel workers only)"
+    )
+
+    CODEACT_CELL_OUTPUT_BYTES: Optional[int] = Field(
+        default=50_000_000,
+        alias="CODEACT_CELL_OUTPUT_BYTES",
+        description="Bytes of stdout after which a code cell is stopped"
+    )
+
+    CODEACT_CELL_OPEN_FILES: Optional[int] = Field(
+        default=None,
+        alias="CODEACT_CELL_OPEN_FILES",
+        description="Files a single code cell may hold open at once (kernel workers only)"
+    )
+
+    CODEACT_SESSION_CPU_SECONDS: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_SESSION_CPU_SECONDS",
+        description="Total CPU seconds all cells of a session may use"
+    )
+
+    CODEACT_SESSION_WALL_SECONDS: Optional[float] = Field(
+        default=None,
+        alias="CODEACT_SESSION_WALL_SECONDS",
+        description="Total wall-clock seconds all cells of a session may run"
+    )
+
+    CODEACT_SESSION_OUTPUT_BYTES: Optional[int] = Field(
+        default=None,
+        alias="CODEACT_SESSION_OUTPUT_BYTES",
+        description="Total bytes of stdout all cells of a session may print"
+    )
+
+    CODEACT_CELL_CACHE_ENABLED: bool = Field(
+        default=False,
+        alias="CODEACT_CELL_CACHE_ENABLED",
+        description="Replay the output and variables of deterministic cells whose source, inputs and files are unchanged"
+    )
+
+    CODEACT_CELL_CACHE_DIR: Optional[str] = Field(
+        default=None,
+        alias="CODEACT_CELL_CACHE_DIR",
+        description="Directory of the cell result cache, shared by the sessions of the server's user; kept private to that user (default: ~/.cache/codeact/cell-cache)"
+    )
+
+    CODEACT_CELL_CACHE_MIN_SECONDS: float = Field(
+        default=0.5,
+        alias="CODEACT_CELL_CACHE_MIN_SECONDS",
+        description="Cells that ran faster than this are not worth caching"
+    )
+
+    CODEACT_LOAD_CACHE_DIR: Optional[str] = Field(
+        default=None,
+        alias="CODEACT_LOAD_CACHE_DIR",
+        description="Directory of columnar copies of loaded data files, shared by the sessions of the server's user; kept private to that user (default: ~/.cache/codeact/load-cache)"
+    )
+
+    CODEACT_LOAD_CACHE_MAX_MB: Optional[float] = Field(
+        default=10240,
+        alias="CODEACT_LOAD_CACHE_MAX_MB",
+        description="Disk space for columnar copies of data files; least recently used copies are removed beyond it"
+    )
+
+    CODEACT_CHUNK_ROWS: int = Field(
+        default=200_000,
+        alias="CODEACT_CHUNK_ROWS",
+        description="Rows per chunk read by the out-of-core aggregation helpers"
+    )
+
+    CODEACT_CHUNK_WORKERS: Optional[int] = Field(
+        default=None,
+        alias="CODEACT_CHUNK_WORKERS",
+        description="Threads aggregating chunks in parallel (defaults to the CPU count, at most 4)"
+    )
+
+    CODEACT_PROFILE_SAMPLE_ROWS: int = Field(
+        default=100_000,
+        alias="CODEACT_PROFILE_SAMPLE_ROWS",
+        description="Rows sampled by profile_data for pattern, outlier and type-drift checks on longer tables"
+    )
+
+    CODEACT_SQL_URL: Optional[str] = Field(
+        default=None,
+        alias="CODEACT_SQL_URL",
+        description="Default database URL for sql_query in CodeAct sessions (SQLAlchemy format)"
+    )
+
+    CODEACT_SQL_POOL_SIZE: int = Field(
+        default=2,
+        alias="CODEACT_SQL_POOL_SIZE",
+        description="Database connections kept open per CodeAct session and database"
+    )
+
+    CODEACT_SQL_MAX_ROWS: Optional[int] = Field(
+        default=100_000,
+        alias="CODEACT_SQL_MAX_ROWS",
+        description="Rows a SELECT through sql_query returns unless it passes limit= or streams with chunksize="
+    )
+
+    CODEACT_SQL_CACHE_TTL_SECONDS: Optional[float] = Field(
+        default=300.0,
+        alias="CODEACT_SQL_CACHE_TTL_SECONDS",
+        description="How long sql_query reuses the result of an identical SELECT in the same session"
+    )
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",